@@ -4,14 +4,14 @@ import plotly.express as px
 import plotly.graph_objects as go
 from datetime import datetime, timedelta
 import sqlite3
-from db_router import get_db_manager
-from translator import TranslationManager
+from services import get_db_manager, get_translator
 from indian_states_cities import get_states, get_cities_for_state
+from record_export import export_download
 
 class AdminPortal:
-    def __init__(self):
-        self.db = get_db_manager()
-        self.translator = TranslationManager()
+    def __init__(self, db_manager=None, translator=None):
+        self.db = db_manager if db_manager is not None else get_db_manager()
+        self.translator = translator if translator is not None else get_translator()
         
         # Hardcoded admin credentials
         self.admin_credentials = {
@@ -312,12 +312,20 @@ class AdminPortal:
             st.metric("New Users (30 days)", recent_users)
 
         # AI notes metrics
-        note_col1, note_col2 = st.columns(2)
+        note_col1, note_col2, note_col3 = st.columns(3)
         with note_col1:
             st.metric("Clinical Notes Captured", self.get_clinical_note_count())
         with note_col2:
             avg_wer = self.get_average_wer()
             st.metric("Average WER", f"{avg_wer:.3f}" if avg_wer is not None else "N/A")
+        with note_col3:
+            t_stats = self.translator.get_stats()
+            st.metric(
+                "Translation Service",
+                "Online" if t_stats["state"] == "closed" else "Degraded",
+                f"{t_stats['short_circuited']} calls skipped, {t_stats['trips']} trips",
+                delta_color="off"
+            )
         
         # City-wise distribution
         st.subheader("🏙️ City-wise User Distribution")
@@ -526,6 +534,22 @@ class AdminPortal:
                         st.success("User deleted")
                         st.rerun()
 
+                with st.expander("Export User Data"):
+                    export_fmt = st.radio("Format", ["zip", "ndjson"], horizontal=True, key="admin_export_fmt")
+                    if st.button("Prepare Export", key="admin_export_btn"):
+                        try:
+                            with st.spinner("Preparing export..."):
+                                data, file_name, mime = export_download(self.db, user_id, export_fmt)
+                            st.download_button(
+                                "Download Export",
+                                data=data,
+                                file_name=file_name,
+                                mime=mime,
+                                key="admin_export_download",
+                            )
+                        except Exception as e:
+                            st.error(f"Export failed: {e}")
+
                 # Health Records management for this user
                 st.markdown("---")
                 st.subheader("🗂️ Health Records for Selected User")
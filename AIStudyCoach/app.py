@@ -12,26 +12,14 @@ import base64
 import re
 
 # Import custom modules
-from db_router import get_db_manager
-from ocr_analyzer import PrescriptionAnalyzer
-from translator import TranslationManager
-from emergency_sos import EmergencySOSManager
-from health_dashboard import HealthDashboard
+import services
 from utils import init_session_state, get_language_options
 from indian_states_cities import get_states, get_cities_for_state
-from admin_portal import AdminPortal
+from record_export import export_download
 try:
     from risk_scoring import score_worker
 except Exception:
     score_worker = None
-try:
-    from speech_notes import SpeechNotesManager
-except Exception:
-    SpeechNotesManager = None
-try:
-    from summarizer import ClinicalNoteSummarizer
-except Exception:
-    ClinicalNoteSummarizer = None
 try:
     from jiwer import wer as compute_wer
 except Exception:
@@ -47,15 +35,15 @@ st.set_page_config(
 # Initialize session state (must be after set_page_config)
 init_session_state()
 
-# Initialize managers
-db_manager = get_db_manager()
-ocr_analyzer = PrescriptionAnalyzer()
-translator = TranslationManager()
-sos_manager = EmergencySOSManager()
-dashboard = HealthDashboard(db_manager)
-admin_portal = AdminPortal()
-speech_notes_manager = SpeechNotesManager() if SpeechNotesManager else None
-summarizer_manager = ClinicalNoteSummarizer() if ClinicalNoteSummarizer else None
+# Shared managers: built once per process, reused across reruns and sessions
+db_manager = services.get_db_manager()
+ocr_analyzer = services.get_ocr_analyzer()
+translator = services.get_translator()
+sos_manager = services.get_sos_manager()
+dashboard = services.get_dashboard()
+admin_portal = services.get_admin_portal()
+speech_notes_manager = services.get_speech_notes()
+summarizer_manager = services.get_summarizer()
 
 def main():
     # Add loading spinner
@@ -69,6 +57,8 @@ def main():
             index=0
         )
         st.session_state.language = language_options[selected_language]
+        if translator.is_degraded():
+            st.sidebar.caption("⚠️ Translation service unreachable – showing saved or original text")
         
         # Translate main title
         main_title = translator.translate_text("Arogya Mitra - Your Health Companion", st.session_state.language)
@@ -125,10 +115,11 @@ def main():
     if st.session_state.get("admin_logged_in", False):
         nav_options["Admin Portal"] = "⚙️ Admin Portal"
     
-    # Translate navigation options
-    translated_nav = {}
-    for key, value in nav_options.items():
-        translated_nav[key] = translator.translate_text(value, st.session_state.language)
+    # Translate navigation options in one batch
+    translated_nav = dict(zip(
+        nav_options.keys(),
+        translator.batch_translate(list(nav_options.values()), st.session_state.language)
+    ))
     
     selected_page = st.sidebar.radio(
         translator.translate_text("Navigation", st.session_state.language),
@@ -392,6 +383,7 @@ def show_health_records():
                                 st.session_state.user_id, record_type, description,
                                 doctor_name, hospital_name, record_date
                             )
+                            dashboard.check_and_award_badges(st.session_state.user_id)
                         st.success(translator.translate_text("Health record added successfully!", st.session_state.language))
                         st.rerun()
                     except Exception as e:
@@ -707,6 +699,7 @@ def show_upload_documents():
                                 file_base64,
                                 uploaded_file.type
                             )
+                            dashboard.check_and_award_badges(st.session_state.user_id)
                         st.success(translator.translate_text("Document saved successfully!", st.session_state.language))
                         st.rerun()
                     except Exception as e:
@@ -763,13 +756,11 @@ def show_upload_documents():
 def show_prescription_analysis():
     st.subheader(translator.translate_text("AI-Powered Prescription Analysis", st.session_state.language))
     
-    # Tesseract status check
-    tesseract_ok = False
-    try:
-        import pytesseract
-        _ = pytesseract.get_tesseract_version()
-        tesseract_ok = True
-    except Exception as e:
+    # Tesseract status check (probed once per process, not on every rerun)
+    from ocr_engine import get_ocr_engine
+    ocr_engine = get_ocr_engine()
+    tesseract_ok = ocr_engine.info()["available"]
+    if not tesseract_ok:
         st.warning(translator.translate_text("Tesseract OCR is not installed or not found. Please install it to enable analysis.", st.session_state.language))
         st.caption("Windows: Install from https://github.com/UB-Mannheim/tesseract/wiki and restart the app.")
         
@@ -796,16 +787,20 @@ def show_prescription_analysis():
     # Language selector for OCR (installed language packs must exist in Tesseract)
     col_lang1, col_lang2 = st.columns([1,1])
     with col_lang1:
+        ocr_lang_options = [
+            spec for spec in ["eng", "eng+hin", "eng+tam", "eng+mar", "eng+ben"]
+            if ocr_engine.has_languages(spec)
+        ] or ["eng"]
         ocr_lang = st.selectbox(
             "OCR language",
-            options=["eng", "eng+hin", "eng+tam", "eng+mar", "eng+ben"],
+            options=ocr_lang_options,
             index=0,
             help="Requires corresponding Tesseract language data installed."
         )
 
     uploaded_file = st.file_uploader(
         translator.translate_text("Upload prescription image", st.session_state.language),
-        type=['jpg', 'jpeg', 'png'],
+        type=['jpg', 'jpeg', 'png', 'pdf'],
         help="Maximum file size: 10 MB"
     )
     
@@ -821,18 +816,38 @@ def show_prescription_analysis():
             if Image is None:
                 st.error("Pillow (PIL) not installed. Install with: pip install pillow")
                 return
-            image = Image.open(uploaded_file)
+            from pdf_pages import is_pdf, page_count, pdf_support_available
+            file_bytes = uploaded_file.getvalue()
+            uploaded_pdf = is_pdf(file_bytes)
+            if uploaded_pdf and not pdf_support_available():
+                st.error("PDF support not installed. Install with: pip install pypdfium2")
+                return
+            image = None if uploaded_pdf else Image.open(uploaded_file)
             col1, col2 = st.columns([1, 1])
             
             with col1:
-                st.image(image, caption=translator.translate_text("Uploaded Prescription", st.session_state.language))
+                if uploaded_pdf:
+                    st.info(f"📄 {uploaded_file.name} · {page_count(file_bytes)} page(s)")
+                else:
+                    st.image(image, caption=translator.translate_text("Uploaded Prescription", st.session_state.language))
             
             with col2:
                 if st.button(translator.translate_text("Analyze Prescription", st.session_state.language)):
                     try:
                         with st.spinner(translator.translate_text("Analyzing prescription...", st.session_state.language)):
                             # Perform OCR analysis
-                            analysis_result = ocr_analyzer.analyze_prescription(image, st.session_state.language, tesseract_lang=ocr_lang)
+                            if uploaded_pdf:
+                                # Pages stream in as they finish; text-layer pages skip OCR
+                                progress = st.progress(0.0)
+                                
+                                def show_page(page):
+                                    label = "text layer" if page.source == "text" else page.source
+                                    progress.progress((page.index + 1) / page.page_count,
+                                                      text=f"Page {page.index + 1}/{page.page_count}: {label}")
+                                
+                                analysis_result, analysis_error = ocr_analyzer.analyze_pdf(file_bytes, st.session_state.language, tesseract_lang=ocr_lang, on_page=show_page)
+                            else:
+                                analysis_result, analysis_error = ocr_analyzer.analyze_prescription(image, st.session_state.language, tesseract_lang=ocr_lang)
                             
                             if analysis_result:
                                 st.success(translator.translate_text("Analysis Complete!", st.session_state.language))
@@ -846,6 +861,10 @@ def show_prescription_analysis():
                                     st.subheader(translator.translate_text("Medications Found:", st.session_state.language))
                                     for med in analysis_result['medications']:
                                         with st.expander(f"💊 {med['name']}"):
+                                            if med.get('generic'):
+                                                st.write(f"**{translator.translate_text('Generic', st.session_state.language)}:** {med['generic']}")
+                                            if med.get('corrected_from'):
+                                                st.caption(f"{translator.translate_text('Read in the scan as', st.session_state.language)}: {med['corrected_from']}")
                                             if med['dosage']:
                                                 st.write(f"**{translator.translate_text('Dosage', st.session_state.language)}:** {med['dosage']}")
                                             if med['frequency']:
@@ -854,7 +873,10 @@ def show_prescription_analysis():
                                                 st.write(f"**{translator.translate_text('Duration', st.session_state.language)}:** {med['duration']}")
                                             if med['instructions']:
                                                 st.write(f"**{translator.translate_text('Instructions', st.session_state.language)}:** {med['instructions']}")
-                                
+                                            warning = ocr_analyzer.get_medication_warnings(med['name'])
+                                            if warning:
+                                                st.warning(translator.translate_text(warning, st.session_state.language))
+
                                 # Save analysis to database
                                 try:
                                     db_manager.save_prescription_analysis(
@@ -868,6 +890,8 @@ def show_prescription_analysis():
                                     st.warning(f"Analysis completed but couldn't save to database: {str(e)}")
                             else:
                                 st.error(translator.translate_text("Could not analyze prescription. Please ensure the image is clear and try again.", st.session_state.language))
+                                if analysis_error:
+                                    st.caption(analysis_error)
                                 st.info(translator.translate_text("Tips for better results: Use good lighting, ensure text is readable, avoid blurry images.", st.session_state.language))
                     except Exception as e:
                         st.error(f"Error during analysis: {str(e)}")
@@ -1002,6 +1026,23 @@ def show_profile():
             except Exception as e:
                 st.caption(translator.translate_text(f"Unable to load badges: {str(e)}", st.session_state.language))
     
+    # Full data export (streamed to a temp file, never built in memory)
+    with st.expander(translator.translate_text("Export My Data", st.session_state.language)):
+        export_fmt = st.radio("Format", ["zip", "ndjson"], horizontal=True, key="profile_export_fmt")
+        if st.button(translator.translate_text("Prepare Export", st.session_state.language), key="profile_export_btn"):
+            try:
+                with st.spinner(translator.translate_text("Preparing export...", st.session_state.language)):
+                    data, file_name, mime = export_download(db_manager, st.session_state.user_id, export_fmt)
+                st.download_button(
+                    translator.translate_text("Download Export", st.session_state.language),
+                    data=data,
+                    file_name=file_name,
+                    mime=mime,
+                    key="profile_export_download",
+                )
+            except Exception as e:
+                st.error(translator.translate_text(f"Export failed: {str(e)}", st.session_state.language))
+
     # Logout button
     if st.button(translator.translate_text("Logout", st.session_state.language)):
         for key in list(st.session_state.keys()):
@@ -1123,7 +1164,7 @@ def show_worker_intake():
                     if st.button(translator.translate_text("Analyze & Score", st.session_state.language), key="intake_analyze_presc"):
                         with st.spinner(translator.translate_text("Analyzing prescription and calculating risk score...", st.session_state.language)):
                             try:
-                                analysis_result = ocr_analyzer.analyze_prescription(img, st.session_state.language, tesseract_lang="eng")
+                                analysis_result, _ = ocr_analyzer.analyze_prescription(img, st.session_state.language, tesseract_lang="eng")
                                 extracted_text = (analysis_result or {}).get("extracted_text", "")
                                 chronic_list = [c.strip() for c in (chronic_txt or "").split(",") if c.strip()]
                                 outcome = score_worker(symptoms=[], chronic_conditions=chronic_list, vaccinated=vaccinated, extracted_text=extracted_text)
@@ -0,0 +1,187 @@
+"""Rule-driven badge engine that awards badges for all users in one SQL pass.
+
+Each rule compiles to a single ``INSERT INTO user_badges ... SELECT`` over
+the activity tables, so evaluation is set-based instead of one user at a
+time. Run it on a schedule (``python badge_engine.py``) or right after a
+write for the affected user; the dashboard only reads ``user_badges``.
+"""
+import sqlite3
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from change_feed import ChangeFeedConsumer, changed_user_ids
+
+# Tables that count as "activity" for streaks, with their timestamp column
+ACTIVITY_SOURCES: Dict[str, str] = {
+    "health_records": "created_at",
+    "vital_signs": "measurement_date",
+    "documents": "upload_date",
+    "prescription_analysis": "analysis_date",
+    "clinical_notes": "created_at",
+}
+
+
+@dataclass(frozen=True)
+class CountRule:
+    """Award ``badge`` once a user has at least ``min_count`` rows in ``table``."""
+    badge: str
+    table: str
+    min_count: int
+
+
+@dataclass(frozen=True)
+class StreakRule:
+    """Award ``badge`` once a user was active on ``days`` consecutive calendar days."""
+    badge: str
+    days: int
+
+
+DEFAULT_RULES = [
+    CountRule("First Health Record", "health_records", 1),
+    CountRule("Vital Signs Tracker", "vital_signs", 5),
+    StreakRule("One Week Streak", 7),
+    CountRule("Document Uploader", "documents", 1),
+    CountRule("Health Champion", "health_records", 10),
+]
+
+
+class BadgeEngine:
+    CONSUMER_NAME = "badge_engine"
+
+    def __init__(self, db_manager, rules: Optional[List[object]] = None):
+        self.db = db_manager
+        self.rules = list(rules or DEFAULT_RULES)
+        self.dialect = "sqlite" if hasattr(db_manager, "db_path") else "mysql"
+        self.ph = "?" if self.dialect == "sqlite" else "%s"
+
+    # ---- SQL compilation ----
+    def _user_filter(self, column: str, user_ids: Optional[List[int]]) -> Tuple[str, list]:
+        if not user_ids:
+            return "", []
+        return f" AND {column} IN ({', '.join([self.ph] * len(user_ids))})", list(user_ids)
+
+    def _not_awarded(self, column: str) -> str:
+        return (
+            f"NOT EXISTS (SELECT 1 FROM user_badges b "
+            f"WHERE b.user_id = {column} AND b.badge_name = {self.ph})"
+        )
+
+    def _day_number(self, expr: str) -> str:
+        if self.dialect == "sqlite":
+            return f"CAST(julianday({expr}) AS INTEGER)"
+        return f"TO_DAYS({expr})"
+
+    def compile_rule(self, rule, user_ids: Optional[List[int]] = None) -> Tuple[str, list]:
+        """Return (sql, params) inserting ``rule.badge`` for every qualifying user."""
+        if isinstance(rule, CountRule):
+            user_sql, user_params = self._user_filter("t.user_id", user_ids)
+            sql = f"""
+                INSERT INTO user_badges (user_id, badge_name)
+                SELECT t.user_id, {self.ph} FROM {rule.table} t
+                WHERE t.user_id IS NOT NULL{user_sql}
+                  AND {self._not_awarded('t.user_id')}
+                GROUP BY t.user_id
+                HAVING COUNT(*) >= {self.ph}
+            """
+            return sql, [rule.badge, *user_params, rule.badge, rule.min_count]
+
+        if isinstance(rule, StreakRule):
+            params: list = [rule.badge]
+            branches = []
+            for table, column in ACTIVITY_SOURCES.items():
+                user_sql, user_params = self._user_filter("user_id", user_ids)
+                branches.append(
+                    f"SELECT user_id, DATE({column}) AS d FROM {table} "
+                    f"WHERE user_id IS NOT NULL AND {column} IS NOT NULL{user_sql}"
+                )
+                params.extend(user_params)
+            # Gaps-and-islands: day number minus row number is constant within a run
+            sql = f"""
+                INSERT INTO user_badges (user_id, badge_name)
+                SELECT runs.user_id, {self.ph} FROM (
+                    SELECT user_id, grp, COUNT(*) AS run_len FROM (
+                        SELECT user_id,
+                               {self._day_number('d')} - ROW_NUMBER() OVER (PARTITION BY user_id ORDER BY d) AS grp
+                        FROM (SELECT DISTINCT user_id, d FROM ({' UNION ALL '.join(branches)}) activity) days
+                    ) numbered
+                    GROUP BY user_id, grp
+                ) runs
+                WHERE runs.run_len >= {self.ph}
+                  AND {self._not_awarded('runs.user_id')}
+                GROUP BY runs.user_id
+            """
+            params.extend([rule.days, rule.badge])
+            return sql, params
+
+        raise TypeError(f"Unsupported badge rule: {rule!r}")
+
+    # ---- Evaluation ----
+    def evaluate(self, user_ids: Optional[Iterable[int]] = None) -> int:
+        """Run every rule in one transaction; returns the number of badges awarded.
+
+        ``user_ids`` limits the pass to those users (e.g. right after a write);
+        ``None`` evaluates everyone.
+        """
+        ids = sorted(set(user_ids)) if user_ids is not None else None
+        if ids is not None and not ids:
+            return 0
+        statements = [self.compile_rule(rule, ids) for rule in self.rules]
+        awarded = 0
+        if self.dialect == "sqlite":
+            conn = sqlite3.connect(self.db.db_path)
+            try:
+                cursor = conn.cursor()
+                for sql, params in statements:
+                    cursor.execute(sql, params)
+                    awarded += max(cursor.rowcount, 0)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                conn.close()
+        else:
+            conn = self.db._conn()
+            cur = conn.cursor()
+            try:
+                cur.execute("START TRANSACTION")
+                for sql, params in statements:
+                    cur.execute(sql, tuple(params))
+                    awarded += max(cur.rowcount, 0)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                cur.close()
+                conn.close()
+        return awarded
+
+    def evaluate_changed(self) -> int:
+        """Evaluate only users whose activity changed since the last run (via change_log)."""
+        tables = {rule.table for rule in self.rules if isinstance(rule, CountRule)}
+        if any(isinstance(rule, StreakRule) for rule in self.rules):
+            tables.update(ACTIVITY_SOURCES)
+        consumer = ChangeFeedConsumer(self.db, self.CONSUMER_NAME, tables=tables)
+        awarded = 0
+        for batch in consumer.iter_batches():
+            awarded += self.evaluate(changed_user_ids(batch))
+            consumer.commit(batch[-1].seq)
+        return awarded
+
+
+def main():
+    import argparse
+    from db_router import get_db_manager
+
+    parser = argparse.ArgumentParser(description="Award badges for all users in one batched pass.")
+    parser.add_argument("--all", action="store_true", help="Re-evaluate every user instead of only changed ones")
+    args = parser.parse_args()
+
+    engine = BadgeEngine(get_db_manager())
+    awarded = engine.evaluate() if args.all else engine.evaluate_changed()
+    print(f"Awarded {awarded} badge(s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Small thread-safe circuit breaker for flaky network backends.
+
+CLOSED: calls go through. After ``failure_threshold`` consecutive failures
+the breaker trips to OPEN and callers fail fast (serve a fallback). Once
+``reset_timeout`` seconds have passed, the next ``allow()`` starts a single
+background probe (HALF_OPEN); success closes the breaker, failure re-opens it.
+Breakers are shared per backend name via ``get_breaker``.
+"""
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, failure_threshold: int = 3, reset_timeout: float = 30.0,
+                 probe: Optional[Callable[[], object]] = None):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.probe = probe
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self.trips = 0
+        self.total_failures = 0
+        self.short_circuited = 0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """True if a real call may be made now; False means serve the fallback."""
+        start_probe = False
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            self.short_circuited += 1
+            if self.state == OPEN and time.time() - self.opened_at >= self.reset_timeout:
+                if self.probe is None:
+                    # No background probe configured: let this one call through as the probe
+                    self.state = HALF_OPEN
+                    self.short_circuited -= 1
+                    return True
+                self.state = HALF_OPEN
+                start_probe = True
+        if start_probe:
+            threading.Thread(target=self._run_probe, name=f"{self.name}-probe", daemon=True).start()
+        return False
+
+    def _run_probe(self):
+        try:
+            self.probe()
+        except Exception as e:
+            print(f"{self.name} probe failed: {e}")
+            self.record_failure()
+        else:
+            self.record_success()
+
+    def record_success(self):
+        with self._lock:
+            self.state = CLOSED
+            self.consecutive_failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.total_failures += 1
+            self.consecutive_failures += 1
+            if self.state == HALF_OPEN or (
+                self.state == CLOSED and self.consecutive_failures >= self.failure_threshold
+            ):
+                if self.state == CLOSED:
+                    self.trips += 1
+                    print(f"{self.name} circuit opened after {self.consecutive_failures} failures")
+                self.state = OPEN
+                self.opened_at = time.time()
+
+    @property
+    def is_open(self) -> bool:
+        return self.state != CLOSED
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "name": self.name,
+                "state": self.state,
+                "consecutive_failures": self.consecutive_failures,
+                "total_failures": self.total_failures,
+                "short_circuited": self.short_circuited,
+                "trips": self.trips,
+                "opened_at": self.opened_at,
+            }
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name: str, **kwargs) -> CircuitBreaker:
+    """Process-wide breaker for ``name``; kwargs only apply on first creation."""
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = _breakers[name] = CircuitBreaker(name, **kwargs)
+        return breaker
@@ -1,6 +1,7 @@
 import sqlite3
 import hashlib
 from datetime import datetime, date
+from change_feed import TRACKED_TABLES, TRIGGER_OPS, trigger_name
 
 class DatabaseManager:
     def __init__(self, db_path="arogya_mitra.db"):
@@ -162,6 +163,37 @@ class DatabaseManager:
                     FOREIGN KEY (user_id) REFERENCES users (id)
                 )
             ''')
+            cursor.execute("CREATE INDEX IF NOT EXISTS ix_user_badges_user_badge ON user_badges(user_id, badge_name);")
+
+            # Append-only change-data-capture log, filled by triggers below
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS change_log (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    table_name TEXT NOT NULL,
+                    row_id INTEGER NOT NULL,
+                    op TEXT NOT NULL,
+                    user_id INTEGER,
+                    changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            cursor.execute("CREATE INDEX IF NOT EXISTS ix_change_log_table_seq ON change_log(table_name, seq);")
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS change_log_checkpoints (
+                    consumer TEXT PRIMARY KEY,
+                    last_seq INTEGER NOT NULL DEFAULT 0,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            for table, user_expr in TRACKED_TABLES.items():
+                for event, op, row in TRIGGER_OPS:
+                    cursor.execute(f'''
+                        CREATE TRIGGER IF NOT EXISTS {trigger_name(table, op)}
+                        AFTER {event} ON {table}
+                        BEGIN
+                            INSERT INTO change_log (table_name, row_id, op, user_id)
+                            VALUES ('{table}', {row}.id, '{op}', {user_expr.format(row=row)});
+                        END
+                    ''')
             
             conn.commit()
         except Exception as e:
@@ -366,6 +398,25 @@ class DatabaseManager:
         conn.commit()
         conn.close()
     
+    def save_prescription_analyses(self, rows):
+        """Insert many (user_id, filename, extracted_text, medications) rows in one transaction"""
+        rows = list(rows)
+        if not rows:
+            return 0
+        conn = sqlite3.connect(self.db_path)
+        try:
+            conn.executemany('''
+                INSERT INTO prescription_analysis (user_id, filename, extracted_text, medications)
+                VALUES (?, ?, ?, ?)
+            ''', rows)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+        return len(rows)
+    
     def add_badge(self, user_id, badge_name):
         """Add a badge to user"""
         conn = sqlite3.connect(self.db_path)
@@ -634,3 +685,161 @@ class DatabaseManager:
         cursor.close()
         conn.close()
         return row
+
+    # ----------------------
+    # Streaming export helpers
+    # ----------------------
+    def _iter_rows(self, query, params=(), batch_size=200):
+        """Yield rows of a query batch by batch instead of fetching them all at once."""
+        conn = sqlite3.connect(self.db_path)
+        try:
+            cursor = conn.cursor()
+            cursor.execute(query, params)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield from rows
+        finally:
+            conn.close()
+
+    def iter_health_records(self, user_id):
+        return self._iter_rows('''
+            SELECT id, record_date, record_type, description, doctor_name, hospital_name, created_at
+            FROM health_records WHERE user_id = ? ORDER BY id
+        ''', (user_id,))
+
+    def iter_vital_signs(self, user_id):
+        """All vital signs of a user (no date window, unlike get_vital_signs)."""
+        return self._iter_rows('''
+            SELECT id, measurement_type, value, unit, measurement_date
+            FROM vital_signs WHERE user_id = ? ORDER BY id
+        ''', (user_id,))
+
+    def iter_document_meta(self, user_id):
+        """Document metadata without the file payload; size is the decoded byte count."""
+        return self._iter_rows('''
+            SELECT id, filename, document_type, file_type, upload_date,
+                   LENGTH(file_data) / 4 * 3 - (LENGTH(substr(file_data, -2)) - LENGTH(REPLACE(substr(file_data, -2), '=', '')))
+            FROM documents WHERE user_id = ? ORDER BY id
+        ''', (user_id,))
+
+    def iter_prescription_documents(self, after_id=0):
+        """All users' Prescription documents as (id, user_id, filename, file_type), without the payload."""
+        return self._iter_rows('''
+            SELECT id, user_id, filename, file_type
+            FROM documents WHERE document_type = 'Prescription' AND id > ? ORDER BY id
+        ''', (after_id,))
+
+    def iter_prescription_analyses(self, user_id):
+        return self._iter_rows('''
+            SELECT id, filename, extracted_text, medications, analysis_date
+            FROM prescription_analysis WHERE user_id = ? ORDER BY id
+        ''', (user_id,))
+
+    def iter_clinical_notes(self, user_id):
+        """Clinical notes joined with their latest summary; audio is streamed separately."""
+        return self._iter_rows('''
+            SELECT n.id, n.transcript, n.source_language, n.created_at, (n.audio_b64 IS NOT NULL),
+                   s.chief_complaint, s.symptoms, s.medications, s.findings,
+                   s.plan, s.follow_up, s.additional_notes, s.model, s.created_at
+            FROM clinical_notes n
+            LEFT JOIN clinical_note_summaries s ON s.id = (
+                SELECT MAX(id) FROM clinical_note_summaries WHERE note_id = n.id
+            )
+            WHERE n.user_id = ? ORDER BY n.id
+        ''', (user_id,))
+
+    def _iter_b64_column(self, table, column, row_id, chunk_size):
+        """Read a base64 TEXT column slice by slice and yield the decoded bytes."""
+        import base64
+        # Slices must be a multiple of 4 base64 chars so each one decodes on its own
+        step = max(4, (chunk_size * 4 // 3) // 4 * 4)
+        offset = 1
+        while True:
+            conn = sqlite3.connect(self.db_path)
+            try:
+                cursor = conn.cursor()
+                cursor.execute(
+                    f"SELECT substr({column}, ?, ?) FROM {table} WHERE id = ?",
+                    (offset, step, row_id)
+                )
+                row = cursor.fetchone()
+            finally:
+                conn.close()
+            if not row or not row[0]:
+                break
+            yield base64.b64decode(row[0])
+            if len(row[0]) < step:
+                break
+            offset += step
+
+    def iter_document_bytes(self, document_id, chunk_size=64 * 1024):
+        """Yield the raw bytes of a stored document in chunks of roughly chunk_size."""
+        return self._iter_b64_column('documents', 'file_data', document_id, chunk_size)
+
+    def iter_clinical_audio_bytes(self, note_id, chunk_size=64 * 1024):
+        """Yield the raw audio bytes of a clinical note in chunks of roughly chunk_size."""
+        return self._iter_b64_column('clinical_notes', 'audio_b64', note_id, chunk_size)
+
+    # ----------------------
+    # Change log (CDC) consumer API
+    # ----------------------
+    def get_changes_since(self, seq, limit=500, tables=None):
+        """Return change_log rows with seq > given seq, oldest first."""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        query = '''
+            SELECT seq, table_name, row_id, op, user_id, changed_at
+            FROM change_log WHERE seq > ?
+        '''
+        params = [seq]
+        if tables:
+            query += f" AND table_name IN ({', '.join('?' for _ in tables)})"
+            params.extend(tables)
+        query += " ORDER BY seq LIMIT ?"
+        params.append(limit)
+        cursor.execute(query, params)
+        rows = cursor.fetchall()
+        conn.close()
+        return rows
+
+    def get_latest_change_seq(self):
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('SELECT COALESCE(MAX(seq), 0) FROM change_log')
+        seq = cursor.fetchone()[0]
+        conn.close()
+        return seq
+
+    def get_change_checkpoint(self, consumer):
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('SELECT last_seq FROM change_log_checkpoints WHERE consumer = ?', (consumer,))
+        row = cursor.fetchone()
+        conn.close()
+        return row[0] if row else 0
+
+    def set_change_checkpoint(self, consumer, seq):
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('''
+            INSERT INTO change_log_checkpoints (consumer, last_seq, updated_at)
+            VALUES (?, ?, CURRENT_TIMESTAMP)
+            ON CONFLICT(consumer) DO UPDATE SET last_seq = excluded.last_seq, updated_at = excluded.updated_at
+        ''', (consumer, seq))
+        conn.commit()
+        conn.close()
+
+    def prune_change_log(self):
+        """Drop events every registered consumer has already checkpointed past."""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('''
+            DELETE FROM change_log
+            WHERE seq <= (SELECT COALESCE(MIN(last_seq), 0) FROM change_log_checkpoints)
+        ''')
+        deleted = cursor.rowcount
+        conn.commit()
+        conn.close()
+        return deleted
@@ -0,0 +1,260 @@
+"""Drug lexicon: generics and Indian brand names matched with an Aho-Corasick automaton.
+
+The lexicon (``data/drug_lexicon.json`` or ``DRUG_LEXICON_PATH``) lists
+generics with their info, warning and class, and brands with the generics
+they contain, their common strengths and forms. Every name, alias and
+"brand strength" variant (``Dolo 650``) becomes a term of one automaton, so
+``find_all`` reports every drug mention of a whole OCR text in a single pass
+over its characters, however large the lexicon.
+
+Text and terms are compared lower-cased with punctuation runs folded to one
+space (``Pan-D``, ``PAN D`` and ``pan - d`` are the same term). Matches must
+start and end on word boundaries and the longest one wins where they overlap.
+
+OCR-garbled names ("Paracetam0l", "Amoxycilin") are recovered by
+``correct``, which looks words up in a ``drug_spelling.SpellingIndex`` of
+the lexicon's names.
+
+Building the automaton and the index for a large dictionary takes a while,
+so the built lexicon is pickled to ``DRUG_LEXICON_CACHE`` and reloaded as long as the
+source file is unchanged.
+
+Env vars: DRUG_LEXICON (1/0, read by the analyzer), DRUG_LEXICON_PATH,
+DRUG_LEXICON_CACHE
+"""
+import json
+import os
+import pickle
+import re
+import threading
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from drug_spelling import Correction, SpellingIndex
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_LEXICON_PATH = os.path.join(BASE_DIR, "data", "drug_lexicon.json")
+# Bump when the pickled structure changes
+CACHE_FORMAT = 2
+
+# Newlines are kept so matches can be mapped back to lines; terms never contain one
+_SEPARATORS = re.compile(r"[^\w\n]+|_+")
+
+
+def normalize(text: str) -> str:
+    return _SEPARATORS.sub(" ", text.lower())
+
+
+def normalize_term(term: str) -> str:
+    return " ".join(normalize(term).split())
+
+
+class DrugEntry(NamedTuple):
+    name: str                    # display name, e.g. "Pan-D" or "Paracetamol"
+    kind: str                    # "generic" or "brand"
+    generics: Tuple[str, ...]    # lexicon keys of the generics it contains
+    strength: Optional[str] = None
+
+
+class DrugMatch(NamedTuple):
+    line: int                    # index into text.split("\n")
+    start: int                   # offsets in the normalised text
+    end: int
+    entry: DrugEntry
+
+
+class AhoCorasick:
+    """Character automaton over a set of patterns; ``search`` yields (end, pattern id)."""
+
+    def __init__(self, patterns: Iterable[str]):
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.out: List[Tuple[int, ...]] = [()]
+        self.lengths: List[int] = []
+        for pid, pattern in enumerate(patterns):
+            self.lengths.append(len(pattern))
+            node = 0
+            for ch in pattern:
+                nxt = self.goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append(())
+                    self.goto[node][ch] = nxt
+                node = nxt
+            self.out[node] += (pid,)
+        # Breadth-first, so every fail target is finished before it is used
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self.goto[node].items():
+                queue.append(nxt)
+                state = self.fail[node]
+                while state and ch not in self.goto[state]:
+                    state = self.fail[state]
+                target = self.goto[state].get(ch, 0)
+                self.fail[nxt] = target if target != nxt else 0
+                self.out[nxt] += self.out[self.fail[nxt]]
+
+    def search(self, text: str) -> Iterator[Tuple[int, int]]:
+        goto, fail, out = self.goto, self.fail, self.out
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            for pid in out[node]:
+                yield i + 1, pid
+
+
+class DrugLexicon:
+    def __init__(self, generics: Dict[str, dict], brands: Dict[str, dict],
+                 class_warnings: Optional[Dict[str, str]] = None):
+        self.generics = {key.lower(): value for key, value in generics.items()}
+        self.class_warnings = class_warnings or {}
+        self.entries: List[DrugEntry] = []
+        self.terms: Dict[str, int] = {}
+        for key, value in self.generics.items():
+            for name in [key] + list(value.get("aliases", [])):
+                self._add(name, DrugEntry(name.title(), "generic", (key,)))
+        for name, value in brands.items():
+            generics_of = tuple(g.lower() for g in value.get("generics", []))
+            self._add(name, DrugEntry(name, "brand", generics_of))
+            for strength in value.get("strengths", []):
+                self._add(f"{name} {strength}", DrugEntry(f"{name} {strength}", "brand", generics_of, strength))
+        self._term_list = list(self.terms)
+        self.automaton = AhoCorasick(self._term_list)
+        # Spelling index over single words: one-word names, and the first word of longer
+        # ones ("montair" for "Montair LC") when every name starting with it is the same drug
+        self.spelling_entries: Dict[str, int] = {}
+        ambiguous = set()
+        for term, index in self.terms.items():
+            word = term.split()[0]
+            if not word.isalpha() or (word != term and word in self.terms):
+                continue
+            known = self.spelling_entries.setdefault(word, index)
+            if word != term and self.entries[known].generics != self.entries[index].generics:
+                ambiguous.add(word)
+        for word in ambiguous:
+            del self.spelling_entries[word]
+        self.spelling = SpellingIndex(self.spelling_entries)
+
+    def _add(self, name: str, entry: DrugEntry) -> None:
+        term = normalize_term(name)
+        # First definition wins: a generic is never shadowed by a brand of the same name
+        if term and term not in self.terms:
+            self.terms[term] = len(self.entries)
+            self.entries.append(entry)
+
+    @classmethod
+    def from_file(cls, path: str) -> "DrugLexicon":
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data.get("generics", {}), data.get("brands", {}), data.get("class_warnings", {}))
+
+    @classmethod
+    def load(cls, path: Optional[str] = None, cache_path: Optional[str] = None) -> "DrugLexicon":
+        """Lexicon from ``path``, through the pickle cache when it matches the file."""
+        path = os.path.abspath(path or os.getenv("DRUG_LEXICON_PATH", DEFAULT_LEXICON_PATH))
+        cache_path = cache_path or os.getenv("DRUG_LEXICON_CACHE", "drug_lexicon.pickle")
+        stat = os.stat(path)
+        key = (CACHE_FORMAT, path, stat.st_mtime_ns, stat.st_size)
+        # Identifies the dictionary contents, e.g. for caches of parsed results
+        fingerprint = f"{os.path.basename(path)}:{stat.st_size}:{stat.st_mtime_ns}"
+        try:
+            with open(cache_path, "rb") as f:
+                cached_key, lexicon = pickle.load(f)
+            if cached_key == key:
+                lexicon.fingerprint = fingerprint
+                return lexicon
+        except (OSError, pickle.PickleError, EOFError, ValueError, AttributeError):
+            pass
+        lexicon = cls.from_file(path)
+        lexicon.fingerprint = fingerprint
+        try:
+            tmp = f"{cache_path}.tmp"
+            with open(tmp, "wb") as f:
+                pickle.dump((key, lexicon), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, cache_path)
+        except OSError as e:
+            print(f"Could not write drug lexicon cache: {e}")
+        return lexicon
+
+    def __len__(self) -> int:
+        return len(self.terms)
+
+    def term_names(self) -> List[str]:
+        """Normalised terms (names, aliases, brand strengths) in definition order."""
+        return list(self._term_list)
+
+    def find_all(self, text: str) -> List[DrugMatch]:
+        """Every drug mention in ``text``: word-bounded, longest first where they overlap, in text order."""
+        normalized = normalize(text)
+        candidates = []
+        for end, pid in self.automaton.search(normalized):
+            start = end - self.automaton.lengths[pid]
+            if (start == 0 or not normalized[start - 1].isalnum()) and \
+                    (end == len(normalized) or not normalized[end].isalnum()):
+                candidates.append((start, end, pid))
+        # Leftmost-longest, non-overlapping
+        candidates.sort(key=lambda c: (c[0], c[0] - c[1]))
+        matches, taken_until = [], 0
+        line, line_start = 0, 0
+        for start, end, pid in candidates:
+            if start < taken_until:
+                continue
+            taken_until = end
+            line += normalized.count("\n", line_start, start)
+            line_start = start
+            # Terms and entries are added together, so a pattern id is also an entry index
+            matches.append(DrugMatch(line, start, end, self.entries[pid]))
+        return matches
+
+    def correct(self, tokens: Iterable[str], min_confidence: float = 0.8) -> Dict[str, Tuple[DrugEntry, Correction]]:
+        """Entry and correction for each token that is a confident misspelling of a drug name."""
+        return {token: (self.entries[self.spelling_entries[correction.word]], correction)
+                for token, correction in self.spelling.lookup_many(tokens, min_confidence).items()}
+
+    def lookup(self, name: str) -> Optional[DrugEntry]:
+        """Entry for an exact name, alias or brand (any case/punctuation), or None."""
+        index = self.terms.get(normalize_term(name))
+        return self.entries[index] if index is not None else None
+
+    def info(self, entry: DrugEntry) -> Optional[str]:
+        parts = []
+        for generic in entry.generics:
+            info = self.generics.get(generic, {}).get("info")
+            if info and info not in parts:
+                parts.append(info)
+        return "; ".join(parts) or None
+
+    def warning(self, entry: DrugEntry) -> Optional[str]:
+        """The first generic's own warning, else its class warning (e.g. antibiotics)."""
+        for generic in entry.generics:
+            value = self.generics.get(generic, {})
+            warning = value.get("warning") or self.class_warnings.get(value.get("class", ""))
+            if warning:
+                return warning
+        return None
+
+    def generic_names(self, entry: DrugEntry) -> str:
+        return " + ".join(entry.generics)
+
+
+_shared_lexicon: Optional[DrugLexicon] = None
+_shared_lock = threading.Lock()
+
+
+def get_drug_lexicon() -> Optional[DrugLexicon]:
+    """Process-wide lexicon, or None if it can't be loaded."""
+    global _shared_lexicon
+    if _shared_lexicon is None:
+        with _shared_lock:
+            if _shared_lexicon is None:
+                try:
+                    _shared_lexicon = DrugLexicon.load()
+                except (OSError, ValueError) as e:
+                    print(f"Drug lexicon unavailable: {e}")
+                    return None
+    return _shared_lexicon
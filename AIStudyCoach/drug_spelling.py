@@ -0,0 +1,136 @@
+"""OCR-tolerant spelling correction of drug names with a SymSpell deletion index.
+
+Every indexed word is stored under each string obtained by deleting up to
+``max_distance`` characters from its first ``prefix_length`` characters. A
+token is looked up through its own deletions, so the candidates within the
+edit distance come from a few dictionary hits instead of a scan of the
+whole vocabulary, and only those few are verified with a true
+(optimal string alignment) distance.
+
+Characters OCR confuses are folded before anything is compared, on both
+sides: ``0``/``o``, ``1``/``i``/``l``, ``5``/``s`` and ``8``/``b``.
+"Paracetam0l" is then an exact match and "Amoxici11in" costs nothing.
+
+Confidence is ``1 - distance / len(word)``, split evenly between words tied
+at the best distance, so an ambiguous token never scores high.
+"""
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set
+
+_OCR_FOLD = str.maketrans({"0": "o", "1": "l", "i": "l", "|": "l", "5": "s", "8": "b"})
+
+
+def fold(word: str) -> str:
+    return word.lower().translate(_OCR_FOLD)
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Optimal string alignment distance, or ``limit + 1`` once it is certain to exceed ``limit``."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2: List[int] = []
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        row_min = i
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                value = min(value, previous2[j - 2] + 1)
+            current[j] = value
+            row_min = min(row_min, value)
+        if row_min > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+def _deletes(word: str, max_distance: int) -> Set[str]:
+    found = {word}
+    frontier = {word}
+    for _ in range(max_distance):
+        frontier = {w[:i] + w[i + 1:] for w in frontier if len(w) > 1 for i in range(len(w))}
+        found |= frontier
+    return found
+
+
+class Correction(NamedTuple):
+    token: str            # as read by OCR
+    word: str             # indexed word it was corrected to
+    distance: int         # edits after OCR folding
+    confidence: float     # 0-1
+
+
+class SpellingIndex:
+    def __init__(self, words: Iterable[str], max_distance: int = 2, prefix_length: int = 7,
+                 min_length: int = 5):
+        self.max_distance = max_distance
+        self.prefix_length = prefix_length
+        self.min_length = min_length
+        self.words: List[str] = []
+        self.folded: List[str] = []
+        self.exact: Dict[str, int] = {}
+        self.deletes: Dict[str, List[int]] = {}
+        for word in words:
+            key = fold(word)
+            if len(key) < min_length or key in self.exact:
+                continue
+            wid = len(self.words)
+            self.words.append(word)
+            self.folded.append(key)
+            self.exact[key] = wid
+            for delete in _deletes(key[:prefix_length], max_distance):
+                self.deletes.setdefault(delete, []).append(wid)
+        self._memo: Dict[str, Optional[Correction]] = {}
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    def allowed_distance(self, length: int) -> int:
+        """Edits allowed for a token of this length: none below ``min_length``, 1 up to 7 characters, else 2."""
+        if length < self.min_length:
+            return 0
+        return min(self.max_distance, 1 if length < 8 else 2)
+
+    def lookup(self, token: str) -> Optional[Correction]:
+        """Nearest indexed word within the allowed distance, or None."""
+        if token in self._memo:
+            return self._memo[token]
+        key = fold(token)
+        limit = self.allowed_distance(len(key))
+        result = None
+        if key in self.exact:
+            result = Correction(token, self.words[self.exact[key]], 0, 1.0)
+        elif limit:
+            best, tied = limit + 1, []
+            seen = set()
+            for delete in _deletes(key[:self.prefix_length], limit):
+                for wid in self.deletes.get(delete, ()):
+                    if wid in seen:
+                        continue
+                    seen.add(wid)
+                    distance = edit_distance(key, self.folded[wid], min(limit, best))
+                    if distance > limit:
+                        continue
+                    if distance < best:
+                        best, tied = distance, [wid]
+                    elif distance == best:
+                        tied.append(wid)
+            if tied:
+                word = self.words[min(tied)]
+                confidence = (1 - best / len(self.folded[min(tied)])) / len(tied)
+                result = Correction(token, word, best, round(confidence, 3))
+        # Page after page repeats the same words; bounded so a long backfill can't grow it forever
+        if len(self._memo) >= 50000:
+            self._memo.clear()
+        self._memo[token] = result
+        return result
+
+    def lookup_many(self, tokens: Iterable[str], min_confidence: float = 0.0) -> Dict[str, Correction]:
+        """Corrections of the distinct ``tokens`` scoring strictly above ``min_confidence``."""
+        corrections = {}
+        for token in set(tokens):
+            correction = self.lookup(token)
+            if correction is not None and correction.confidence > min_confidence:
+                corrections[token] = correction
+        return corrections
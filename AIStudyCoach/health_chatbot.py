@@ -1,11 +1,11 @@
 import streamlit as st
 import re
 from datetime import datetime
-from translator import TranslationManager
+from services import get_chatbot, get_translator
 
 class HealthChatbot:
-    def __init__(self):
-        self.translator = TranslationManager()
+    def __init__(self, translator=None):
+        self.translator = translator if translator is not None else get_translator()
         
         # Health knowledge base with keywords and responses
         self.health_knowledge = {
@@ -565,9 +565,9 @@ def main():
         layout="wide"
     )
     
-    # Initialize chatbot
+    # Initialize chatbot (shared, stateless instance; history lives in session_state)
     if 'chatbot' not in st.session_state:
-        st.session_state.chatbot = HealthChatbot()
+        st.session_state.chatbot = get_chatbot()
     
     if 'chat_history' not in st.session_state:
         st.session_state.chat_history = []
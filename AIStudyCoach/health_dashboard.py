@@ -3,12 +3,14 @@ import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 from datetime import datetime, timedelta
-from translator import TranslationManager
+from services import get_translator
+from badge_engine import BadgeEngine
 
 class HealthDashboard:
-    def __init__(self, db_manager):
+    def __init__(self, db_manager, translator=None):
         self.db = db_manager
-        self.translator = TranslationManager()
+        self.translator = translator if translator is not None else get_translator()
+        self.badges = BadgeEngine(db_manager)
     
     def render_dashboard(self, user_id, language='en'):
         """Render the main health dashboard"""
@@ -106,6 +108,7 @@ class HealthDashboard:
                     submitted = st.form_submit_button(self.translator.translate_text("Add Record", language))
                     if submitted and description:
                         self.db.add_health_record(user_id, record_type, description, doctor_name, hospital_name, record_date)
+                        self.check_and_award_badges(user_id)
                         st.session_state.show_record_form = False
                         st.success(self.translator.translate_text("Health record added successfully!", language))
                         st.rerun()
@@ -115,9 +118,6 @@ class HealthDashboard:
         
         # Health Tips
         self.render_health_tips(language)
-        
-        # Check and award badges
-        self.check_and_award_badges(user_id)
     
     def show_vitals_input(self, user_id, language):
         """Show vital signs input form"""
@@ -162,6 +162,7 @@ class HealthDashboard:
             
             if submitted and value > 0:
                 self.db.add_vital_sign(user_id, vital_type, value, unit, measurement_date)
+                self.check_and_award_badges(user_id)
                 st.success(self.translator.translate_text("Vital sign logged successfully!", language))
                 st.rerun()
     
@@ -239,11 +240,8 @@ class HealthDashboard:
             "Take regular breaks from screen time"
         ]
         
-        # Translate tips
-        translated_tips = []
-        for tip in health_tips:
-            translated_tip = self.translator.translate_text(tip, language)
-            translated_tips.append(translated_tip)
+        # Translate tips in one batch
+        translated_tips = self.translator.batch_translate(health_tips, language)
         
         # Show random tip of the day
         import random
@@ -326,23 +324,11 @@ class HealthDashboard:
         return "+5"
     
     def check_and_award_badges(self, user_id):
-        """Check and award badges based on user activity"""
-        records = self.db.get_health_records(user_id)
-        vitals = self.db.get_vital_signs(user_id)
-        documents = self.db.get_user_documents(user_id)
-        
-        # Award badges based on criteria
-        if len(records) >= 1:
-            self.db.add_badge(user_id, "First Health Record")
-        
-        if len(vitals) >= 5:
-            self.db.add_badge(user_id, "Vital Signs Tracker")
-        
-        if len(documents) >= 1:
-            self.db.add_badge(user_id, "Document Uploader")
-        
-        if len(records) >= 10:
-            self.db.add_badge(user_id, "Health Champion")
+        """Award any newly earned badges for this user (call after the user writes data)"""
+        try:
+            self.badges.evaluate([user_id])
+        except Exception as e:
+            print(f"Badge evaluation error: {str(e)}")
     
     def get_badge_emoji(self, badge_name):
         """Get emoji for badge"""
@@ -0,0 +1,188 @@
+"""Precompiled per-language catalogs for static UI strings.
+
+Build step (needs network once, via TranslationManager):
+    python i18n_catalog.py build                   # all of hi/bn/or/ml
+    python i18n_catalog.py build --lang hi
+
+Review workflow:
+    python i18n_catalog.py export-review --lang hi --out hi_review.csv
+    # edit the "translation" column, set "reviewed" to yes
+    python i18n_catalog.py import-review --lang hi hi_review.csv
+
+Catalogs live in ``locales/<lang>.json`` as
+``{source: {"translation": str, "reviewed": bool}}``. Reviewed entries are
+never overwritten by a rebuild. At runtime ``TranslationManager`` checks the
+catalog first, so a hit is a plain dict lookup and only dynamic text goes to
+the network.
+"""
+import ast
+import csv
+import json
+import os
+import threading
+from typing import Dict, Iterable, List, Optional
+
+CATALOG_LANGUAGES = ["hi", "bn", "or", "ml"]
+SOURCE_FILES = ["app.py", "health_dashboard.py", "admin_portal.py"]
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def catalog_dir() -> str:
+    return os.getenv("UI_CATALOG_DIR", os.path.join(BASE_DIR, "locales"))
+
+
+def catalog_path(lang: str) -> str:
+    return os.path.join(catalog_dir(), f"{lang}.json")
+
+
+def extract_strings(paths: Optional[Iterable[str]] = None) -> List[str]:
+    """Collect literal first arguments of every ``*.translate_text(...)`` call."""
+    found = set()
+    for path in paths or [os.path.join(BASE_DIR, f) for f in SOURCE_FILES]:
+        with open(path, encoding="utf-8") as fh:
+            tree = ast.parse(fh.read(), filename=path)
+        for node in ast.walk(tree):
+            if not (isinstance(node, ast.Call) and node.args):
+                continue
+            func = node.func
+            name = func.attr if isinstance(func, ast.Attribute) else getattr(func, "id", None)
+            arg = node.args[0]
+            # f-strings and variables are dynamic content; only plain literals are cataloged
+            if name == "translate_text" and isinstance(arg, ast.Constant) and isinstance(arg.value, str):
+                if arg.value.strip():
+                    found.add(arg.value)
+    return sorted(found)
+
+
+def load_catalog_file(lang: str) -> Dict[str, dict]:
+    try:
+        with open(catalog_path(lang), encoding="utf-8") as fh:
+            return json.load(fh)
+    except FileNotFoundError:
+        return {}
+
+
+def save_catalog_file(lang: str, entries: Dict[str, dict]) -> None:
+    os.makedirs(catalog_dir(), exist_ok=True)
+    tmp = catalog_path(lang) + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump(dict(sorted(entries.items())), fh, ensure_ascii=False, indent=2)
+        fh.write("\n")
+    os.replace(tmp, catalog_path(lang))
+
+
+def build_catalog(lang: str, translator, sources: Optional[List[str]] = None) -> Dict[str, int]:
+    """Translate new/unreviewed strings for one language and drop obsolete machine entries."""
+    sources = sources if sources is not None else extract_strings()
+    existing = load_catalog_file(lang)
+    entries = {src: e for src, e in existing.items() if e.get("reviewed") or src in sources}
+    todo = [src for src in sources if not entries.get(src, {}).get("translation")]
+    translated = translator.batch_translate(todo, lang) if todo else []
+    added = 0
+    for src, text in zip(todo, translated):
+        # translate_text falls back to the source on failure; don't bake that in
+        if text and text != src:
+            entries[src] = {"translation": text, "reviewed": False}
+            added += 1
+    save_catalog_file(lang, entries)
+    return {"sources": len(sources), "added": added, "missing": len(todo) - added, "total": len(entries)}
+
+
+def export_review(lang: str, out_path: str) -> int:
+    entries = load_catalog_file(lang)
+    with open(out_path, "w", encoding="utf-8", newline="") as fh:
+        writer = csv.writer(fh)
+        writer.writerow(["source", "translation", "reviewed"])
+        for src, e in sorted(entries.items()):
+            writer.writerow([src, e.get("translation", ""), "yes" if e.get("reviewed") else "no"])
+    return len(entries)
+
+
+def import_review(lang: str, csv_path: str) -> int:
+    """Apply reviewer edits; edited or explicitly approved rows become ``reviewed``."""
+    entries = load_catalog_file(lang)
+    updated = 0
+    with open(csv_path, encoding="utf-8", newline="") as fh:
+        for row in csv.DictReader(fh):
+            src, text = row.get("source"), (row.get("translation") or "").strip()
+            if not src or not text:
+                continue
+            old = entries.get(src, {})
+            approved = (row.get("reviewed") or "").strip().lower() in ("yes", "y", "true", "1")
+            if text != old.get("translation") or (approved and not old.get("reviewed")):
+                entries[src] = {"translation": text, "reviewed": True}
+                updated += 1
+    save_catalog_file(lang, entries)
+    return updated
+
+
+class UICatalog:
+    """Read-only runtime view: {lang: {source: translation}}, loaded lazily per language."""
+
+    def __init__(self):
+        self._tables: Dict[str, Dict[str, str]] = {}
+        self._lock = threading.Lock()
+
+    def table(self, lang: str) -> Dict[str, str]:
+        table = self._tables.get(lang)
+        if table is None:
+            with self._lock:
+                table = self._tables.get(lang)
+                if table is None:
+                    try:
+                        raw = load_catalog_file(lang)
+                    except Exception as e:
+                        print(f"UI catalog load error ({lang}): {e}")
+                        raw = {}
+                    table = {src: e["translation"] for src, e in raw.items() if e.get("translation")}
+                    self._tables[lang] = table
+        return table
+
+    def lookup(self, text: str, lang: str) -> Optional[str]:
+        return self.table(lang).get(text)
+
+    def reload(self) -> None:
+        with self._lock:
+            self._tables = {}
+
+
+_shared_catalog = UICatalog()
+
+
+def get_ui_catalog() -> UICatalog:
+    return _shared_catalog
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build and review offline UI string catalogs.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("extract", help="List the static UI strings found in the source")
+    p_build = sub.add_parser("build", help="Translate new strings into locales/<lang>.json")
+    p_build.add_argument("--lang", choices=CATALOG_LANGUAGES, action="append")
+    p_export = sub.add_parser("export-review", help="Export a catalog to CSV for human review")
+    p_export.add_argument("--lang", choices=CATALOG_LANGUAGES, required=True)
+    p_export.add_argument("--out", required=True)
+    p_import = sub.add_parser("import-review", help="Import a reviewed CSV back into the catalog")
+    p_import.add_argument("--lang", choices=CATALOG_LANGUAGES, required=True)
+    p_import.add_argument("csv_path")
+    args = parser.parse_args()
+
+    if args.command == "extract":
+        for s in extract_strings():
+            print(s)
+    elif args.command == "build":
+        from translator import TranslationManager
+        translator = TranslationManager()
+        sources = extract_strings()
+        for lang in args.lang or CATALOG_LANGUAGES:
+            print(lang, build_catalog(lang, translator, sources))
+    elif args.command == "export-review":
+        print(f"Exported {export_review(args.lang, args.out)} entries to {args.out}")
+    elif args.command == "import-review":
+        print(f"Updated {import_review(args.lang, args.csv_path)} entries")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""Fast image-quality analysis that picks the OCR preprocessing pipelines.
+
+``measure_quality`` works on a grayscale copy at most ``ANALYSIS_MAX_SIDE``
+pixels long (noise on a native-resolution centre crop, since downsampling
+averages it away) and returns resolution/DPI, contrast, blur (Laplacian
+variance), noise and background uniformity. ``choose_pipelines`` maps those to the one
+or two pipelines likely to help, instead of running every preprocessing
+variant on every image.
+
+Pipeline names are ``[<scale>_]<cleanup>``, e.g. ``upscale_2x_adaptive``;
+``pipeline_steps`` turns a name into (scale, steps) for the OCR analyzer.
+The names match the fixed variant set's, so pass statistics carry over.
+"""
+from typing import List, NamedTuple, Optional, Tuple
+
+from PIL import Image, ImageChops, ImageFilter, ImageOps, ImageStat
+
+ANALYSIS_MAX_SIDE = 800
+NOISE_CROP = 256
+
+# Thresholds, tuned on the downsampled grayscale copy
+LOW_CONTRAST = 100.0     # 1st-99th percentile brightness range
+BLURRY = 1500.0          # Laplacian variance, normalised to full contrast
+NOISY = 4.0              # median |pixel - median3x3(pixel)| at native resolution
+UNEVEN_BACKGROUND = 25.0 # standard deviation of per-tile background brightness
+DARK_BACKGROUND = 100.0  # median brightness below this means light text on dark paper
+
+# Short side (pixels) below which text is usually too small for tesseract
+UPSCALE_2X_BELOW = 800
+UPSCALE_1_5X_BELOW = 1400
+# Scans reporting at least this DPI are never upscaled
+ENOUGH_DPI = 250
+
+SCALES = {"upscale_1_5x": 1.5, "upscale_2x": 2.0}
+CLEANUPS = {
+    "original": (),
+    "gray": ("gray",),
+    "median": ("gray", "median"),
+    "otsu": ("gray", "median", "otsu"),
+    "adaptive": ("gray", "median", "adaptive"),
+    "sharpen": ("gray", "sharpen"),
+    "autocontrast": ("gray", "autocontrast"),
+    "median_autocontrast": ("gray", "median", "autocontrast"),
+    "inverted": ("gray", "autocontrast", "invert"),
+}
+
+
+class ImageQuality(NamedTuple):
+    """Measurements on a 0-255 grayscale; see the thresholds above."""
+    width: int
+    height: int
+    dpi: Optional[float]
+    contrast: float
+    blur: float
+    noise: float
+    brightness: float
+    background: float
+
+
+def pipeline_steps(name: str) -> Tuple[float, Tuple[str, ...]]:
+    """Split a pipeline name into (scale factor, cleanup steps)."""
+    for prefix, factor in SCALES.items():
+        if name == prefix:
+            return factor, ()
+        if name.startswith(prefix + "_"):
+            return factor, CLEANUPS[name[len(prefix) + 1:]]
+    return 1.0, CLEANUPS[name]
+
+
+def _percentile(histogram: List[int], q: float) -> int:
+    target = sum(histogram) * q
+    running = 0
+    for value, count in enumerate(histogram):
+        running += count
+        if running >= target:
+            return value
+    return len(histogram) - 1
+
+
+def _tiles(gray: Image.Image, n: int = 4):
+    w, h = gray.size
+    for i in range(n):
+        for j in range(n):
+            box = (j * w // n, i * h // n, (j + 1) * w // n, (i + 1) * h // n)
+            if box[2] > box[0] and box[3] > box[1]:
+                yield gray.crop(box)
+
+
+def _downsample(image: Image.Image) -> Image.Image:
+    factor = -(-max(image.size) // ANALYSIS_MAX_SIDE)
+    # reduce() can't average palette (P), bilevel or CMYK pixels; those are converted first
+    if image.mode not in ("L", "RGB", "RGBA"):
+        image = ImageOps.grayscale(image)
+    # reduce() box-averages whole blocks, far cheaper than copy() + thumbnail() on a phone photo
+    small = image.reduce(factor) if factor > 1 else image
+    return ImageOps.grayscale(small)
+
+
+def _noise_crop(image: Image.Image) -> Image.Image:
+    w, h = image.size
+    side = min(NOISE_CROP, w, h)
+    left, top = (w - side) // 2, (h - side) // 2
+    return ImageOps.grayscale(image.crop((left, top, left + side, top + side)))
+
+
+def measure_quality(image: Image.Image) -> ImageQuality:
+    """Measure the image on a downsampled grayscale copy; takes a few milliseconds."""
+    gray = _downsample(image)
+    crop = _noise_crop(image)
+    dpi = image.info.get("dpi")
+    dpi = float(dpi[0]) if dpi else None
+    try:
+        import cv2
+        import numpy as np
+        arr = np.asarray(gray, dtype=np.uint8)
+        low, high = np.percentile(arr, (1, 99))
+        contrast = float(high - low)
+        laplacian = float(cv2.Laplacian(arr, cv2.CV_64F).var())
+        crop_arr = np.asarray(crop, dtype=np.uint8)
+        # Median, not mean: text strokes are a minority of pixels, so this is mostly sensor/JPEG noise
+        noise = float(np.median(np.abs(crop_arr.astype(np.int16) - cv2.medianBlur(crop_arr, 3))))
+        brightness = float(np.median(arr))
+        # Paper is the bright end of each tile; its spread across tiles measures shadows and gradients
+        background = float(np.std([
+            np.percentile(tile, 90) for row in np.array_split(arr, 4) for tile in np.array_split(row, 4, axis=1)
+            if tile.size
+        ]))
+    except ImportError:
+        histogram = gray.histogram()
+        contrast = float(_percentile(histogram, 0.99) - _percentile(histogram, 0.01))
+        # Pillow clips filter output to 0..255, so compute a quarter of the Laplacian and scale back
+        kernel = ImageFilter.Kernel((3, 3), [0, 1, 0, 1, -4, 1, 0, 1, 0], scale=4, offset=128)
+        filtered = gray.filter(kernel)
+        # Pillow leaves the 1-pixel border unfiltered; drop it
+        filtered = filtered.crop((1, 1, filtered.width - 1, filtered.height - 1))
+        laplacian = ImageStat.Stat(filtered).var[0] * 16
+        noise = float(_percentile(ImageChops.difference(crop, crop.filter(ImageFilter.MedianFilter(3))).histogram(), 0.5))
+        brightness = float(_percentile(histogram, 0.5))
+        tile_backgrounds = [_percentile(tile.histogram(), 0.9) for tile in _tiles(gray)]
+        mean = sum(tile_backgrounds) / len(tile_backgrounds)
+        background = (sum((b - mean) ** 2 for b in tile_backgrounds) / len(tile_backgrounds)) ** 0.5
+    # Faint text has weak edges even when in focus, so judge sharpness as if contrast were full
+    blur = laplacian * (255.0 / max(contrast, 1.0)) ** 2
+    return ImageQuality(image.width, image.height, dpi, contrast, blur, noise, brightness, background)
+
+
+def _scale_prefix(quality: ImageQuality) -> Optional[str]:
+    if quality.dpi and quality.dpi >= ENOUGH_DPI:
+        return None
+    short_side = min(quality.width, quality.height)
+    if short_side < UPSCALE_2X_BELOW:
+        return "upscale_2x"
+    if short_side < UPSCALE_1_5X_BELOW:
+        return "upscale_1_5x"
+    return None
+
+
+def choose_pipelines(quality: ImageQuality, max_pipelines: int = 2) -> List[str]:
+    """Pick up to ``max_pipelines`` pipeline names, most important problem first."""
+    cleanups = []
+    if quality.brightness < DARK_BACKGROUND:
+        cleanups.append("inverted")
+    if quality.background > UNEVEN_BACKGROUND:
+        cleanups.append("adaptive")
+    if quality.noise > NOISY:
+        cleanups.append("otsu")
+    if quality.contrast < LOW_CONTRAST:
+        cleanups.append("median_autocontrast" if quality.noise > NOISY else "autocontrast")
+    if quality.blur < BLURRY:
+        cleanups.append("sharpen")
+    scale = _scale_prefix(quality)
+    if not cleanups:
+        # Clean input: the image as-is (upscaled if small) is the best bet
+        return [scale or "original"]
+    names = [f"{scale}_{c}" if scale else c for c in cleanups]
+    return names[:max(1, max_pipelines)]
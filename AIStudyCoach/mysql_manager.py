@@ -2,13 +2,14 @@ import os
 import mysql.connector
 from mysql.connector import pooling
 from datetime import datetime, date
+from change_feed import TRACKED_TABLES, TRIGGER_OPS, trigger_name
 
 
 class MySQLDatabaseManager:
     """MySQL-backed DB manager that mirrors the SQLite DatabaseManager API.
 
     Env vars used (with defaults for localhost dev):
-      DB_HOST, DB_PORT, DB_USER, DB_PASSWORD, DB_NAME
+      DB_HOST, DB_PORT, DB_USER, DB_PASSWORD, DB_NAME, CHANGE_FEED_SETTLE_SECONDS
     """
 
     def __init__(self):
@@ -17,6 +18,8 @@ class MySQLDatabaseManager:
         self.user = os.getenv("DB_USER", "root")
         self.password = os.getenv("DB_PASSWORD", "")
         self.database = os.getenv("DB_NAME", "arogya_mitra")
+        # Longest a writing transaction may stay open and still have its change_log rows delivered
+        self.change_settle_seconds = int(os.getenv("CHANGE_FEED_SETTLE_SECONDS", "30"))
 
         # Ensure target database exists before creating pool
         self._ensure_database_exists()
@@ -182,9 +185,52 @@ class MySQLDatabaseManager:
                 CONSTRAINT fk_clinical_note_metrics_note FOREIGN KEY (note_id) REFERENCES clinical_notes(id) ON DELETE CASCADE
             ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
         """)
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS change_log (
+                seq BIGINT AUTO_INCREMENT PRIMARY KEY,
+                table_name VARCHAR(64) NOT NULL,
+                row_id INT NOT NULL,
+                op VARCHAR(8) NOT NULL,
+                user_id INT NULL,
+                changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                INDEX ix_change_log_table_seq (table_name, seq)
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+        """)
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS change_log_checkpoints (
+                consumer VARCHAR(128) PRIMARY KEY,
+                last_seq BIGINT NOT NULL DEFAULT 0,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+        """)
+        self._ensure_change_triggers(cur)
         cur.close()
         conn.close()
 
+    def _ensure_change_triggers(self, cur):
+        """Create the change_log triggers that are missing from this schema."""
+        cur.execute(
+            "SELECT TRIGGER_NAME FROM information_schema.TRIGGERS WHERE TRIGGER_SCHEMA=%s",
+            (self.database,),
+        )
+        existing = {r[0] for r in cur.fetchall()}
+        for table, user_expr in TRACKED_TABLES.items():
+            for event, op, row in TRIGGER_OPS:
+                name = trigger_name(table, op)
+                if name in existing:
+                    continue
+                try:
+                    cur.execute(
+                        f"""
+                        CREATE TRIGGER {name} AFTER {event} ON {table} FOR EACH ROW
+                        INSERT INTO change_log (table_name, row_id, op, user_id)
+                        VALUES ('{table}', {row}.id, '{op}', {user_expr.format(row=row)})
+                        """
+                    )
+                except Exception as exc:
+                    # Usually missing TRIGGER privilege; the app keeps working without CDC
+                    print(f"Could not create change_log trigger {name}: {exc}")
+
     # ---- helpers ----
     @staticmethod
     def _norm_date(d):
@@ -373,6 +419,31 @@ class MySQLDatabaseManager:
         cur.close()
         conn.close()
 
+    def save_prescription_analyses(self, rows):
+        rows = list(rows)
+        if not rows:
+            return 0
+        conn = self._conn()
+        cur = conn.cursor()
+        try:
+            # The pool autocommits; one explicit transaction for the whole batch
+            cur.execute("START TRANSACTION")
+            cur.executemany(
+                """
+                INSERT INTO prescription_analysis (user_id, filename, extracted_text, medications)
+                VALUES (%s, %s, %s, %s)
+                """,
+                rows,
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cur.close()
+            conn.close()
+        return len(rows)
+
     def add_badge(self, user_id, badge_name):
         conn = self._conn()
         cur = conn.cursor()
@@ -633,4 +704,186 @@ class MySQLDatabaseManager:
         conn.close()
         return row
 
+    # Streaming export helpers
+    def _iter_rows(self, query, params=(), batch_size=200):
+        """Yield rows of a query batch by batch instead of fetching them all at once."""
+        conn = self._conn()
+        cur = conn.cursor()
+        try:
+            cur.execute(query, params)
+            while True:
+                rows = cur.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield from rows
+        finally:
+            try:
+                # An abandoned unbuffered cursor must be drained before it can be closed
+                cur.fetchall()
+            except Exception:
+                pass
+            cur.close()
+            conn.close()
+
+    def iter_health_records(self, user_id):
+        return self._iter_rows(
+            """
+            SELECT id, record_date, record_type, description, doctor_name, hospital_name, created_at
+            FROM health_records WHERE user_id=%s ORDER BY id
+            """,
+            (user_id,),
+        )
+
+    def iter_vital_signs(self, user_id):
+        return self._iter_rows(
+            """
+            SELECT id, measurement_type, value, unit, measurement_date
+            FROM vital_signs WHERE user_id=%s ORDER BY id
+            """,
+            (user_id,),
+        )
+
+    def iter_document_meta(self, user_id):
+        return self._iter_rows(
+            """
+            SELECT id, filename, document_type, file_type, upload_date, LENGTH(file_data)
+            FROM documents WHERE user_id=%s ORDER BY id
+            """,
+            (user_id,),
+        )
+
+    def iter_prescription_documents(self, after_id=0):
+        return self._iter_rows(
+            """
+            SELECT id, user_id, filename, file_type
+            FROM documents WHERE document_type='Prescription' AND id > %s ORDER BY id
+            """,
+            (after_id,),
+        )
+
+    def iter_prescription_analyses(self, user_id):
+        return self._iter_rows(
+            """
+            SELECT id, filename, extracted_text, medications, analysis_date
+            FROM prescription_analysis WHERE user_id=%s ORDER BY id
+            """,
+            (user_id,),
+        )
+
+    def iter_clinical_notes(self, user_id):
+        return self._iter_rows(
+            """
+            SELECT n.id, n.transcript, n.source_language, n.created_at, (n.audio_b64 IS NOT NULL),
+                   s.chief_complaint, s.symptoms, s.medications, s.findings,
+                   s.plan, s.follow_up, s.additional_notes, s.model, s.created_at
+            FROM clinical_notes n
+            LEFT JOIN clinical_note_summaries s ON s.id = (
+                SELECT MAX(id) FROM clinical_note_summaries WHERE note_id = n.id
+            )
+            WHERE n.user_id=%s ORDER BY n.id
+            """,
+            (user_id,),
+        )
+
+    def _iter_column_slices(self, table, column, row_id, step):
+        offset = 1
+        while True:
+            conn = self._conn()
+            cur = conn.cursor()
+            cur.execute(
+                f"SELECT SUBSTRING({column}, %s, %s) FROM {table} WHERE id=%s",
+                (offset, step, row_id),
+            )
+            row = cur.fetchone()
+            cur.close()
+            conn.close()
+            if not row or not row[0]:
+                break
+            yield row[0]
+            if len(row[0]) < step:
+                break
+            offset += step
+
+    def iter_document_bytes(self, document_id, chunk_size=64 * 1024):
+        # Documents are stored as raw LONGBLOB here, so slices are already bytes
+        for part in self._iter_column_slices("documents", "file_data", document_id, chunk_size):
+            yield bytes(part)
+
+    def iter_clinical_audio_bytes(self, note_id, chunk_size=64 * 1024):
+        import base64
+        step = max(4, (chunk_size * 4 // 3) // 4 * 4)
+        for part in self._iter_column_slices("clinical_notes", "audio_b64", note_id, step):
+            yield base64.b64decode(part)
+
+    # Change log (CDC) consumer API
+    def get_changes_since(self, seq, limit=500, tables=None):
+        """Return change_log rows after ``seq``, oldest first, stopping below the settle watermark.
+
+        InnoDB hands out AUTO_INCREMENT values at insert time, not at commit,
+        so a row of a still-open transaction can become visible after rows
+        with a higher seq. Only rows below the first one written less than
+        ``change_settle_seconds`` ago are returned; any gap below them
+        belongs to a transaction that has had that long to commit.
+        """
+        query = """
+            SELECT seq, table_name, row_id, op, user_id, changed_at
+            FROM change_log WHERE seq > %s AND seq < COALESCE((
+                SELECT MIN(seq) FROM change_log
+                WHERE seq > %s AND changed_at > NOW() - INTERVAL %s SECOND
+            ), 9223372036854775807)
+        """
+        params = [seq, seq, int(self.change_settle_seconds)]
+        if tables:
+            query += f" AND table_name IN ({', '.join(['%s'] * len(tables))})"
+            params.extend(tables)
+        query += " ORDER BY seq LIMIT %s"
+        params.append(int(limit))
+        conn = self._conn()
+        cur = conn.cursor()
+        cur.execute(query, tuple(params))
+        rows = cur.fetchall()
+        cur.close()
+        conn.close()
+        return rows
+
+    def get_latest_change_seq(self):
+        conn = self._conn()
+        cur = conn.cursor()
+        cur.execute("SELECT COALESCE(MAX(seq), 0) FROM change_log")
+        seq = cur.fetchone()[0]
+        cur.close()
+        conn.close()
+        return seq
+
+    def get_change_checkpoint(self, consumer):
+        conn = self._conn()
+        cur = conn.cursor()
+        cur.execute("SELECT last_seq FROM change_log_checkpoints WHERE consumer=%s", (consumer,))
+        row = cur.fetchone()
+        cur.close()
+        conn.close()
+        return row[0] if row else 0
+
+    def set_change_checkpoint(self, consumer, seq):
+        conn = self._conn()
+        cur = conn.cursor()
+        cur.execute(
+            """
+            INSERT INTO change_log_checkpoints (consumer, last_seq) VALUES (%s, %s)
+            ON DUPLICATE KEY UPDATE last_seq=VALUES(last_seq)
+            """,
+            (consumer, seq),
+        )
+        cur.close()
+        conn.close()
 
+    def prune_change_log(self):
+        conn = self._conn()
+        cur = conn.cursor()
+        cur.execute("SELECT COALESCE(MIN(last_seq), 0) FROM change_log_checkpoints")
+        floor = cur.fetchone()[0]
+        cur.execute("DELETE FROM change_log WHERE seq <= %s", (floor,))
+        deleted = cur.rowcount
+        cur.close()
+        conn.close()
+        return deleted
@@ -1,69 +1,157 @@
-import pytesseract
 from PIL import Image, ImageFilter, ImageOps
 import re
 import json
 import os
-from translator import TranslationManager
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from services import get_translator
+from ocr_stats import get_ocr_stats
+from image_quality import choose_pipelines, measure_quality, pipeline_steps
+from ocr_cache import get_ocr_result_cache, image_hash
+from ocr_engine import get_ocr_engine
+from text_regions import text_canvas
+from pdf_pages import iter_page_results, merge_pages
+from drug_lexicon import get_drug_lexicon, normalize_term
+
+
+def _first_chars(pattern):
+    """Character-class body matching the first character of ``pattern``, or None if unknown."""
+    body = pattern.lstrip('(')
+    if body.startswith(r'\d'):
+        return '0-9'
+    if body[:1].isalpha():
+        return body[0]
+    return None
+
+
+def _build_line_scanner(fields, flags=0):
+    """Compile (field, patterns) pairs into one scanner, plus each pattern on its own.
+
+    The scanner matches at every position where any of the patterns matches.
+    There, group ``<field>`` holds the match of the field's first pattern that
+    matches at that position. Lookaheads don't consume text, so overlapping
+    matches of different fields (or of one field's patterns) are all seen.
+    """
+    gate, lookaheads, starts = [], [], set()
+    for field, patterns in fields:
+        gate.extend(f"(?:{p})" for p in patterns)
+        starts.update(_first_chars(p) for p in patterns)
+        lookaheads.append(f"(?:(?=(?P<{field}>{'|'.join(patterns)})))?")
+    # A one-character test first: the regex engine skips most positions without trying every pattern
+    prefilter = "" if None in starts else f"(?=[{''.join(sorted(starts))}])"
+    # Ends by consuming the current character, so the next match is looked for from the next one
+    regex = prefilter + f"(?={'|'.join(gate)})" + "".join(lookaheads) + "(?s:.)"
+    return re.compile(regex, flags), {field: [re.compile(p, flags) for p in patterns] for field, patterns in fields}
+
 
 class PrescriptionAnalyzer:
-    def __init__(self):
-        self.translator = TranslationManager()
-        self.last_error = None
-        # Auto-configure Tesseract on Windows if not on PATH
-        try:
-            if os.name == "nt":
-                configured = False
-                # 1) Respect explicit env override if provided
-                env_path = os.environ.get("TESSERACT_PATH")
-                if env_path and os.path.exists(env_path):
-                    pytesseract.pytesseract.tesseract_cmd = env_path
-                    configured = True
-                # 2) Fall back to common default install location
-                default_path = r"C:\\Program Files\\Tesseract-OCR\\tesseract.exe"
-                if not configured and os.path.exists(default_path):
-                    pytesseract.pytesseract.tesseract_cmd = default_path
-                    configured = True
-                # No exception if not found; UI will surface guidance
-        except Exception:
-            # Silently ignore auto-config failures; runtime checks will report
-            pass
-        
-        # Common medication patterns
-        self.dosage_patterns = [
-            r'(\d+)\s*mg',
-            r'(\d+)\s*ml',
-            r'(\d+)\s*tablet[s]?',
-            r'(\d+)\s*capsule[s]?',
-            r'(\d+-\d+-\d+)',  # Dosage format like 1-0-1
-        ]
-        
-        self.frequency_patterns = [
-            r'once\s+daily',
-            r'twice\s+daily',
-            r'thrice\s+daily',
-            r'\d+\s+times?\s+(?:a\s+)?day',
-            r'before\s+meals?',
-            r'after\s+meals?',
-            r'with\s+meals?',
-            r'empty\s+stomach',
-            r'at\s+bedtime',
-            r'morning',
-            r'evening',
-        ]
-        
-        self.duration_patterns = [
-            r'for\s+(\d+)\s+days?',
-            r'for\s+(\d+)\s+weeks?',
-            r'for\s+(\d+)\s+months?',
-            r'continue\s+for\s+(\d+)',
-        ]
+    # Tesseract configurations tried on every preprocessed variant, in priority order
+    OCR_CONFIGS = [
+        ("psm6_block", "--oem 3 --psm 6 -c preserve_interword_spaces=1"),
+        ("psm4_columns", "--oem 3 --psm 4 -c preserve_interword_spaces=1"),
+        ("psm7_line_lstm", "--oem 1 --psm 7"),
+        ("psm11_sparse", "--oem 3 --psm 11"),  # sparse text
+        ("psm12_sparse_osd", "--oem 3 --psm 12"),  # sparse text with OSD
+    ]
+    # Bump when preprocessing, OCR settings or medication parsing change; invalidates cached results
+    PIPELINE_VERSION = "7"
+    # Fixed preprocessing set used when adaptive selection is off (see image_quality)
+    FULL_PIPELINES = ["original", "upscale_1_5x", "upscale_2x", "gray", "median", "otsu", "adaptive", "sharpen"]
+    FALLBACK_PIPELINES = ["original", "upscale_1_5x", "upscale_2x", "gray", "median_autocontrast", "inverted"]
+
+    # Common medication patterns; for each field the first pattern (in list order) that matches wins
+    DOSAGE_PATTERNS = [
+        r'(\d+)\s*mg',
+        r'(\d+)\s*ml',
+        r'(\d+)\s*tablet[s]?',
+        r'(\d+)\s*capsule[s]?',
+        r'(\d+-\d+-\d+)',  # Dosage format like 1-0-1
+    ]
+    FREQUENCY_PATTERNS = [
+        r'once\s+daily',
+        r'twice\s+daily',
+        r'thrice\s+daily',
+        r'\d+\s+times?\s+(?:a\s+)?day',
+        r'before\s+meals?',
+        r'after\s+meals?',
+        r'with\s+meals?',
+        r'empty\s+stomach',
+        r'at\s+bedtime',
+        r'morning',
+        r'evening',
+    ]
+    DURATION_PATTERNS = [
+        r'for\s+(\d+)\s+days?',
+        r'for\s+(\d+)\s+weeks?',
+        r'for\s+(\d+)\s+months?',
+        r'continue\s+for\s+(\d+)',
+    ]
+    INSTRUCTION_KEYWORDS = [
+        'before meals', 'after meals', 'with meals', 'empty stomach',
+        'with water', 'do not crush', 'take with food', 'avoid alcohol'
+    ]
+    FORM_KEYWORDS = [
+        'tab', 'tabs', 'tablet', 'tablets',
+        'cap', 'caps', 'capsule', 'capsules',
+        'syrup', 'drops', 'drop', 'ointment', 'cream', 'gel'
+    ]
+    UNIT_SUFFIXES = ('mg', 'mcg', 'g', 'ml', 'iu')
+    # Every per-line field in one pass (see scan_line)
+    SCANNER_FIELDS = [
+        ('dosage', DOSAGE_PATTERNS),
+        ('frequency', FREQUENCY_PATTERNS),
+        ('duration', DURATION_PATTERNS),
+        ('instructions', [re.escape(k) for k in INSTRUCTION_KEYWORDS]),
+        ('strength', [r'\d+\s*(?:mg|mcg|g|ml|iu)']),
+        ('form', [re.escape(k) for k in FORM_KEYWORDS]),
+    ]
+    # ASCII lines are lower-cased and scanned case-sensitively (much faster); others use IGNORECASE
+    LINE_SCANNER, FIELD_REGEXES = _build_line_scanner(SCANNER_FIELDS)
+    UNICODE_LINE_SCANNER, UNICODE_FIELD_REGEXES = _build_line_scanner(SCANNER_FIELDS, re.IGNORECASE)
+    # Printed-table rows: "1) TAB. PARACETAMOL 500 mg ..."
+    ROW_REGEX = re.compile(r"^\s*(?:\d+[\).]\s*)?(?:TAB\.?|CAP\.?|SYRUP|DROPS|OINT\.?|CREAM|GEL)?\s*([A-Za-z][A-Za-z0-9_-]{3,})(?:\s+(\d+\s*(?:mg|mcg|g|ml|iu)))?", re.IGNORECASE)
+    NAME_STRENGTH_REGEX = re.compile(r"([A-Za-z][A-Za-z0-9-]{3,})\s+(\d+\s*(?:mg|mcg|g|ml|iu))", re.IGNORECASE)
+    TOKEN_SPLIT_REGEX = re.compile(r'[^a-zA-Z0-9+-]+')
+    COLUMN_SPLIT_REGEX = re.compile(r"\s{2,}")
+    NUMBERING_REGEX = re.compile(r"^\d+[).]\s*")
+    FORM_MARKER_REGEX = re.compile(r"\b(?:tab\.?|caps?\.?|syrup|drops|ointment|cream|gel)\b\.?", re.IGNORECASE)
+    NAME_WORD_REGEX = re.compile(r'^[a-zA-Z][a-zA-Z0-9]*$')
+    HEADER_TOKENS = frozenset({"chief", "diagnosis", "advice", "after", "weight", "closed", "medicine", "medicines"})
+    # Lines naming drugs that are not being prescribed: complaints, diagnoses, allergies, history, "avoid ..."
+    NON_PRESCRIPTION_REGEX = re.compile(r"\b(?:chief|complaints?|c/o|diagnos[ie]s|allerg\w*|avoid\w*|history|h/o|known case)\b")
+    # Words worth a spelling lookup: a letter first, OCR may have put a digit or two inside
+    SPELLING_TOKEN_REGEX = re.compile(r"\b[a-z][a-z0-9]{4,}\b")
+
+    def __init__(self, translator=None):
+        self.translator = translator if translator is not None else get_translator()
+        # Variant x config grid runs concurrently; each task is one tesseract subprocess
+        self.max_workers = int(os.getenv("OCR_MAX_WORKERS", str(os.cpu_count() or 2)))
+        self.task_timeout = float(os.getenv("OCR_TASK_TIMEOUT", "20"))
+        self.total_timeout = float(os.getenv("OCR_TOTAL_TIMEOUT", "90"))
+        if self.max_workers > 1:
+            # Parallelism comes from the pool; keep each tesseract single-threaded to avoid oversubscription
+            os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+        # A pass scoring at least this (see score_ocr) ends the search early
+        self.score_threshold = float(os.getenv("OCR_SCORE_THRESHOLD", "0.8"))
+        self.pass_stats = get_ocr_stats()
+        # Measure each image and run only the 1-2 preprocessing pipelines it needs
+        self.adaptive_preprocess = os.getenv("OCR_ADAPTIVE_PREPROCESS", "1") != "0"
+        self.result_cache = get_ocr_result_cache()
+        # OCR a canvas of the detected text blocks instead of the whole page
+        self.use_text_regions = os.getenv("OCR_TEXT_REGIONS", "1") != "0"
+        # In-process tesserocr pool when available, otherwise pytesseract (also configures the Windows path)
+        self.engine = get_ocr_engine()
+        # Generic and brand names matched in one pass (see drug_lexicon); None falls back to medication_info
+        self.drug_lexicon = get_drug_lexicon() if os.getenv("DRUG_LEXICON", "1") != "0" else None
+        # Misread names ("Paracetam0l") on prescription rows corrected to lexicon names scoring above this confidence
+        self.drug_spelling = os.getenv("DRUG_SPELLING", "1") != "0"
+        self.drug_spelling_min_confidence = float(os.getenv("DRUG_SPELLING_MIN_CONFIDENCE", "0.8"))
         
         # Dosage forms and stopwords to reduce false positives
-        self.form_keywords = [
-            'tab', 'tabs', 'tablet', 'tablets',
-            'cap', 'caps', 'capsule', 'capsules',
-            'syrup', 'drops', 'drop', 'ointment', 'cream', 'gel'
-        ]
+        self.form_keywords = self.FORM_KEYWORDS
         self.stopwords = set([
             'prescription','rx','sig','follow','stare','note','date','name','age','sex','m','f','address','doctor','physician',
             'dose','dosage','advice','morning','evening','night','daily','day','days'
@@ -86,138 +174,442 @@ class PrescriptionAnalyzer:
             'calcium': 'Mineral supplement for bone health',
             'iron': 'Supplement for anemia',
         }
+        
+        # Words expected on a prescription; their share of an OCR pass is a quality signal
+        self.ocr_lexicon = set(self.form_keywords) | {
+            'rx', 'dr', 'mg', 'ml', 'mcg', 'once', 'twice', 'thrice', 'daily', 'day', 'days', 'week', 'weeks',
+            'morning', 'evening', 'night', 'bedtime', 'before', 'after', 'with', 'meal', 'meals', 'food',
+            'empty', 'stomach', 'times', 'for', 'take', 'continue', 'sos', 'syp', 'inj',
+        }
+        for name in self.medication_info:
+            self.ocr_lexicon.update(name.split())
+        if self.drug_lexicon is not None:
+            for term in self.drug_lexicon.term_names():
+                self.ocr_lexicon.update(word for word in term.split() if word.isalpha())
     
     def _preprocess(self, image: Image.Image) -> list[Image.Image]:
         """Generate a set of enhanced variants to improve OCR robustness."""
+        return [variant for _, variant in self._preprocess_named(image)]
+
+    def _preprocess_named(self, image: Image.Image, pipelines=None) -> list[tuple[str, Image.Image]]:
+        """Variants for the named pipelines (default: the full fixed set), tagged with their names."""
+        if pipelines is None:
+            pipelines = self.FULL_PIPELINES if self._has_cv2() else self.FALLBACK_PIPELINES
         variants = []
-        # Always include upscaled versions (helps printed forms)
+        for name in pipelines:
+            try:
+                variants.append((name, self._run_pipeline(image, name)))
+            except Exception as e:
+                print(f"Preprocessing '{name}' failed: {e}")
+        if not variants:
+            variants.append(("original", image))
+        return variants
+
+    @staticmethod
+    def _has_cv2():
         try:
-            up1 = image.resize((int(image.width*1.5), int(image.height*1.5)))
-            up2 = image.resize((image.width*2, image.height*2))
-            variants.extend([up1, up2])
-        except Exception:
-            pass
+            import cv2  # noqa: F401
+            import numpy  # noqa: F401
+            return True
+        except ImportError:
+            return False
+
+    def _run_pipeline(self, image: Image.Image, name: str) -> Image.Image:
+        """Apply a pipeline (see image_quality.pipeline_steps): grayscale first, then scale, then cleanup."""
+        scale, steps = pipeline_steps(name)
+        if "gray" in steps:
+            image = ImageOps.grayscale(image)
+        if scale != 1.0:
+            image = image.resize((int(image.width * scale), int(image.height * scale)))
+        steps = [step for step in steps if step != "gray"]
+        if not steps:
+            return image
         try:
             import cv2
             import numpy as np
-            # Convert PIL -> OpenCV
-            img_cv = cv2.cvtColor(np.array(image.convert('RGB')), cv2.COLOR_RGB2BGR)
-            gray = cv2.cvtColor(img_cv, cv2.COLOR_BGR2GRAY)
-            # Denoise and threshold variants
-            blur = cv2.medianBlur(gray, 3)
-            _, th_otsu = cv2.threshold(blur, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-            th_adapt = cv2.adaptiveThreshold(blur, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 31, 11)
-            # Sharpen a bit
-            kernel = np.array([[0, -1, 0], [-1, 5, -1], [0, -1, 0]], dtype=np.float32)
-            sharp = cv2.filter2D(gray, -1, kernel)
-            # Back to PIL
-            for arr in [gray, blur, th_otsu, th_adapt, sharp]:
-                variants.append(Image.fromarray(arr))
-        except Exception:
-            # Fallback: Pillow-only variants
-            g = ImageOps.grayscale(image)
-            variants.extend([
-                g,
-                ImageOps.autocontrast(g.filter(ImageFilter.MedianFilter(size=3))),
-                ImageOps.invert(ImageOps.autocontrast(g)),
-            ])
-        # Also include original
-        variants.insert(0, image)
-        return variants
+        except ImportError:
+            # Pillow-only equivalents
+            for step in steps:
+                if step == "median":
+                    image = image.filter(ImageFilter.MedianFilter(size=3))
+                elif step == "autocontrast":
+                    image = ImageOps.autocontrast(image)
+                elif step == "invert":
+                    image = ImageOps.invert(image)
+                elif step == "sharpen":
+                    image = image.filter(ImageFilter.SHARPEN)
+                elif step in ("otsu", "adaptive"):
+                    image = ImageOps.autocontrast(image).point(lambda p: 255 if p > 127 else 0)
+            return image
+        arr = np.array(image)
+        for step in steps:
+            if step == "median":
+                arr = cv2.medianBlur(arr, 3)
+            elif step == "otsu":
+                _, arr = cv2.threshold(arr, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+            elif step == "adaptive":
+                arr = cv2.adaptiveThreshold(arr, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 31, 11)
+            elif step == "sharpen":
+                kernel = np.array([[0, -1, 0], [-1, 5, -1], [0, -1, 0]], dtype=np.float32)
+                arr = cv2.filter2D(arr, -1, kernel)
+            elif step == "autocontrast":
+                arr = cv2.normalize(arr, None, 0, 255, cv2.NORM_MINMAX)
+            elif step == "invert":
+                arr = cv2.bitwise_not(arr)
+        return Image.fromarray(arr)
 
-    def analyze_prescription(self, image, target_language='en', tesseract_lang='eng'):
-        """Analyze prescription image using OCR"""
+    def choose_pipelines(self, image: Image.Image) -> list[str]:
+        """Pipelines for this image: picked from its measured quality unless adaptive mode is off."""
+        if not self.adaptive_preprocess:
+            return self.FULL_PIPELINES if self._has_cv2() else self.FALLBACK_PIPELINES
         try:
-            # Ensure Tesseract is available
-            self.last_error = None
-            try:
-                _ = pytesseract.get_tesseract_version()
-            except Exception as te:
-                self.last_error = f"Tesseract OCR not available: {te}"
-                return None
-            # Try multiple preprocessing variants and PSM configs
-            variants = self._preprocess(image)
-            configs = [
-                "--oem 3 --psm 6 -c preserve_interword_spaces=1",
-                "--oem 3 --psm 4 -c preserve_interword_spaces=1",
-                "--oem 1 --psm 7",
-                "--oem 3 --psm 11",  # sparse text
-                "--oem 3 --psm 12",  # sparse text with OSD
-            ]
-            extracted_text = ""
-            for variant in variants:
-                for cfg in configs:
+            return choose_pipelines(measure_quality(image))
+        except Exception as e:
+            print(f"Image quality analysis failed: {e}")
+            return self.FULL_PIPELINES if self._has_cv2() else self.FALLBACK_PIPELINES
+
+    def _ocr_task(self, source, tesseract_lang, config):
+        """One tesseract pass on an image or PNG path; returns (text, mean word confidence 0..1, word count, seconds)."""
+        started = time.perf_counter()
+        # Both engines raise RuntimeError once the timeout passes
+        data = self.engine.image_to_data(source, tesseract_lang, config, timeout=self.task_timeout)
+        lines = {}
+        conf_sum = weight = 0.0
+        for i, word in enumerate(data["text"]):
+            word = (word or "").strip()
+            conf = float(data["conf"][i])
+            if not word or conf < 0:
+                continue
+            key = (data["block_num"][i], data["par_num"][i], data["line_num"][i])
+            lines.setdefault(key, []).append((word, data["left"][i], data["width"][i]))
+            # Weight by length so stray one-character hits don't dominate
+            conf_sum += conf * len(word)
+            weight += len(word)
+        text = self._layout_text(lines, "preserve_interword_spaces=1" in config)
+        confidence = conf_sum / weight / 100 if weight else 0.0
+        return text, confidence, sum(len(w) for w in lines.values()), time.perf_counter() - started
+
+    @staticmethod
+    def _layout_text(lines, preserve_spaces):
+        """Page text from word boxes laid out the way ``image_to_string`` prints it.
+
+        ``lines`` maps (block, par, line) to (word, left, width) tuples.
+        Paragraphs are separated by a blank line and, with
+        ``preserve_spaces``, the gap between two words becomes as many spaces
+        as fit the line's average character width, so table columns stay
+        apart for the dosage and table parsers.
+        """
+        out = []
+        paragraph = None
+        for key, words in sorted(lines.items()):
+            if paragraph is not None and key[:2] != paragraph:
+                out.append("")
+            paragraph = key[:2]
+            if not preserve_spaces:
+                out.append(" ".join(w for w, _, _ in words))
+                continue
+            char_width = sum(width for _, _, width in words) / max(1, sum(len(w) for w, _, _ in words))
+            parts = [words[0][0]]
+            for (_, left, width), (word, next_left, _) in zip(words, words[1:]):
+                gap = next_left - (left + width)
+                parts.append(" " * max(1, round(gap / char_width)) if char_width else " ")
+                parts.append(word)
+            out.append("".join(parts))
+        return "\n".join(out)
+
+    def score_ocr(self, text, confidence):
+        """Quality of a pass in 0..1: tesseract word confidence plus prescription-lexicon hits."""
+        tokens = re.findall(r'[a-z]{2,}', text.lower())
+        if not tokens:
+            return 0.0
+        lexicon_ratio = sum(1 for t in tokens if t in self.ocr_lexicon) / len(tokens)
+        # A third of the words being prescription vocabulary is already a strong signal
+        return 0.7 * confidence + 0.3 * min(1.0, lexicon_ratio * 3)
+
+    def _ocr_grid(self, variants, tesseract_lang, configs=None, stop=None, ranked=True):
+        """OCR (variant, config) pairs on a bounded pool, best historical performers first.
+        
+        At most ``max_workers`` passes are in flight; the next one is only
+        submitted when a pass finishes, so ``stop(run)`` returning True (or
+        the ``total_timeout`` deadline) leaves at most the running passes to
+        finish on their own per-task timeout. In-memory engines get the
+        variant images directly. For the subprocess engine each variant is
+        written to a temp PNG the first time a task needs it and every task
+        passes the path; the directory is removed once the last running pass
+        is done with it. Returns the finished runs in grid order as dicts
+        with order, variant, config, text, confidence, words, score and
+        seconds.
+        """
+        configs = configs or self.OCR_CONFIGS
+        passes = [
+            (vi * len(configs) + ci, vname, cname)
+            for vi, (vname, _) in enumerate(variants)
+            for ci, (cname, _) in enumerate(configs)
+        ]
+        if ranked:
+            passes = self.pass_stats.rank(tesseract_lang, passes)
+        workers = max(1, self.max_workers)
+        tmpdir = None if self.engine.in_memory else tempfile.mkdtemp(prefix="ocr_grid_")
+        pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ocr")
+        paths = {}
+        path_locks = {vi: threading.Lock() for vi in range(len(variants))}
+        
+        def task(vi, cfg):
+            if self.engine.in_memory:
+                return self._ocr_task(variants[vi][1], tesseract_lang, cfg)
+            with path_locks[vi]:
+                if vi not in paths:
+                    name, variant = variants[vi]
+                    path = os.path.join(tmpdir, f"{vi}_{name}.png")
+                    variant.save(path)
+                    paths[vi] = path
+            return self._ocr_task(paths[vi], tesseract_lang, cfg)
+        
+        runs = []
+        pending = iter(passes)
+        in_flight = {}
+        
+        def fill():
+            # Keep the pool busy without queueing passes an early stop would only cancel
+            for order, vname, cname in pending:
+                vi, ci = divmod(order, len(configs))
+                in_flight[pool.submit(task, vi, configs[ci][1])] = (order, vname, cname)
+                if len(in_flight) >= workers:
+                    return
+        
+        deadline = time.monotonic() + self.total_timeout if self.total_timeout > 0 else None
+        try:
+            fill()
+            stopped = False
+            while in_flight and not stopped:
+                remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+                done, _ = wait(in_flight, timeout=remaining, return_when=FIRST_COMPLETED)
+                if not done:
+                    print(f"OCR grid stopped after {self.total_timeout}s; using the best result so far")
+                    break
+                for future in done:
+                    order, vname, cname = in_flight.pop(future)
                     try:
-                        text_try = pytesseract.image_to_string(variant, lang=tesseract_lang, config=cfg)
-                        if len(text_try.strip()) > len(extracted_text.strip()):
-                            extracted_text = text_try
+                        text, confidence, words, seconds = future.result()
                     except Exception:
                         continue
+                    run = {"order": order, "variant": vname, "config": cname, "text": text,
+                           "confidence": confidence, "words": words,
+                           "score": self.score_ocr(text, confidence), "seconds": seconds}
+                    runs.append(run)
+                    if stop is not None and stop(run):
+                        stopped = True
+                if not stopped:
+                    fill()
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+            if tmpdir:
+                self._remove_when_done(tmpdir, [f for f in in_flight if not f.done()])
+        runs.sort(key=lambda r: r["order"])
+        return runs
+
+    @staticmethod
+    def _remove_when_done(tmpdir, futures):
+        """Delete ``tmpdir`` now, or once the last of ``futures`` (passes still reading it) finishes."""
+        if not futures:
+            shutil.rmtree(tmpdir, ignore_errors=True)
+            return
+        lock = threading.Lock()
+        left = [len(futures)]
+        
+        def finished(_):
+            with lock:
+                left[0] -= 1
+                last = left[0] == 0
+            if last:
+                shutil.rmtree(tmpdir, ignore_errors=True)
+        
+        for future in futures:
+            future.add_done_callback(finished)
+
+    @staticmethod
+    def _best_run(runs):
+        """Highest quality score wins; ties go to the earliest (variant, config) in grid order."""
+        if not runs:
+            return None
+        return max(runs, key=lambda r: (r["score"], -r["order"]))
+
+    def _search(self, image, pipelines, tesseract_lang):
+        """Search variants x PSM configs, historically best first, until one pass is good enough."""
+        variants = self._preprocess_named(image, pipelines)
+        runs = self._ocr_grid(variants, tesseract_lang, stop=self._good_enough)
+        best = self._best_run(runs)
+        self.pass_stats.record(tesseract_lang, runs, best)
+        return best
+
+    def _text_canvas(self, image):
+        """Text blocks of the page stacked in reading order, or None to OCR the full page."""
+        if not self.use_text_regions:
+            return None
+        try:
+            return text_canvas(image)
+        except Exception as e:
+            print(f"Text region detection failed: {e}")
+            return None
+
+    def _good_enough(self, run):
+        # A handful of words is needed so a single confident token can't end the search
+        return run["score"] >= self.score_threshold and run["words"] >= 3
+
+    def result_cache_version(self):
+        """Cache key version: the pipeline plus the parser settings that change the cached medications."""
+        if self.drug_lexicon is None:
+            return f"{self.PIPELINE_VERSION}|lexicon=off"
+        lexicon = getattr(self.drug_lexicon, "fingerprint", "on")
+        spelling = f">{self.drug_spelling_min_confidence:g}" if self.drug_spelling else "off"
+        return f"{self.PIPELINE_VERSION}|lexicon={lexicon}|spelling={spelling}"
+
+    def analyze_prescription(self, image, target_language='en', tesseract_lang='eng'):
+        """Analyze prescription image using OCR.
+
+        Returns ``(result, error)``: the result dict, or None with the reason
+        when available. The analyzer is shared between sessions and threads,
+        so the error travels with the call instead of living on ``self``.
+        """
+        try:
+            # Same pixels, language and pipeline: reuse the English result, only translate again
+            digest = image_hash(image)
+            cache_version = self.result_cache_version()
+            cached = self.result_cache.get(digest, tesseract_lang, cache_version)
+            if cached is not None:
+                return self._localize_result(cached['extracted_text'], cached['medications'], target_language), None
+            
+            # Ensure Tesseract is available (probed once per process)
+            info = self.engine.info()
+            if not info["available"]:
+                return None, f"Tesseract OCR not available: {info['error']}"
+            # Pipelines are chosen from the full page, whose size says how small the text is
+            pipelines = self.choose_pipelines(image)
+            canvas = self._text_canvas(image)
+            best = self._search(canvas if canvas is not None else image, pipelines, tesseract_lang)
+            if canvas is not None and (best is None or not self._good_enough(best)):
+                # Detection may have missed text (faint or handwritten); give the full page a chance
+                full = self._search(image, pipelines, tesseract_lang)
+                best = self._best_run([run for run in (best, full) if run])
+            extracted_text = best["text"] if best else ""
             
             if not extracted_text.strip():
-                return None
+                return None, "No text found in image"
             
             # Parse medications from text
             medications = self.parse_medications(extracted_text.lower())
+            self.result_cache.put(digest, tesseract_lang, cache_version, extracted_text, medications)
             
-            # Translate if needed
-            if target_language != 'en':
-                extracted_text = self.translator.translate_text(extracted_text, target_language)
-                for med in medications:
-                    if med['instructions']:
-                        med['instructions'] = self.translator.translate_text(med['instructions'], target_language)
-            
-            return {
-                'extracted_text': extracted_text,
-                'medications': medications
-            }
+            return self._localize_result(extracted_text, medications, target_language), None
         
         except Exception as e:
             print(f"OCR Analysis Error: {str(e)}")
-            return None
+            return None, str(e)
 
-    def is_tesseract_available(self):
-        """Check if local Tesseract binary is available"""
+    def analyze_pdf(self, pdf_bytes, target_language='en', tesseract_lang='eng', on_page=None):
+        """Analyze a multi-page PDF; ``on_page(page_result)`` is called as each page is ready.
+
+        Returns ``(result, error)`` like ``analyze_prescription``.
+        """
         try:
-            _ = pytesseract.get_tesseract_version()
-            return True
+            pages = []
+            for page in iter_page_results(pdf_bytes, self, tesseract_lang=tesseract_lang):
+                pages.append(page)
+                if on_page is not None:
+                    on_page(page)
+            merged = merge_pages(pages)
+            if not merged['extracted_text'].strip():
+                errors = [p.error for p in pages if p.error]
+                return None, errors[0] if errors else "No text found in PDF"
+            result = self._localize_result(merged['extracted_text'], merged['medications'], target_language)
+            result['pages'] = [{'page': p.index + 1, 'source': p.source, 'seconds': round(p.seconds, 2)} for p in pages]
+            return result, None
         except Exception as e:
-            self.last_error = str(e)
-            return False
+            print(f"PDF Analysis Error: {str(e)}")
+            return None, str(e)
+
+    def _localize_result(self, extracted_text, medications, target_language):
+        """Build the result dict, translating text and instructions when needed."""
+        if target_language != 'en':
+            # Full text and every non-empty instruction go out as one batch
+            indexes = [i for i, med in enumerate(medications) if med['instructions']]
+            texts = [extracted_text] + [medications[i]['instructions'] for i in indexes]
+            translated = self.translator.batch_translate(texts, target_language)
+            extracted_text = translated[0]
+            medications = [dict(med) for med in medications]
+            for i, instruction in zip(indexes, translated[1:]):
+                medications[i]['instructions'] = instruction
+        
+        return {
+            'extracted_text': extracted_text,
+            'medications': medications
+        }
+
+    def is_tesseract_available(self):
+        """Check if local Tesseract binary is available"""
+        return self.engine.info()["available"]
     
     def parse_medications(self, text):
         """Parse medications and their details from extracted text"""
         medications = []
         lines = text.split('\n')
-        
-        row_regex = re.compile(r"^\s*(?:\d+[\).]\s*)?(?:TAB\.?|CAP\.?|SYRUP|DROPS|OINT\.?|CREAM|GEL)?\s*([A-Za-z][A-Za-z0-9_-]{3,})(?:\s+(\d+\s*(?:mg|mcg|g|ml|iu)))?", re.IGNORECASE)
+        # Known generic/brand names of the whole text in one pass; the first one on each line names it
+        mentions = {}
+        if self.drug_lexicon is not None:
+            for match in self.drug_lexicon.find_all(text):
+                mentions.setdefault(match.line, match.entry)
 
         # Try to focus on the prescription table between known headers
         in_table = False
-        for line in lines:
+        guessed_dose = None
+        not_prescribed = set()
+        # (line, known drug, scanned fields, inside the table) of the lines that survive the filters
+        rows = []
+        for index, line in enumerate(lines):
             line = line.strip()
             if not line:
                 continue
+            low = line.lower()
+            entry = mentions.get(index)
+            if self.drug_lexicon is not None and self.NON_PRESCRIPTION_REGEX.search(low):
+                # Whatever drug such a line names, it is not a prescription (nor for the global pass)
+                not_prescribed.add(index)
+                continue
+            fields = self.scan_line(line) if entry is not None else None
+            # A known drug keeps a header-like line only with a dose, strength, form or schedule next to it
+            prescribed = fields is not None and self.has_prescription_context(fields)
             # Drop obvious non-medicine headers in printed prescriptions
-            tokens = set(line.lower().split())
-            if tokens & {"chief","diagnosis","advice","after","weight","closed","medicine","medicines"}:
+            if not prescribed and not self.HEADER_TOKENS.isdisjoint(low.split()):
                 continue
-            low = line.lower()
-            if any(h in low for h in ["medicine name", "medicine", "medicines"]):
+            if "medicine" in low:
                 in_table = True
-                continue
+                if not prescribed:
+                    continue
             if any(h in low for h in ["advice", "follow up", "follow-up", "followup"]):
                 in_table = False
-            
-            
-            # Prefer extracting around strengths/forms
-            medication_name = self.extract_medication_candidate(line)
+            rows.append((line, entry, fields if fields is not None else self.scan_line(line), in_table))
+
+        # Misread drug names are only looked for on unnamed lines that read like a prescription row
+        correctable = [i for i, (line, entry, fields, table) in enumerate(rows)
+                       if entry is None and (table or fields['form'] or fields['strength'])]
+        corrections = self.correct_drug_names("\n".join(rows[i][0] for i in correctable))
+        correctable = set(correctable)
+
+        for row_index, (line, entry, fields, in_table) in enumerate(rows):
+            corrected_from = None
+            if row_index in correctable and corrections:
+                # The first misread drug name on the line
+                token = next((t for t in self.SPELLING_TOKEN_REGEX.findall(line.lower()) if t in corrections), None)
+                if token:
+                    entry, corrected_from = corrections[token][0], corrections[token][1].token
+            # Prefer a known drug name, then extracting around strengths/forms
+            medication_name = entry.name if entry else self.extract_medication_candidate(line, fields)
             if not medication_name:
-                # Fallback to dictionary/heuristic
-                medication_name = self.extract_medication_name(line)
+                # Fallback to dictionary/heuristic; the lexicon pass already looked for known names
+                medication_name = self.extract_medication_name(line) if self.drug_lexicon is None else self._first_word_name(line)
             # Printed-table style match
             if not medication_name:
-                mrow = row_regex.match(line)
+                mrow = self.ROW_REGEX.match(line)
                 if mrow:
                     medication_name = mrow.group(1).title()
                     guessed_dose = mrow.group(2)
@@ -226,42 +618,55 @@ class PrescriptionAnalyzer:
             # If inside table, try simple column split heuristic
             if not medication_name and in_table:
                 # Lines often look like: "1) TAB. ACBCIXIMAB          1 Morning          8 Days"
-                parts = re.split(r"\s{2,}", line)
-                if len(parts) >= 1:
-                    # Strip leading numbering and dosage form markers
-                    first = re.sub(r"^\d+[).]\s*", "", parts[0])
-                    first = re.sub(r"\b(?:tab\.?|caps?\.?|syrup|drops|ointment|cream|gel)\b\.?", "", first, flags=re.IGNORECASE).strip()
-                    # Ignore obvious non-medicine words
-                    if first and first.lower() not in self.stopwords and len(first) > 3:
-                        medication_name = first.title()
+                parts = self.COLUMN_SPLIT_REGEX.split(line)
+                # Strip leading numbering and dosage form markers
+                first = self.NUMBERING_REGEX.sub("", parts[0])
+                first = self.FORM_MARKER_REGEX.sub("", first).strip()
+                # Ignore obvious non-medicine words
+                if first and first.lower() not in self.stopwords and len(first) > 3:
+                    medication_name = first.title()
                 if not guessed_dose and len(parts) >= 2:
                     guessed_dose = self.extract_dosage(parts[0]) or self.extract_dosage(parts[1])
             if medication_name:
+                generic, info = self.medication_details(medication_name, entry)
                 medication = {
                     'name': medication_name,
-                    'dosage': self.extract_dosage(line) or (guessed_dose if 'guessed_dose' in locals() else None),
-                    'frequency': self.extract_frequency(line),
-                    'duration': self.extract_duration(line),
-                    'instructions': self.extract_instructions(line),
-                    'info': self.medication_info.get(medication_name, 'Medication information not available')
+                    'generic': generic,
+                    # A dose guessed from an earlier row still applies when this one has none
+                    'dosage': fields['dosage'] or guessed_dose,
+                    'frequency': fields['frequency'],
+                    'duration': fields['duration'],
+                    'instructions': fields['instructions'],
+                    'info': info,
+                    'corrected_from': corrected_from
                 }
                 medications.append(medication)
-        
+
         # Global pass: also look for Name + Strength patterns across full text when line parsing is weak
-        joined = " \n".join([ln for ln in lines if ln.strip()])
-        for m in re.finditer(r"([A-Za-z][A-Za-z0-9-]{3,})\s+(\d+\s*(?:mg|mcg|g|ml|iu))", joined, flags=re.IGNORECASE):
+        joined = " \n".join([ln for i, ln in enumerate(lines) if ln.strip() and i not in not_prescribed])
+        seen = {mi['name'].lower() for mi in medications}
+        if self.drug_lexicon is not None:
+            # "Crocin Advance 500 mg" was already found; don't add "Advance" as well
+            seen.update(word for mi in medications for word in normalize_term(mi['name']).split())
+        for m in self.NAME_STRENGTH_REGEX.finditer(joined):
             name = m.group(1).title()
-            if name.lower() in self.stopwords:
+            entry, corrected_from = corrections.get(m.group(1).lower(), (None, None))
+            if entry is not None:
+                name, corrected_from = entry.name, m.group(1)
+            if name.lower() in self.stopwords or name.lower() in seen:
                 continue
-            if not any(mi['name'].lower() == name.lower() for mi in medications):
-                medications.append({
-                    'name': name,
-                    'dosage': m.group(2),
-                    'frequency': None,
-                    'duration': None,
-                    'instructions': None,
-                    'info': self.medication_info.get(name.lower(), 'Medication information not available')
-                })
+            seen.add(name.lower())
+            generic, info = self.medication_details(name.lower(), entry)
+            medications.append({
+                'name': name,
+                'generic': generic,
+                'dosage': m.group(2),
+                'frequency': None,
+                'duration': None,
+                'instructions': None,
+                'info': info,
+                'corrected_from': corrected_from
+            })
 
         # Final filtering: keep items that have a plausible name and at least one detail
         filtered: list[dict] = []
@@ -273,27 +678,67 @@ class PrescriptionAnalyzer:
                 filtered.append(med)
         return filtered
 
-    def extract_medication_candidate(self, text: str):
+    @staticmethod
+    def has_prescription_context(fields):
+        """True if a scanned line carries a dose, strength, dosage form, frequency or duration."""
+        return bool(fields['dosage'] or fields['strength'] or fields['form'] or fields['frequency'] or fields['duration'])
+
+    def scan_line(self, text):
+        """Dosage, frequency, duration, instructions, first strength and form presence in one pass.
+
+        Same results as trying each field's patterns in turn with ``re.search``
+        and IGNORECASE: a field keeps the leftmost match of its first matching
+        pattern, in the line's original case.
+        """
+        fields = {'dosage': None, 'frequency': None, 'duration': None, 'instructions': None,
+                  'strength': None, 'form': False}
+        if text.isascii():
+            haystack, scanner, regexes = text.lower(), self.LINE_SCANNER, self.FIELD_REGEXES
+        else:
+            haystack, scanner, regexes = text, self.UNICODE_LINE_SCANNER, self.UNICODE_FIELD_REGEXES
+        ranks = {}
+        instructions = set()
+        for m in scanner.finditer(haystack):
+            dosage, frequency, duration, instruction, strength, form = m.group(
+                'dosage', 'frequency', 'duration', 'instructions', 'strength', 'form')
+            for field, value in (('dosage', dosage), ('frequency', frequency), ('duration', duration)):
+                if value is None or ranks.get(field) == 0:
+                    continue
+                start = m.start(field)
+                # Which pattern matched here: the first one in list order that matches at this position
+                rank = next(i for i, regex in enumerate(regexes[field]) if regex.match(haystack, start))
+                if rank < ranks.get(field, len(regexes[field])):
+                    ranks[field] = rank
+                    fields[field] = text[start:m.end(field)]
+            if instruction is not None:
+                instructions.add(instruction.lower())
+            if strength is not None and fields['strength'] is None:
+                fields['strength'] = text[m.start('strength'):m.end('strength')]
+            if form is not None:
+                fields['form'] = True
+        if instructions:
+            fields['instructions'] = ', '.join(k for k in self.INSTRUCTION_KEYWORDS if k in instructions)
+        return fields
+
+    def extract_medication_candidate(self, text: str, fields=None):
         """Try to extract a medication name using units/forms context and filter stopwords."""
-        text_low = text.lower()
-        # Skip lines that are obviously non-med lines
-        if any(sw in text_low.split() for sw in self.stopwords):
-            pass  # do not early return; might still contain a valid line
+        if fields is None:
+            fields = self.scan_line(text)
         # Strength/units
-        unit_match = re.search(r'(\d+\s*(?:mg|mcg|g|ml|iu))', text_low)
-        form_present = any(f in text_low for f in self.form_keywords)
-        if unit_match or form_present:
+        strength = fields['strength']
+        if strength or fields['form']:
             # Take up to three tokens before the first unit/form keyword as candidate name
-            tokens = re.split(r'[^a-zA-Z0-9+-]+', text)
+            tokens = self.TOKEN_SPLIT_REGEX.split(text)
             # find index of token containing unit/form
             idx = None
             for i, tok in enumerate(tokens):
-                if re.search(r'(?:mg|mcg|g|ml|iu)$', tok.lower()) or tok.lower() in self.form_keywords:
+                tok_low = tok.lower()
+                if tok_low.endswith(self.UNIT_SUFFIXES) or tok_low in self.form_keywords:
                     idx = i
                     break
-            if idx is None and unit_match:
+            if idx is None and strength:
                 # find index of token where the numeric part appears
-                num = unit_match.group(1).split()[0]
+                num = strength.lower().split()[0]
                 for i, tok in enumerate(tokens):
                     if num in tok:
                         idx = i
@@ -308,64 +753,79 @@ class PrescriptionAnalyzer:
                     if cand_low not in self.stopwords and len(cand) > 3:
                         return cand.title()
         return None
-    
+
     def extract_medication_name(self, text):
         """Extract medication name from text"""
         # Look for known medications
-        for med_name in self.medication_info.keys():
-            if med_name in text.lower():
-                return med_name.title()
-        
+        if self.drug_lexicon is not None:
+            found = self.drug_lexicon.find_all(text)
+            if found:
+                return found[0].entry.name
+        else:
+            text_low = text.lower()
+            for med_name in self.medication_info.keys():
+                if med_name in text_low:
+                    return med_name.title()
+        return self._first_word_name(text)
+
+    def _first_word_name(self, text):
         # Try to extract potential medication names (usually at the beginning of line)
         words = text.split()
         if words:
             # If first word looks like a medication name (contains letters and possibly numbers)
             first_word = words[0].strip('.,()[]')
-            if re.match(r'^[a-zA-Z][a-zA-Z0-9]*$', first_word) and len(first_word) > 3:
+            if self.NAME_WORD_REGEX.match(first_word) and len(first_word) > 3:
                 return first_word.title()
-        
+
         return None
-    
+
     def extract_dosage(self, text):
         """Extract dosage information"""
-        for pattern in self.dosage_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                return match.group(0)
-        return None
-    
+        return self.scan_line(text)['dosage']
+
     def extract_frequency(self, text):
         """Extract frequency information"""
-        for pattern in self.frequency_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                return match.group(0)
-        return None
-    
+        return self.scan_line(text)['frequency']
+
     def extract_duration(self, text):
         """Extract duration information"""
-        for pattern in self.duration_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                return match.group(0)
-        return None
-    
+        return self.scan_line(text)['duration']
+
     def extract_instructions(self, text):
         """Extract additional instructions"""
-        instruction_keywords = [
-            'before meals', 'after meals', 'with meals', 'empty stomach',
-            'with water', 'do not crush', 'take with food', 'avoid alcohol'
-        ]
-        
-        found_instructions = []
-        for keyword in instruction_keywords:
-            if keyword in text.lower():
-                found_instructions.append(keyword)
-        
-        return ', '.join(found_instructions) if found_instructions else None
+        return self.scan_line(text)['instructions']
     
+    def correct_drug_names(self, text):
+        """{token: (entry, correction)} for the words of ``text`` that are misread drug names.
+
+        ``parse_medications`` passes only the prescription rows of a page (a
+        dose form, a strength or a table row, and no known drug): corrected
+        everywhere, ordinary words such as "vomiting" or "lasik" turn into
+        drugs. Those words go to the spelling index in one batch, each distinct
+        word once; known words (exact drug names included) are never looked up.
+        """
+        if self.drug_lexicon is None or not self.drug_spelling:
+            return {}
+        tokens = [t for t in self.SPELLING_TOKEN_REGEX.findall(text.lower())
+                  if t not in self.ocr_lexicon and t not in self.stopwords and sum(ch.isdigit() for ch in t) <= 2]
+        return self.drug_lexicon.correct(tokens, self.drug_spelling_min_confidence)
+
+    def medication_details(self, name, entry=None):
+        """(generic, info) for a medication; brands resolve to their generics through the drug lexicon."""
+        if entry is None and self.drug_lexicon is not None:
+            entry = self.drug_lexicon.lookup(name)
+        if entry is not None:
+            info = self.drug_lexicon.info(entry) or 'Medication information not available'
+            return self.drug_lexicon.generic_names(entry), info
+        return None, self.medication_info.get(name, 'Medication information not available')
+
     def get_medication_warnings(self, medication_name):
         """Get warnings for specific medications"""
+        if self.drug_lexicon is not None:
+            entry = self.drug_lexicon.lookup(medication_name)
+            if entry is not None:
+                return self.drug_lexicon.warning(entry)
+        
         warnings = {
             'paracetamol': 'Do not exceed 4g per day. Avoid alcohol.',
             'ibuprofen': 'Take with food. May cause stomach irritation.',
@@ -0,0 +1,225 @@
+"""Resumable bulk OCR of archived prescription scans.
+
+    python ocr_backfill.py --documents                     # every stored Prescription document
+    python ocr_backfill.py --dir scans/ --user-id 12       # a folder of images/PDFs for one user
+
+Images and PDFs are OCR'd and parsed on a worker pool (one scan per worker,
+each scan's own pass search kept serial) and the ``prescription_analysis``
+rows are written ``--batch-size`` at a time in one transaction. After every
+committed batch the JSON checkpoint records which items are done, so an
+interrupted run (Ctrl+C, crash, reboot) picks up where it stopped without
+duplicating rows. Failures are recorded there too and skipped on the next
+run unless ``--retry-failed`` is given.
+"""
+import io
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from PIL import Image
+
+from pdf_pages import is_pdf
+
+SCAN_EXTENSIONS = {".jpg", ".jpeg", ".png", ".tif", ".tiff", ".bmp", ".webp", ".pdf"}
+DEFAULT_CHECKPOINT = "ocr_backfill_checkpoint.json"
+
+
+@dataclass(frozen=True)
+class BackfillItem:
+    """One scan to process; ``key`` identifies it across runs."""
+    key: str
+    user_id: int
+    filename: str
+    path: Optional[str] = None
+    document_id: Optional[int] = None
+
+
+def directory_items(root: str, user_id: int) -> Iterator[BackfillItem]:
+    """Image and PDF files under ``root``, in a stable (sorted) order."""
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for name in sorted(filenames):
+            if os.path.splitext(name)[1].lower() in SCAN_EXTENSIONS:
+                path = os.path.abspath(os.path.join(dirpath, name))
+                yield BackfillItem(f"file:{path}", user_id, name, path=path)
+
+
+def document_items(db) -> Iterator[BackfillItem]:
+    """Stored documents of type Prescription, oldest first."""
+    for doc_id, user_id, filename, _file_type in db.iter_prescription_documents():
+        yield BackfillItem(f"doc:{doc_id}", user_id, filename, document_id=doc_id)
+
+
+class Checkpoint:
+    """Done/failed item keys, persisted as JSON with an atomic replace."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.done: set = set()
+        self.failed: Dict[str, str] = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.done = set(data.get("done", []))
+            self.failed = dict(data.get("failed", {}))
+
+    def save(self) -> None:
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"done": sorted(self.done), "failed": self.failed, "saved_at": time.time()}, f)
+        os.replace(tmp, self.path)
+
+
+class BackfillJob:
+    def __init__(self, db, analyzer, checkpoint: Checkpoint, workers: int = 2, batch_size: int = 50,
+                 tesseract_lang: str = "eng", retry_failed: bool = False, report_every: int = 25):
+        self.db = db
+        self.analyzer = analyzer
+        self.checkpoint = checkpoint
+        self.workers = max(1, workers)
+        self.batch_size = max(1, batch_size)
+        self.tesseract_lang = tesseract_lang
+        self.retry_failed = retry_failed
+        self.report_every = report_every
+        self._batch: List[Tuple[BackfillItem, tuple]] = []
+        self.succeeded = 0
+        self.failed = 0
+        self.skipped = 0
+
+    def _load_bytes(self, item: BackfillItem) -> bytes:
+        if item.path:
+            with open(item.path, "rb") as f:
+                return f.read()
+        return b"".join(self.db.iter_document_bytes(item.document_id))
+
+    def _process(self, item: BackfillItem) -> tuple:
+        data = self._load_bytes(item)
+        if is_pdf(data):
+            result, error = self.analyzer.analyze_pdf(data, 'en', tesseract_lang=self.tesseract_lang)
+        else:
+            image = Image.open(io.BytesIO(data))
+            image.load()
+            result, error = self.analyzer.analyze_prescription(image, 'en', tesseract_lang=self.tesseract_lang)
+        if not result:
+            raise RuntimeError(error or "no text found")
+        # Same storage format as the Analyze Prescription page
+        return (item.user_id, item.filename, result['extracted_text'], str(result['medications']))
+
+    def _flush(self) -> None:
+        if self._batch:
+            self.db.save_prescription_analyses([row for _, row in self._batch])
+            for item, _ in self._batch:
+                self.checkpoint.done.add(item.key)
+                self.checkpoint.failed.pop(item.key, None)
+            self._batch = []
+        # Only now are these items safe to skip on the next run
+        self.checkpoint.save()
+
+    def _collect(self, future, item: BackfillItem) -> None:
+        try:
+            row = future.result()
+        except Exception as e:
+            self.failed += 1
+            self.checkpoint.failed[item.key] = str(e)
+            print(f"Failed {item.filename}: {e}")
+            return
+        self.succeeded += 1
+        self._batch.append((item, row))
+        if len(self._batch) >= self.batch_size:
+            self._flush()
+
+    def run(self, items: Iterable[BackfillItem]) -> dict:
+        started = time.time()
+        pending: Dict[object, BackfillItem] = {}
+        interrupted = False
+        last_report = 0
+        pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="backfill")
+
+        def drain(block: bool):
+            nonlocal last_report
+            finished, _ = wait(list(pending), timeout=None if block else 0, return_when=FIRST_COMPLETED)
+            for future in finished:
+                self._collect(future, pending.pop(future))
+            processed = self.succeeded + self.failed
+            if self.report_every and processed - last_report >= self.report_every:
+                last_report = processed
+                rate = processed / max(time.time() - started, 1e-9)
+                print(f"{processed} processed ({self.failed} failed, {self.skipped} skipped), {rate:.2f} scans/s")
+
+        try:
+            for item in items:
+                if item.key in self.checkpoint.done or (item.key in self.checkpoint.failed and not self.retry_failed):
+                    self.skipped += 1
+                    continue
+                # Bounded window: scans are loaded by the workers, never queued up in memory
+                while len(pending) >= self.workers * 2:
+                    drain(block=True)
+                pending[pool.submit(self._process, item)] = item
+            while pending:
+                drain(block=True)
+        except KeyboardInterrupt:
+            interrupted = True
+            print("Interrupted; finishing running scans and saving the checkpoint...")
+        finally:
+            # Queued scans are dropped; running ones finish and are kept
+            pool.shutdown(wait=True, cancel_futures=True)
+            for future, item in list(pending.items()):
+                if future.done() and not future.cancelled():
+                    self._collect(future, item)
+            self._flush()
+
+        seconds = time.time() - started
+        processed = self.succeeded + self.failed
+        return {
+            "processed": processed,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "skipped": self.skipped,
+            "seconds": round(seconds, 2),
+            "scans_per_second": round(processed / seconds, 3) if seconds > 0 else 0.0,
+            "interrupted": interrupted,
+        }
+
+
+def main():
+    import argparse
+    from services import get_db_manager, get_ocr_analyzer
+
+    parser = argparse.ArgumentParser(description="OCR archived prescription scans into prescription_analysis.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--documents", action="store_true", help="Process stored documents of type Prescription")
+    source.add_argument("--dir", help="Process image and PDF files under this directory")
+    parser.add_argument("--user-id", type=int, help="Owner of the scans in --dir")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2, help="Scans processed in parallel")
+    parser.add_argument("--batch-size", type=int, default=50, help="Rows written per transaction")
+    parser.add_argument("--lang", default="eng", help="Tesseract language, e.g. eng or eng+hin")
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT, help="Progress file used to resume")
+    parser.add_argument("--retry-failed", action="store_true", help="Retry items that failed in earlier runs")
+    args = parser.parse_args()
+    if args.dir and args.user_id is None:
+        parser.error("--dir needs --user-id")
+
+    db = get_db_manager()
+    analyzer = get_ocr_analyzer()
+    info = analyzer.engine.info()
+    if not info["available"]:
+        print(f"Tesseract OCR not available: {info['error']}")
+        return 1
+    # Parallelism comes from the scans; one tesseract at a time per scan
+    analyzer.max_workers = 1
+
+    items = document_items(db) if args.documents else directory_items(args.dir, args.user_id)
+    job = BackfillJob(db, analyzer, Checkpoint(args.checkpoint), workers=args.workers,
+                      batch_size=args.batch_size, tesseract_lang=args.lang, retry_failed=args.retry_failed)
+    report = job.run(items)
+    print(json.dumps(report, indent=2))
+    if report["failed"]:
+        print(f"{report['failed']} failure(s) recorded in {args.checkpoint}; rerun with --retry-failed to retry them")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,558 @@
+"""OCR accuracy and latency benchmark on synthetic and real prescription images.
+
+    python ocr_benchmark.py --out base.json                    # synthetic corpus
+    python ocr_benchmark.py --scans scans/ --out run.json      # plus real scans with ground truth
+    python ocr_benchmark.py --grid --out run.json              # also every preprocessing variant x PSM config
+    python ocr_benchmark.py --compare base.json run.json       # what changed between two runs
+    python ocr_benchmark.py --save-images corpus/              # write the synthetic corpus as a scans folder
+
+Synthetic prescriptions are rendered with PIL from a seeded generator, so
+the same seed and fonts give the same pixels. Each one varies font, layout
+(numbered list or ruled table), noise, skew and blur. Its text and
+medication list are known exactly.
+
+Real scans are image files in ``--scans``. Each needs a sidecar
+``<name>.json`` with ``{"text": ..., "medications": [...]}``, or a
+``<name>.txt`` holding the text only (that scan then gets no medication
+metrics).
+
+Every image goes through the stages of ``analyze_prescription`` one at a
+time, each timed on its own:
+
+- pipeline choice;
+- text-region detection;
+- preprocessing (per variant);
+- the OCR search (per pass);
+- medication parsing.
+
+The result cache and the pass-history ranking are left out so runs are
+reproducible.
+
+The JSON report holds:
+
+- CER/WER of the extracted text;
+- medication precision/recall (matched on the drug's first word);
+- mean seconds per stage;
+- all of the above broken down per degradation, per preprocessing variant
+  and per variant/config pass;
+- the per-sample detail.
+
+``--compare`` prints the differences between two reports. It exits with 1
+when accuracy dropped by more than ``--tolerance``.
+"""
+import json
+import os
+import platform
+import random
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+from PIL import Image, ImageDraw, ImageFilter, ImageFont
+
+from drug_lexicon import normalize_term
+
+try:
+    import jiwer
+except ImportError:
+    jiwer = None
+
+REPORT_FORMAT = 1
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".tif", ".tiff", ".bmp", ".webp"}
+FONT_DIRS = ["/usr/share/fonts", "/usr/local/share/fonts", os.path.expanduser("~/.fonts"),
+             "/Library/Fonts", "/System/Library/Fonts", r"C:\Windows\Fonts"]
+FONT_FILES = ["DejaVuSans.ttf", "DejaVuSerif.ttf", "DejaVuSansMono.ttf", "LiberationSans-Regular.ttf",
+              "LiberationSerif-Regular.ttf", "LiberationMono-Regular.ttf", "arial.ttf", "times.ttf", "cour.ttf",
+              "Arial.ttf", "Times New Roman.ttf", "Courier New.ttf"]
+
+# (form, name, strength) rows; every name is in the seed drug lexicon
+MEDICINES = [
+    ("Tab", "Dolo", "650 mg"), ("Tab", "Pan-D", ""), ("Cap", "Amoxicillin", "500 mg"),
+    ("Tab", "Azithromycin", "500 mg"), ("Syrup", "Ascoril", "10 ml"), ("Tab", "Metformin", "500 mg"),
+    ("Tab", "Cetirizine", "10 mg"), ("Tab", "Montair LC", ""), ("Cap", "Omeprazole", "20 mg"),
+    ("Tab", "Augmentin", "625 mg"), ("Tab", "Paracetamol", "500 mg"), ("Tab", "Ibuprofen", "400 mg"),
+    ("Tab", "Atorvastatin", "10 mg"), ("Tab", "Amlodipine", "5 mg"), ("Tab", "Telma", "40 mg"),
+    ("Tab", "Allegra", "120 mg"), ("Tab", "Zifi", "200 mg"), ("Tab", "Shelcal", "500 mg"),
+]
+FREQUENCIES = ["once daily", "twice daily", "thrice daily", "1-0-1", "1-1-1", "at bedtime"]
+DURATIONS = ["for 3 days", "for 5 days", "for 7 days", "for 10 days", "for 1 month"]
+INSTRUCTIONS = ["after food", "before food", "with water", ""]
+DOCTORS = ["Dr. A. Sharma, MBBS, MD", "Dr. R. Iyer, MBBS", "Dr. S. Banerjee, MD (Medicine)", "Dr. P. Nair, MBBS"]
+CLINICS = ["City Care Clinic, Pune", "Sunrise Hospital, Kochi", "Lifeline Clinic, Kolkata", "Apollo Health Centre, Chennai"]
+PATIENTS = ["Ramesh Kumar", "Sunita Devi", "Anil Verma", "Meena Pillai", "Farhan Ali"]
+NOISE_LEVELS = {"none": 0.0, "light": 0.004, "heavy": 0.015}
+SKEWS = [0.0, 1.5, -1.5, 4.0, -4.0]
+BLURS = [0.0, 0.8, 1.5]
+
+
+class Sample(NamedTuple):
+    name: str
+    image: Image.Image
+    text: str                              # ground truth
+    medications: Optional[List[str]]       # ground truth names; None when only the text is known
+    tags: Dict[str, str]
+
+
+def find_fonts(extra: Sequence[str] = ()) -> Dict[str, str]:
+    """{font name: path} of the benchmark fonts installed here, plus ``extra`` font files."""
+    wanted = {name.lower() for name in FONT_FILES}
+    fonts = {}
+    for root in FONT_DIRS:
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames.sort()
+            for filename in sorted(filenames):
+                if filename.lower() in wanted:
+                    fonts.setdefault(os.path.splitext(filename)[0], os.path.join(dirpath, filename))
+    for path in extra:
+        fonts[os.path.splitext(os.path.basename(path))[0]] = path
+    return dict(sorted(fonts.items()))
+
+
+def _load_font(path: Optional[str], size: int):
+    # Pillow's bundled font scales too, so the benchmark runs without any installed font
+    return ImageFont.truetype(path, size) if path else ImageFont.load_default(size=size)
+
+
+def _prescription(rng: random.Random):
+    """(header lines, medicine rows as cell lists, footer lines, expected medication names)."""
+    header = [rng.choice(DOCTORS), rng.choice(CLINICS),
+              f"Patient: {rng.choice(PATIENTS)}   Age: {rng.randint(18, 80)}",
+              f"Date: {rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/20{rng.randint(20, 25)}", "Rx"]
+    rows, names = [], []
+    for form, name, strength in rng.sample(MEDICINES, rng.randint(2, 5)):
+        medicine = " ".join(part for part in (form, name, strength) if part)
+        rows.append([medicine, rng.choice(FREQUENCIES), rng.choice(DURATIONS), rng.choice(INSTRUCTIONS)])
+        names.append(name)
+    footer = ["Advice: drink plenty of water", "Review after one week"]
+    return header, rows, footer, names
+
+
+def render_prescription(rng: random.Random, font_path: Optional[str], layout: str, noise: str,
+                        skew: float, blur: float):
+    """Image and ground-truth text of one synthetic prescription."""
+    header, rows, footer, names = _prescription(rng)
+    size = rng.choice([22, 26, 30])
+    font = _load_font(font_path, size)
+    line_height = int(size * 1.6)
+    width = 1240
+    lines = len(header) + len(rows) + len(footer) + 3
+    # Cropped to the text once drawn
+    image = Image.new("L", (width, 60 + lines * line_height + 60), 255)
+    draw = ImageDraw.Draw(image)
+    truth = []
+    x, y = 70, 60
+
+    def write(text):
+        nonlocal y
+        draw.text((x, y), text, fill=0, font=font)
+        y += line_height
+
+    for line in header:
+        write(line)
+        truth.append(line)
+    y += line_height // 2
+    if layout == "table":
+        columns = [x, x + 470, x + 700, x + 900]
+        cells = [["Medicine", "Frequency", "Duration", "Instructions"]] + rows
+        top = y - 8
+        for row in cells:
+            for c, cell in enumerate(row):
+                draw.text((columns[c] + 8, y), cell, fill=0, font=font)
+            truth.append(" ".join(cell for cell in row if cell))
+            y += line_height
+        # Ruled grid around the cells
+        for r in range(len(cells) + 1):
+            draw.line([(x, top + r * line_height), (width - 60, top + r * line_height)], fill=0, width=2)
+        for column in columns[1:] + [x, width - 60]:
+            draw.line([(column, top), (column, top + len(cells) * line_height)], fill=0, width=2)
+    else:
+        for number, row in enumerate(rows, 1):
+            line = f"{number}) " + " ".join(cell for cell in row if cell)
+            write(line)
+            truth.append(line)
+    y += line_height // 2
+    for line in footer:
+        write(line)
+        truth.append(line)
+    image = image.crop((0, 0, width, y + 60))
+
+    if blur:
+        image = image.filter(ImageFilter.GaussianBlur(blur))
+    if NOISE_LEVELS[noise]:
+        # Speckles in both colours, plus grain for the heavy level
+        count = int(image.width * image.height * NOISE_LEVELS[noise])
+        draw = ImageDraw.Draw(image)
+        draw.point([(rng.randrange(image.width), rng.randrange(image.height)) for _ in range(count)], fill=0)
+        draw.point([(rng.randrange(image.width), rng.randrange(image.height)) for _ in range(count)], fill=255)
+        if noise == "heavy":
+            image = Image.blend(image, Image.effect_noise(image.size, 40).convert("L"), 0.15)
+    if skew:
+        image = image.rotate(skew, resample=Image.BICUBIC, expand=True, fillcolor=255)
+    # Uploads are colour photos or scans
+    return image.convert("RGB"), "\n".join(truth), names
+
+
+def synthetic_samples(count: int = 24, seed: int = 7, fonts: Optional[Dict[str, str]] = None) -> List[Sample]:
+    """``count`` prescriptions cycling through fonts and layouts, with seeded random degradations."""
+    rng = random.Random(seed)
+    fonts = fonts if fonts is not None else find_fonts()
+    font_items = list(fonts.items()) or [("default", None)]
+    samples = []
+    for i in range(count):
+        font_name, font_path = font_items[i % len(font_items)]
+        layout = "table" if (i // len(font_items)) % 2 else "list"
+        noise = rng.choice(list(NOISE_LEVELS))
+        skew = rng.choice(SKEWS)
+        blur = rng.choice(BLURS)
+        image, text, names = render_prescription(rng, font_path, layout, noise, skew, blur)
+        tags = {"source": "synthetic", "font": font_name, "layout": layout, "noise": noise,
+                "skew": f"{abs(skew):g}", "blur": f"{blur:g}"}
+        samples.append(Sample(f"synthetic-{i:03d}", image, text, names, tags))
+    return samples
+
+
+def scan_samples(root: str) -> List[Sample]:
+    """Images under ``root`` that have a ground-truth sidecar (``.json`` or ``.txt``), sorted by path."""
+    samples = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            stem, ext = os.path.splitext(filename)
+            if ext.lower() not in IMAGE_EXTENSIONS:
+                continue
+            base = os.path.join(dirpath, stem)
+            if os.path.exists(base + ".json"):
+                with open(base + ".json", "r", encoding="utf-8") as f:
+                    truth = json.load(f)
+                text, medications = truth.get("text", ""), truth.get("medications")
+                tags = {"source": "scan", **{k: str(v) for k, v in truth.get("tags", {}).items()}}
+            elif os.path.exists(base + ".txt"):
+                with open(base + ".txt", "r", encoding="utf-8") as f:
+                    text, medications, tags = f.read(), None, {"source": "scan"}
+            else:
+                print(f"Skipping {filename}: no {stem}.json or {stem}.txt ground truth")
+                continue
+            image = Image.open(os.path.join(dirpath, filename))
+            image.load()
+            samples.append(Sample(os.path.relpath(base, root), image, text, medications, tags))
+    return samples
+
+
+def save_samples(samples: List[Sample], root: str) -> None:
+    """Write samples in the ``--scans`` layout: PNG plus JSON ground truth."""
+    os.makedirs(root, exist_ok=True)
+    for sample in samples:
+        sample.image.save(os.path.join(root, f"{sample.name}.png"))
+        with open(os.path.join(root, f"{sample.name}.json"), "w", encoding="utf-8") as f:
+            json.dump({"text": sample.text, "medications": sample.medications, "tags": sample.tags}, f, indent=2)
+
+
+def _edit_distance(a: Sequence, b: Sequence) -> int:
+    previous = list(range(len(b) + 1))
+    for i, x in enumerate(a, 1):
+        current = [i]
+        for j, y in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (x != y)))
+        previous = current
+    return previous[-1]
+
+
+def _normalize_text(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+def error_rates(truth: str, hypothesis: str):
+    """(CER, WER) of ``hypothesis`` against ``truth``, both lower-cased with whitespace runs collapsed."""
+    truth, hypothesis = _normalize_text(truth), _normalize_text(hypothesis)
+    if not truth:
+        return (0.0, 0.0) if not hypothesis else (1.0, 1.0)
+    if jiwer is not None:
+        return float(jiwer.cer(truth, hypothesis)), float(jiwer.wer(truth, hypothesis))
+    cer = _edit_distance(truth, hypothesis) / len(truth)
+    words = truth.split()
+    return cer, _edit_distance(words, hypothesis.split()) / len(words)
+
+
+def medication_key(name: str) -> str:
+    """First word of the normalised name: "Dolo 650" and "DOLO" are the same medication."""
+    words = normalize_term(name).split()
+    return words[0] if words else ""
+
+
+def match_medications(expected: List[str], found: List[str]):
+    """(true positives, false positives, false negatives), each expected name matched once."""
+    remaining = [medication_key(name) for name in expected]
+    tp = 0
+    for name in found:
+        key = medication_key(name)
+        if key in remaining:
+            remaining.remove(key)
+            tp += 1
+    return tp, len(found) - tp, len(remaining)
+
+
+def run_sample(analyzer, sample: Sample, lang: str = "eng", grid: bool = False) -> dict:
+    """One image through the analyzer's stages, timed stage by stage and scored against its ground truth."""
+    stages = defaultdict(float)
+    variant_seconds = defaultdict(float)
+    passes = []
+
+    def timed(stage, fn, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            stages[stage] += time.perf_counter() - started
+
+    def search(source):
+        variants = []
+        for name in pipelines:
+            started = time.perf_counter()
+            try:
+                variants.append((name, analyzer._run_pipeline(source, name)))
+            except Exception as e:
+                print(f"Preprocessing '{name}' failed: {e}")
+            variant_seconds[name] += time.perf_counter() - started
+            stages["preprocess"] += time.perf_counter() - started
+        if not variants:
+            variants.append(("original", source))
+        # Fixed grid order instead of the pass history, so the early stop is the same on every run
+        runs = timed("ocr", analyzer._ocr_grid, variants, lang, stop=analyzer._good_enough, ranked=False)
+        passes.extend(runs)
+        return analyzer._best_run(runs)
+
+    image = sample.image
+    pipelines = timed("choose_pipelines", analyzer.choose_pipelines, image)
+    canvas = timed("text_regions", analyzer._text_canvas, image)
+    best = search(canvas if canvas is not None else image)
+    full_page = False
+    if canvas is not None and (best is None or not analyzer._good_enough(best)):
+        full_page = True
+        full = search(image)
+        best = analyzer._best_run([run for run in (best, full) if run])
+    text = best["text"] if best else ""
+    medications = timed("parse", analyzer.parse_medications, text.lower()) if text.strip() else []
+    total = sum(stages.values())
+
+    cer, wer = error_rates(sample.text, text)
+    found = [med["name"] for med in medications]
+    result = {
+        "name": sample.name,
+        "tags": sample.tags,
+        "pipelines": pipelines,
+        "text_regions": canvas is not None,
+        "full_page_fallback": full_page,
+        "chosen": f"{best['variant']}/{best['config']}" if best else None,
+        "cer": round(cer, 4),
+        "wer": round(wer, 4),
+        "seconds": {stage: round(value, 4) for stage, value in stages.items()},
+        "seconds_total": round(total, 4),
+        "variant_seconds": {name: round(value, 4) for name, value in variant_seconds.items()},
+        "passes": [_pass_record(sample, run) for run in passes],
+        "medications_found": found,
+    }
+    if sample.medications is not None:
+        tp, fp, fn = match_medications(sample.medications, found)
+        result.update(medications_expected=sample.medications, tp=tp, fp=fp, fn=fn)
+    if grid:
+        result["grid"] = grid_passes(analyzer, sample, canvas if canvas is not None else image, lang)
+    return result
+
+
+def _pass_record(sample: Sample, run: dict) -> dict:
+    cer, wer = error_rates(sample.text, run["text"])
+    return {"variant": run["variant"], "config": run["config"], "seconds": round(run["seconds"], 4),
+            "score": round(run["score"], 4), "cer": round(cer, 4), "wer": round(wer, 4)}
+
+
+def grid_passes(analyzer, sample: Sample, source: Image.Image, lang: str) -> List[dict]:
+    """Every preprocessing variant x PSM config on ``source``, without the early stop."""
+    pipelines = analyzer.FULL_PIPELINES if analyzer._has_cv2() else analyzer.FALLBACK_PIPELINES
+    variants = analyzer._preprocess_named(source, pipelines)
+    return [_pass_record(sample, run) for run in analyzer._ocr_grid(variants, lang, ranked=False)]
+
+
+def _mean(values: List[float]) -> Optional[float]:
+    return round(sum(values) / len(values), 4) if values else None
+
+
+def summarize(results: List[dict]) -> dict:
+    """Mean CER/WER and seconds per stage; medication precision/recall over all matches (micro)."""
+    scored = [r for r in results if "tp" in r]
+    tp, fp, fn = (sum(r[key] for r in scored) for key in ("tp", "fp", "fn"))
+    stages = sorted({stage for r in results for stage in r["seconds"]})
+    return {
+        "samples": len(results),
+        "cer": _mean([r["cer"] for r in results]),
+        "wer": _mean([r["wer"] for r in results]),
+        "medication_precision": round(tp / (tp + fp), 4) if tp + fp else None,
+        "medication_recall": round(tp / (tp + fn), 4) if tp + fn else None,
+        "seconds": {stage: _mean([r["seconds"].get(stage, 0.0) for r in results]) for stage in stages},
+        "seconds_total": _mean([r["seconds_total"] for r in results]),
+    }
+
+
+def _pass_table(records: List[dict]) -> dict:
+    grouped = defaultdict(list)
+    for record in records:
+        grouped[f"{record['variant']}/{record['config']}"].append(record)
+    return {key: {"runs": len(group), "seconds": _mean([p["seconds"] for p in group]),
+                  "cer": _mean([p["cer"] for p in group]), "wer": _mean([p["wer"] for p in group])}
+            for key, group in sorted(grouped.items())}
+
+
+def build_report(results: List[dict], settings: dict, environment: dict) -> dict:
+    by_tag = defaultdict(lambda: defaultdict(list))
+    for result in results:
+        for tag, value in result["tags"].items():
+            by_tag[tag][value].append(result)
+    variants = defaultdict(list)
+    for result in results:
+        for name, seconds in result["variant_seconds"].items():
+            variants[name].append(seconds)
+    chosen = defaultdict(int)
+    for result in results:
+        if result["chosen"]:
+            chosen[result["chosen"]] += 1
+    passes = _pass_table([p for r in results for p in r["passes"]])
+    for key, count in chosen.items():
+        passes[key]["chosen"] = count
+    report = {
+        "format": REPORT_FORMAT,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "environment": environment,
+        "settings": settings,
+        "summary": summarize(results),
+        "by_tag": {tag: {value: summarize(group) for value, group in sorted(values.items())}
+                   for tag, values in sorted(by_tag.items())},
+        "preprocess_seconds": {name: _mean(values) for name, values in sorted(variants.items())},
+        "passes": passes,
+        "samples": results,
+    }
+    if settings.get("grid"):
+        report["grid"] = _pass_table([p for r in results for p in r.get("grid", [])])
+    return report
+
+
+# Lower is better for these; higher for precision/recall
+_LOWER_IS_BETTER = {"cer", "wer"}
+
+
+def _compare_values(label: str, old, new, tolerance: float, regressions: List[str]) -> None:
+    if old is None or new is None:
+        return
+    delta = new - old
+    metric = label.rsplit(".", 1)[-1]
+    marker = ""
+    if (metric in _LOWER_IS_BETTER and delta > tolerance) or \
+            (metric.startswith("medication_") and -delta > tolerance):
+        marker = "  <-- worse"
+        regressions.append(label)
+    elif label.startswith("seconds") or ".seconds" in label:
+        if old > 0:
+            marker = f"  ({delta / old:+.0%})"
+    print(f"{label:<50} {old:>10.4f} {new:>10.4f} {delta:>+10.4f}{marker}")
+
+
+def compare_reports(old: dict, new: dict, tolerance: float = 0.01) -> int:
+    """Print the metrics of two reports side by side; returns the number of accuracy regressions."""
+    regressions: List[str] = []
+    if old.get("settings") != new.get("settings"):
+        print("Note: the runs used different settings; differences may not come from the code alone")
+    print(f"{'metric':<50} {'old':>10} {'new':>10} {'delta':>10}")
+
+    def walk(prefix, a, b):
+        for key in a:
+            if key not in b:
+                continue
+            label = f"{prefix}.{key}" if prefix else key
+            if isinstance(a[key], dict) and isinstance(b[key], dict):
+                walk(label, a[key], b[key])
+            elif isinstance(a[key], (int, float)) and isinstance(b[key], (int, float)) and key != "samples":
+                _compare_values(label, a[key], b[key], tolerance, regressions)
+
+    walk("", old["summary"], new["summary"])
+    for tag, values in old.get("by_tag", {}).items():
+        for value, summary in values.items():
+            other = new.get("by_tag", {}).get(tag, {}).get(value)
+            if other:
+                walk(f"{tag}={value}", {k: summary[k] for k in ("cer", "wer", "medication_recall", "seconds_total")},
+                     other)
+    if regressions:
+        print(f"{len(regressions)} accuracy regression(s) beyond {tolerance}: {', '.join(regressions)}")
+    return len(regressions)
+
+
+def main():
+    import argparse
+    from services import get_ocr_analyzer
+
+    parser = argparse.ArgumentParser(description="Benchmark OCR accuracy and latency on prescription images.")
+    parser.add_argument("--synthetic", type=int, default=24, help="Synthetic prescriptions to render (0 for none)")
+    parser.add_argument("--seed", type=int, default=7, help="Seed of the synthetic corpus")
+    parser.add_argument("--font", action="append", default=[], help="Extra TrueType font for the synthetic corpus")
+    parser.add_argument("--scans", help="Folder of real scans with .json/.txt ground truth")
+    parser.add_argument("--lang", default="eng", help="Tesseract language, e.g. eng or eng+hin")
+    parser.add_argument("--grid", action="store_true", help="Also run every preprocessing variant x PSM config")
+    parser.add_argument("--workers", type=int, help="Concurrent tesseract passes (default: OCR_MAX_WORKERS)")
+    parser.add_argument("--out", help="Write the JSON report here")
+    parser.add_argument("--save-images", help="Write the synthetic corpus to this folder and exit")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="Compare two reports and exit")
+    parser.add_argument("--tolerance", type=float, default=0.01, help="Accuracy drop --compare tolerates")
+    args = parser.parse_args()
+
+    if args.compare:
+        reports = []
+        for path in args.compare:
+            with open(path, "r", encoding="utf-8") as f:
+                reports.append(json.load(f))
+        return 1 if compare_reports(*reports, tolerance=args.tolerance) else 0
+
+    fonts = find_fonts(args.font)
+    samples = synthetic_samples(args.synthetic, args.seed, fonts) if args.synthetic else []
+    if args.save_images:
+        save_samples(samples, args.save_images)
+        print(f"Wrote {len(samples)} samples to {args.save_images}")
+        return 0
+    if args.scans:
+        samples += scan_samples(args.scans)
+    if not samples:
+        parser.error("nothing to benchmark: use --synthetic N and/or --scans DIR")
+
+    analyzer = get_ocr_analyzer()
+    info = analyzer.engine.info()
+    if not info["available"]:
+        print(f"Tesseract OCR not available: {info['error']}")
+        return 1
+    if args.workers:
+        analyzer.max_workers = args.workers
+
+    # Untimed first pass: engine start-up and lazy imports shouldn't count against the first sample
+    run_sample(analyzer, samples[0], args.lang)
+    results = []
+    for sample in samples:
+        result = run_sample(analyzer, sample, args.lang, grid=args.grid)
+        results.append(result)
+        print(f"{sample.name}: CER {result['cer']:.3f}, WER {result['wer']:.3f}, "
+              f"{result['seconds_total']:.2f}s via {result['chosen']}")
+
+    settings = {"synthetic": args.synthetic, "seed": args.seed, "scans": args.scans, "lang": args.lang,
+                "grid": args.grid, "fonts": sorted(fonts), "adaptive_preprocess": analyzer.adaptive_preprocess,
+                "text_regions": analyzer.use_text_regions}
+    environment = {"python": platform.python_version(), "platform": platform.platform(),
+                   "engine": {k: v for k, v in info.items() if k != "error"},
+                   "pipeline_version": analyzer.PIPELINE_VERSION, "max_workers": analyzer.max_workers,
+                   "cpu_count": os.cpu_count()}
+    report = build_report(results, settings, environment)
+    summary = report["summary"]
+    print(json.dumps(summary, indent=2))
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,160 @@
+"""Persistent cache of OCR results keyed by image content.
+
+The key is a BLAKE2b hash of the decoded pixels (mode, size and raw bytes,
+so re-encoding or renaming the same photo still hits), plus the tesseract
+language and the analyzer's ``result_cache_version()``: its pipeline version
+and the parser settings (drug lexicon on/off and which dictionary, spelling
+correction and its threshold). The cache stores the English text and parsed
+medications before translation, so one entry serves every UI language.
+Bumping ``PrescriptionAnalyzer.PIPELINE_VERSION`` invalidates entries made by
+older preprocessing/parsing code; changing a parser setting misses entries
+parsed under the old one.
+
+Env vars: OCR_CACHE_PATH (shared with ocr_stats), OCR_RESULT_CACHE (1/0),
+OCR_RESULT_CACHE_MAX_ENTRIES
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+# Entries older than this are treated as misses
+DEFAULT_MAX_AGE_SECONDS = 30 * 24 * 3600
+
+
+def image_hash(image) -> str:
+    """Hash of the decoded pixels; identical images hash equal whatever file they came from."""
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(f"{image.mode}:{image.width}x{image.height}:".encode())
+    digest.update(image.tobytes())
+    return digest.hexdigest()
+
+
+class OcrResultCache:
+    def __init__(self, db_path: Optional[str] = None, max_entries: Optional[int] = None,
+                 max_age_seconds: int = DEFAULT_MAX_AGE_SECONDS):
+        self.db_path = db_path or os.getenv("OCR_CACHE_PATH", "ocr_cache.db")
+        self.max_entries = int(max_entries or os.getenv("OCR_RESULT_CACHE_MAX_ENTRIES", "5000"))
+        self.max_age_seconds = max_age_seconds
+        self.enabled = os.getenv("OCR_RESULT_CACHE", "1") != "0"
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.init_database()
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=10)
+
+    def init_database(self):
+        conn = self._connect()
+        try:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS ocr_results (
+                    image_hash TEXT NOT NULL,
+                    tesseract_lang TEXT NOT NULL,
+                    pipeline_version TEXT NOT NULL,
+                    extracted_text TEXT NOT NULL,
+                    medications TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_used_at REAL NOT NULL,
+                    hits INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (image_hash, tesseract_lang, pipeline_version)
+                )
+            ''')
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_ocr_results_last_used ON ocr_results(last_used_at)")
+            conn.commit()
+        finally:
+            conn.close()
+
+    def get(self, digest: str, tesseract_lang: str, pipeline_version: str) -> Optional[dict]:
+        """Cached {'extracted_text', 'medications'} in English, or None."""
+        if not self.enabled:
+            return None
+        key = (digest, tesseract_lang, pipeline_version)
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT extracted_text, medications, created_at FROM ocr_results "
+                "WHERE image_hash = ? AND tesseract_lang = ? AND pipeline_version = ?",
+                key
+            ).fetchone()
+            if row is None or time.time() - row[2] > self.max_age_seconds:
+                with self._lock:
+                    self.misses += 1
+                return None
+            conn.execute(
+                "UPDATE ocr_results SET hits = hits + 1, last_used_at = ? "
+                "WHERE image_hash = ? AND tesseract_lang = ? AND pipeline_version = ?",
+                (time.time(),) + key
+            )
+            conn.commit()
+        except sqlite3.Error as e:
+            print(f"OCR cache read error: {e}")
+            return None
+        finally:
+            conn.close()
+        with self._lock:
+            self.hits += 1
+        # Fresh objects on every hit: callers translate the instructions in place
+        return {'extracted_text': row[0], 'medications': json.loads(row[1])}
+
+    def put(self, digest: str, tesseract_lang: str, pipeline_version: str, extracted_text: str,
+            medications: list) -> None:
+        if not self.enabled:
+            return
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute('''
+                INSERT OR REPLACE INTO ocr_results
+                    (image_hash, tesseract_lang, pipeline_version, extracted_text, medications,
+                     created_at, last_used_at, hits)
+                VALUES (?, ?, ?, ?, ?, ?, ?, 0)
+            ''', (digest, tesseract_lang, pipeline_version, extracted_text,
+                  json.dumps(medications, ensure_ascii=False), now, now))
+            # Keep the most recently used entries
+            conn.execute('''
+                DELETE FROM ocr_results WHERE rowid IN (
+                    SELECT rowid FROM ocr_results ORDER BY last_used_at DESC LIMIT -1 OFFSET ?
+                )
+            ''', (self.max_entries,))
+            conn.commit()
+        except sqlite3.Error as e:
+            print(f"OCR cache write error: {e}")
+        finally:
+            conn.close()
+
+    def clear(self) -> None:
+        conn = self._connect()
+        try:
+            conn.execute("DELETE FROM ocr_results")
+            conn.commit()
+        finally:
+            conn.close()
+
+    def stats(self) -> dict:
+        conn = self._connect()
+        try:
+            entries = conn.execute("SELECT COUNT(*) FROM ocr_results").fetchone()[0]
+        except sqlite3.Error:
+            entries = 0
+        finally:
+            conn.close()
+        with self._lock:
+            return {"entries": entries, "hits": self.hits, "misses": self.misses, "enabled": self.enabled}
+
+
+_shared_cache: Optional[OcrResultCache] = None
+_shared_lock = threading.Lock()
+
+
+def get_ocr_result_cache() -> OcrResultCache:
+    global _shared_cache
+    if _shared_cache is None:
+        with _shared_lock:
+            if _shared_cache is None:
+                _shared_cache = OcrResultCache()
+    return _shared_cache
@@ -0,0 +1,284 @@
+"""Tesseract engines: a long-lived in-process API with a pytesseract fallback.
+
+``pytesseract`` forks the tesseract binary for every call: it writes the
+image to a temp file, reloads the traineddata and parses stdout. The
+``tesserocr`` engine keeps initialised ``TessBaseAPI`` objects in a pool per
+(language, OEM) and hands them PIL images in memory. Page segmentation mode
+and ``-c`` variables are applied per call.
+
+    engine = get_ocr_engine()
+    data = engine.image_to_data(image, "eng", "--oem 3 --psm 6", timeout=20)
+
+``image_to_data`` returns pytesseract's ``Output.DICT`` shape (text, conf,
+block_num, par_num, line_num and the left, top, width, height word boxes)
+whichever engine ran. ``tesseract_info()``
+probes the version and installed language packs once per process.
+
+Env vars: OCR_ENGINE (auto | tesserocr | pytesseract), OCR_ENGINE_POOL_SIZE,
+TESSERACT_PATH (Windows binary), TESSDATA_PREFIX
+"""
+import os
+import queue
+import shlex
+import threading
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import pytesseract
+except ImportError:
+    pytesseract = None
+
+try:
+    import tesserocr
+except ImportError:
+    tesserocr = None
+
+
+def parse_config(config: str) -> Tuple[int, int, Dict[str, str]]:
+    """Split a tesseract CLI config into (oem, psm, variables); defaults are OEM 3, PSM 3."""
+    oem, psm, variables = 3, 3, {}
+    args = shlex.split(config or "")
+    i = 0
+    while i < len(args):
+        arg = args[i]
+        if arg == "--oem" and i + 1 < len(args):
+            oem = int(args[i + 1])
+            i += 1
+        elif arg == "--psm" and i + 1 < len(args):
+            psm = int(args[i + 1])
+            i += 1
+        elif arg == "-c" and i + 1 < len(args) and "=" in args[i + 1]:
+            name, value = args[i + 1].split("=", 1)
+            variables[name] = value
+            i += 1
+        i += 1
+    return oem, psm, variables
+
+
+class OcrEngine:
+    """Base engine; subclasses implement ``image_to_data`` and ``_probe``."""
+    name = "base"
+    # True if image_to_data takes PIL images directly (no temp files needed)
+    in_memory = False
+
+    def __init__(self):
+        self._info: Optional[dict] = None
+        self._info_lock = threading.Lock()
+
+    def image_to_data(self, image, lang: str, config: str, timeout: float = 0) -> dict:
+        raise NotImplementedError
+
+    def _probe(self) -> dict:
+        raise NotImplementedError
+
+    def info(self, refresh: bool = False) -> dict:
+        """{'engine', 'available', 'version', 'languages', 'error'}, probed once per process."""
+        with self._info_lock:
+            if self._info is None or refresh:
+                try:
+                    self._info = self._probe()
+                except Exception as e:
+                    self._info = {"version": None, "languages": [], "available": False, "error": str(e)}
+                self._info["engine"] = self.name
+            return self._info
+
+    def has_languages(self, lang: str) -> bool:
+        """True if every pack in a ``eng+hin`` style spec is installed (or the list is unknown)."""
+        installed = self.info()["languages"]
+        return not installed or all(part in installed for part in lang.split("+"))
+
+
+class PytesseractEngine(OcrEngine):
+    """One tesseract subprocess per call."""
+    name = "pytesseract"
+
+    def __init__(self):
+        super().__init__()
+        configure_tesseract_cmd()
+
+    def image_to_data(self, image, lang: str, config: str, timeout: float = 0) -> dict:
+        # pytesseract kills tesseract and raises RuntimeError once the timeout passes
+        return pytesseract.image_to_data(
+            image, lang=lang, config=config, timeout=timeout, output_type=pytesseract.Output.DICT
+        )
+
+    def _probe(self) -> dict:
+        if pytesseract is None:
+            raise RuntimeError("pytesseract is not installed")
+        version = str(pytesseract.get_tesseract_version())
+        try:
+            languages = sorted(pytesseract.get_languages(config=""))
+        except Exception:
+            languages = []
+        return {"version": version, "languages": languages, "available": True, "error": None}
+
+
+class TesserocrEngine(OcrEngine):
+    """Pooled in-process TessBaseAPI objects, one pool per (language, OEM)."""
+    name = "tesserocr"
+    in_memory = True
+
+    def __init__(self, pool_size: Optional[int] = None):
+        super().__init__()
+        self.pool_size = int(pool_size or os.getenv("OCR_ENGINE_POOL_SIZE", str(os.cpu_count() or 2)))
+        self._pools: Dict[Tuple[str, int], queue.LifoQueue] = {}
+        self._created: Dict[Tuple[str, int], int] = {}
+        # (language, OEM) pairs the library failed to load; go straight to the fallback
+        self._unloadable: set = set()
+        self._lock = threading.Lock()
+        # Languages/modes the library can't load still work through the binary
+        self.fallback = PytesseractEngine() if pytesseract is not None else None
+
+    def _new_api(self, lang: str, oem: int):
+        # tesserocr.OEM / PSM are plain int constants, so the parsed ints are passed as they are
+        kwargs = {"lang": lang, "oem": oem}
+        if os.getenv("TESSDATA_PREFIX"):
+            kwargs["path"] = os.environ["TESSDATA_PREFIX"]
+        return tesserocr.PyTessBaseAPI(**kwargs)
+
+    def _acquire(self, lang: str, oem: int, timeout: float):
+        key = (lang, oem)
+        with self._lock:
+            pool = self._pools.setdefault(key, queue.LifoQueue())
+            try:
+                return pool.get_nowait()
+            except queue.Empty:
+                pass
+            create = self._created.get(key, 0) < self.pool_size
+            if create:
+                self._created[key] = self._created.get(key, 0) + 1
+        if create:
+            try:
+                return self._new_api(lang, oem)
+            except Exception:
+                with self._lock:
+                    self._created[key] -= 1
+                raise
+        # Pool exhausted: wait for a busy API to come back
+        return pool.get(timeout=timeout or None)
+
+    def _release(self, lang: str, oem: int, api) -> None:
+        self._pools[(lang, oem)].put(api)
+
+    def image_to_data(self, image, lang: str, config: str, timeout: float = 0) -> dict:
+        oem, psm, variables = parse_config(config)
+        if (lang, oem) in self._unloadable and self.fallback is not None:
+            return self.fallback.image_to_data(image, lang, config, timeout)
+        try:
+            api = self._acquire(lang, oem, timeout)
+        except queue.Empty:
+            raise RuntimeError("Tesseract process timeout")
+        except RuntimeError as e:
+            # PyTessBaseAPI raises RuntimeError when the language data fails to load
+            if self.fallback is None:
+                raise
+            print(f"tesserocr can't load {lang} (OEM {oem}): {e}; using pytesseract")
+            self._unloadable.add((lang, oem))
+            return self.fallback.image_to_data(image, lang, config, timeout)
+        previous = {}
+        try:
+            api.SetPageSegMode(psm)
+            for name, value in variables.items():
+                previous[name] = api.GetVariableAsString(name)
+                api.SetVariable(name, value)
+            api.SetImage(image)
+            if not api.Recognize(int(timeout * 1000)):
+                raise RuntimeError("Tesseract process timeout")
+            return self._collect(api)
+        finally:
+            # Leave the API as we found it for the next caller
+            for name, value in previous.items():
+                if value is not None:
+                    api.SetVariable(name, value)
+            api.Clear()
+            self._release(lang, oem, api)
+
+    @staticmethod
+    def _collect(api) -> dict:
+        data = {"text": [], "conf": [], "block_num": [], "par_num": [], "line_num": [],
+                "left": [], "top": [], "width": [], "height": []}
+        iterator = api.GetIterator()
+        if iterator is None:
+            return data
+        block = par = line = 0
+        level = tesserocr.RIL.WORD
+        for word in tesserocr.iterate_level(iterator, level):
+            if word.IsAtBeginningOf(tesserocr.RIL.BLOCK):
+                block += 1
+            if word.IsAtBeginningOf(tesserocr.RIL.PARA):
+                par += 1
+            if word.IsAtBeginningOf(tesserocr.RIL.TEXTLINE):
+                line += 1
+            data["text"].append(word.GetUTF8Text(level) or "")
+            data["conf"].append(word.Confidence(level))
+            data["block_num"].append(block)
+            data["par_num"].append(par)
+            data["line_num"].append(line)
+            x1, y1, x2, y2 = word.BoundingBox(level) or (0, 0, 0, 0)
+            data["left"].append(x1)
+            data["top"].append(y1)
+            data["width"].append(x2 - x1)
+            data["height"].append(y2 - y1)
+        return data
+
+    def _probe(self) -> dict:
+        _, languages = tesserocr.get_languages(os.getenv("TESSDATA_PREFIX"))
+        # "tesseract 5.3.0\n leptonica-1.82.0 ..."
+        version = tesserocr.tesseract_version().split()[1]
+        return {"version": version, "languages": sorted(languages), "available": True, "error": None}
+
+
+def configure_tesseract_cmd() -> None:
+    """Point pytesseract at the Windows install if tesseract is not on PATH."""
+    if pytesseract is None:
+        return
+    try:
+        if os.name == "nt":
+            configured = False
+            # 1) Respect explicit env override if provided
+            env_path = os.environ.get("TESSERACT_PATH")
+            if env_path and os.path.exists(env_path):
+                pytesseract.pytesseract.tesseract_cmd = env_path
+                configured = True
+            # 2) Fall back to common default install location
+            default_path = r"C:\\Program Files\\Tesseract-OCR\\tesseract.exe"
+            if not configured and os.path.exists(default_path):
+                pytesseract.pytesseract.tesseract_cmd = default_path
+                configured = True
+            # No exception if not found; UI will surface guidance
+    except Exception:
+        # Silently ignore auto-config failures; runtime checks will report
+        pass
+
+
+def build_engine(kind: Optional[str] = None) -> OcrEngine:
+    """Engine for OCR_ENGINE; ``auto`` prefers tesserocr when it imports and loads."""
+    kind = (kind or os.getenv("OCR_ENGINE", "auto")).lower()
+    if kind in ("auto", "tesserocr") and tesserocr is not None:
+        engine = TesserocrEngine()
+        if engine.info()["available"]:
+            return engine
+        print(f"tesserocr unavailable ({engine.info()['error']}); using pytesseract")
+    return PytesseractEngine()
+
+
+_shared_engine: Optional[OcrEngine] = None
+_shared_lock = threading.Lock()
+
+
+def get_ocr_engine() -> OcrEngine:
+    global _shared_engine
+    if _shared_engine is None:
+        with _shared_lock:
+            if _shared_engine is None:
+                _shared_engine = build_engine()
+    return _shared_engine
+
+
+def tesseract_info(refresh: bool = False) -> dict:
+    """Cached capability probe of the process-wide engine."""
+    return get_ocr_engine().info(refresh=refresh)
+
+
+def installed_languages() -> List[str]:
+    return tesseract_info()["languages"]
@@ -0,0 +1,134 @@
+"""Historical per-pass OCR statistics used to order the variant x config search.
+
+Every finished pass records its quality score and time under
+``(tesseract_lang, variant, config)``; the pass picked as the result also
+counts a win. ``rank`` orders a grid by smoothed mean score so the passes that
+usually succeed run first and the search can stop early.
+
+Env var: OCR_CACHE_PATH (SQLite file, default ``ocr_cache.db``)
+"""
+import os
+import sqlite3
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Prior for passes with little history: behaves like PRIOR_RUNS runs scoring PRIOR_SCORE
+PRIOR_SCORE = 0.5
+PRIOR_RUNS = 3
+
+
+class OcrPassStats:
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or os.getenv("OCR_CACHE_PATH", "ocr_cache.db")
+        self._lock = threading.Lock()
+        self._cache: Dict[str, Dict[Tuple[str, str], Tuple[int, float]]] = {}
+        self.init_database()
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=10)
+
+    def init_database(self):
+        conn = self._connect()
+        try:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS ocr_pass_stats (
+                    tesseract_lang TEXT NOT NULL,
+                    variant TEXT NOT NULL,
+                    config TEXT NOT NULL,
+                    runs INTEGER NOT NULL DEFAULT 0,
+                    wins INTEGER NOT NULL DEFAULT 0,
+                    score_sum REAL NOT NULL DEFAULT 0,
+                    seconds_sum REAL NOT NULL DEFAULT 0,
+                    PRIMARY KEY (tesseract_lang, variant, config)
+                )
+            ''')
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _load(self, tesseract_lang: str) -> Dict[Tuple[str, str], Tuple[int, float]]:
+        with self._lock:
+            cached = self._cache.get(tesseract_lang)
+        if cached is not None:
+            return cached
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT variant, config, runs, score_sum FROM ocr_pass_stats WHERE tesseract_lang = ?",
+                (tesseract_lang,)
+            ).fetchall()
+        except sqlite3.Error as e:
+            print(f"OCR stats read error: {e}")
+            rows = []
+        finally:
+            conn.close()
+        stats = {(v, c): (runs, score_sum) for v, c, runs, score_sum in rows}
+        with self._lock:
+            self._cache[tesseract_lang] = stats
+        return stats
+
+    def expected_score(self, tesseract_lang: str, variant: str, config: str) -> float:
+        runs, score_sum = self._load(tesseract_lang).get((variant, config), (0, 0.0))
+        return (score_sum + PRIOR_SCORE * PRIOR_RUNS) / (runs + PRIOR_RUNS)
+
+    def rank(self, tesseract_lang: str, passes: Sequence[Tuple[int, str, str]]) -> List[Tuple[int, str, str]]:
+        """Sort (order, variant, config) passes by expected score; grid order breaks ties."""
+        return sorted(passes, key=lambda p: (-self.expected_score(tesseract_lang, p[1], p[2]), p[0]))
+
+    def record(self, tesseract_lang: str, runs: Iterable[dict], winner: Optional[dict] = None) -> None:
+        """Add finished runs (dicts with variant, config, score, seconds) to the history."""
+        rows = [
+            (tesseract_lang, r["variant"], r["config"], 1 if r is winner else 0, r["score"], r["seconds"])
+            for r in runs
+        ]
+        if not rows:
+            return
+        conn = self._connect()
+        try:
+            conn.executemany('''
+                INSERT INTO ocr_pass_stats (tesseract_lang, variant, config, runs, wins, score_sum, seconds_sum)
+                VALUES (?, ?, ?, 1, ?, ?, ?)
+                ON CONFLICT(tesseract_lang, variant, config) DO UPDATE SET
+                    runs = runs + 1,
+                    wins = wins + excluded.wins,
+                    score_sum = score_sum + excluded.score_sum,
+                    seconds_sum = seconds_sum + excluded.seconds_sum
+            ''', rows)
+            conn.commit()
+        except sqlite3.Error as e:
+            print(f"OCR stats write error: {e}")
+        finally:
+            conn.close()
+        with self._lock:
+            self._cache.pop(tesseract_lang, None)
+
+    def summary(self, tesseract_lang: Optional[str] = None) -> List[tuple]:
+        """(lang, variant, config, runs, wins, mean_score, mean_seconds), best first."""
+        query = '''
+            SELECT tesseract_lang, variant, config, runs, wins,
+                   score_sum / runs, seconds_sum / runs
+            FROM ocr_pass_stats WHERE runs > 0
+        '''
+        params: list = []
+        if tesseract_lang:
+            query += " AND tesseract_lang = ?"
+            params.append(tesseract_lang)
+        query += " ORDER BY score_sum / runs DESC"
+        conn = self._connect()
+        try:
+            return conn.execute(query, params).fetchall()
+        finally:
+            conn.close()
+
+
+_shared_stats: Optional[OcrPassStats] = None
+_shared_lock = threading.Lock()
+
+
+def get_ocr_stats() -> OcrPassStats:
+    global _shared_stats
+    if _shared_stats is None:
+        with _shared_lock:
+            if _shared_stats is None:
+                _shared_stats = OcrPassStats()
+    return _shared_stats
@@ -0,0 +1,458 @@
+"""Equivalence check and micro-benchmark for the medication parser.
+
+    python parser_benchmark.py                      # synthetic corpus
+    python parser_benchmark.py --corpus ocr_texts/  # plus real OCR output (*.txt, one prescription per file)
+
+``LegacyParser`` is a frozen copy of the parser before the single-pass line
+scanner: one ``re.search`` loop per field, per-call regex compilation and
+per-line ``re.split``/``re.sub``. Every document of the corpus is parsed by
+both implementations and every line goes through both sets of
+``extract_*`` helpers; any difference is printed and the exit code is 1.
+The comparison runs with the drug lexicon off (name matching as it was) and
+only on the keys the legacy parser produced. With the lexicon on, lines
+that name a drug without prescribing it (complaints, allergies, "avoid
+...") must not yield a medication. Timings are the best of
+``--repeat`` runs over the whole corpus, with the lexicon off and on, plus
+the cost of the drug-name spelling lookups on their own.
+"""
+import os
+import random
+import re
+import sys
+import time
+from typing import Callable, List, Tuple
+
+
+class LegacyParser:
+    """The medication parser as it was, kept unchanged as the reference output."""
+
+    def __init__(self, analyzer):
+        # Data (not logic) comes from the analyzer, so both sides see the same vocabulary
+        self.form_keywords = list(analyzer.form_keywords)
+        self.stopwords = analyzer.stopwords
+        self.medication_info = analyzer.medication_info
+        self.dosage_patterns = [
+            r'(\d+)\s*mg',
+            r'(\d+)\s*ml',
+            r'(\d+)\s*tablet[s]?',
+            r'(\d+)\s*capsule[s]?',
+            r'(\d+-\d+-\d+)',
+        ]
+        self.frequency_patterns = [
+            r'once\s+daily',
+            r'twice\s+daily',
+            r'thrice\s+daily',
+            r'\d+\s+times?\s+(?:a\s+)?day',
+            r'before\s+meals?',
+            r'after\s+meals?',
+            r'with\s+meals?',
+            r'empty\s+stomach',
+            r'at\s+bedtime',
+            r'morning',
+            r'evening',
+        ]
+        self.duration_patterns = [
+            r'for\s+(\d+)\s+days?',
+            r'for\s+(\d+)\s+weeks?',
+            r'for\s+(\d+)\s+months?',
+            r'continue\s+for\s+(\d+)',
+        ]
+
+    def parse_medications(self, text):
+        medications = []
+        lines = text.split('\n')
+
+        row_regex = re.compile(r"^\s*(?:\d+[\).]\s*)?(?:TAB\.?|CAP\.?|SYRUP|DROPS|OINT\.?|CREAM|GEL)?\s*([A-Za-z][A-Za-z0-9_-]{3,})(?:\s+(\d+\s*(?:mg|mcg|g|ml|iu)))?", re.IGNORECASE)
+
+        in_table = False
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+            tokens = set(line.lower().split())
+            if tokens & {"chief","diagnosis","advice","after","weight","closed","medicine","medicines"}:
+                continue
+            low = line.lower()
+            if any(h in low for h in ["medicine name", "medicine", "medicines"]):
+                in_table = True
+                continue
+            if any(h in low for h in ["advice", "follow up", "follow-up", "followup"]):
+                in_table = False
+
+            medication_name = self.extract_medication_candidate(line)
+            if not medication_name:
+                medication_name = self.extract_medication_name(line)
+            if not medication_name:
+                mrow = row_regex.match(line)
+                if mrow:
+                    medication_name = mrow.group(1).title()
+                    guessed_dose = mrow.group(2)
+                else:
+                    guessed_dose = None
+            if not medication_name and in_table:
+                parts = re.split(r"\s{2,}", line)
+                if len(parts) >= 1:
+                    first = re.sub(r"^\d+[).]\s*", "", parts[0])
+                    first = re.sub(r"\b(?:tab\.?|caps?\.?|syrup|drops|ointment|cream|gel)\b\.?", "", first, flags=re.IGNORECASE).strip()
+                    if first and first.lower() not in self.stopwords and len(first) > 3:
+                        medication_name = first.title()
+                if not guessed_dose and len(parts) >= 2:
+                    guessed_dose = self.extract_dosage(parts[0]) or self.extract_dosage(parts[1])
+            if medication_name:
+                medication = {
+                    'name': medication_name,
+                    'dosage': self.extract_dosage(line) or (guessed_dose if 'guessed_dose' in locals() else None),
+                    'frequency': self.extract_frequency(line),
+                    'duration': self.extract_duration(line),
+                    'instructions': self.extract_instructions(line),
+                    'info': self.medication_info.get(medication_name, 'Medication information not available')
+                }
+                medications.append(medication)
+
+        joined = " \n".join([ln for ln in lines if ln.strip()])
+        for m in re.finditer(r"([A-Za-z][A-Za-z0-9-]{3,})\s+(\d+\s*(?:mg|mcg|g|ml|iu))", joined, flags=re.IGNORECASE):
+            name = m.group(1).title()
+            if name.lower() in self.stopwords:
+                continue
+            if not any(mi['name'].lower() == name.lower() for mi in medications):
+                medications.append({
+                    'name': name,
+                    'dosage': m.group(2),
+                    'frequency': None,
+                    'duration': None,
+                    'instructions': None,
+                    'info': self.medication_info.get(name.lower(), 'Medication information not available')
+                })
+
+        filtered = []
+        for med in medications:
+            name_ok = med.get('name') and med['name'].strip() and med['name'].lower() not in self.stopwords
+            has_any = any([med.get('dosage'), med.get('frequency'), med.get('duration')])
+            if name_ok and (has_any or len(med['name']) >= 5):
+                filtered.append(med)
+        return filtered
+
+    def extract_medication_candidate(self, text):
+        text_low = text.lower()
+        if any(sw in text_low.split() for sw in self.stopwords):
+            pass
+        unit_match = re.search(r'(\d+\s*(?:mg|mcg|g|ml|iu))', text_low)
+        form_present = any(f in text_low for f in self.form_keywords)
+        if unit_match or form_present:
+            tokens = re.split(r'[^a-zA-Z0-9+-]+', text)
+            idx = None
+            for i, tok in enumerate(tokens):
+                if re.search(r'(?:mg|mcg|g|ml|iu)$', tok.lower()) or tok.lower() in self.form_keywords:
+                    idx = i
+                    break
+            if idx is None and unit_match:
+                num = unit_match.group(1).split()[0]
+                for i, tok in enumerate(tokens):
+                    if num in tok:
+                        idx = i
+                        break
+            if idx is not None:
+                start = max(0, idx-3)
+                candidate_tokens = [t for t in tokens[start:idx] if t and t.isalpha()]
+                if candidate_tokens:
+                    cand = candidate_tokens[-1]
+                    cand_low = cand.lower()
+                    if cand_low not in self.stopwords and len(cand) > 3:
+                        return cand.title()
+        return None
+
+    def extract_medication_name(self, text):
+        for med_name in self.medication_info.keys():
+            if med_name in text.lower():
+                return med_name.title()
+        words = text.split()
+        if words:
+            first_word = words[0].strip('.,()[]')
+            if re.match(r'^[a-zA-Z][a-zA-Z0-9]*$', first_word) and len(first_word) > 3:
+                return first_word.title()
+        return None
+
+    def extract_dosage(self, text):
+        for pattern in self.dosage_patterns:
+            match = re.search(pattern, text, re.IGNORECASE)
+            if match:
+                return match.group(0)
+        return None
+
+    def extract_frequency(self, text):
+        for pattern in self.frequency_patterns:
+            match = re.search(pattern, text, re.IGNORECASE)
+            if match:
+                return match.group(0)
+        return None
+
+    def extract_duration(self, text):
+        for pattern in self.duration_patterns:
+            match = re.search(pattern, text, re.IGNORECASE)
+            if match:
+                return match.group(0)
+        return None
+
+    def extract_instructions(self, text):
+        instruction_keywords = [
+            'before meals', 'after meals', 'with meals', 'empty stomach',
+            'with water', 'do not crush', 'take with food', 'avoid alcohol'
+        ]
+        found_instructions = []
+        for keyword in instruction_keywords:
+            if keyword in text.lower():
+                found_instructions.append(keyword)
+        return ', '.join(found_instructions) if found_instructions else None
+
+
+NAMES = ['paracetamol', 'amoxicillin', 'azithromycin', 'metformin', 'omeprazole', 'cetirizine', 'ibuprofen',
+         'pantoprazole', 'montelukast', 'dolo', 'augmentin', 'vitamin d', 'calcium', 'iron', 'acbciximab',
+         'telmisartan', 'ondansetron', 'b-complex', 'zinc']
+FORMS = ['Tab', 'TAB.', 'Tab.', 'Cap', 'CAP.', 'Syrup', 'Drops', 'Oint.', 'Cream', 'Gel', 'Inj', '']
+STRENGTHS = ['500 mg', '500mg', '250 MG', '5 ml', '10ml', '1 g', '400 IU', '0.5 mg', '2 tablets', '1 capsule',
+             '60000 iu', '20 mcg', '']
+FREQUENCIES = ['once daily', 'twice daily', 'Thrice Daily', '3 times a day', '2 time day', '1-0-1', '0-0-1',
+               '1-1-1', 'morning', 'Evening', 'at bedtime', 'before meals', 'after meal', 'with meals',
+               'empty stomach', '1 Morning', 'SOS', '']
+DURATIONS = ['for 5 days', 'for 1 week', 'For 2 Months', 'continue for 3 months', 'continue for 10', 'x 7 days',
+             '8 Days', 'for 10 day', '']
+INSTRUCTIONS = ['with water', 'do not crush', 'take with food', 'avoid alcohol', 'after meals', 'before meals',
+                'Empty Stomach', '']
+HEADERS = ['Rx', 'Medicine Name   Dosage   Duration', 'MEDICINES', 'Diagnosis: viral fever',
+           'Chief complaints: fever, cough', 'Advice: drink plenty of water', 'Follow up after 5 days',
+           'Follow-up: 2 weeks', 'Weight: 62 kg', 'Dr. A. Sharma MBBS, MD', 'Reg. No. 45821', 'Date: 12/03/2024',
+           'Name: Ravi Kumar  Age: 45  Sex: M', 'Clinic closed on Sundays', 'Sig: as directed', '']
+# Hand-picked lines where patterns overlap or compete (priority vs position)
+EDGE_LINES = [
+    'continue for 5 days', 'take 1-0-1 for 2 weeks then 500 mg', '2 times a day or 3 times a day',
+    '10mg 5ml', 'capsules 2 tablets 500mg', 'morning evening before meals', 'for 3 weeks for 2 days',
+    'with meals with water after meals', 'Tab Dolo 650 mg 1-0-1 x 5 days', '500 mgx tabs',
+    'METFORMIN 500MG TWICE DAILY FOR 30 DAYS BEFORE MEALS', 'syrup 5 ml at bedtime', 'iu 400 iu',
+    '1) TAB. ACBCIXIMAB          1 Morning          8 Days', 'tablets', '5-5-5-5', 'once  daily',
+    'Cap. Omeprazole 20 mg empty stomach morning for 14 days', 'dosage: 1 tablet twice daily',
+    # Non-ASCII lines take the IGNORECASE scanner
+    'Tab. Crocin 500 MG — ½ tablet TWICE daily', 'पैरासिटामोल Paracetamol 650 mg सुबह Morning for 3 days',
+    'Syrup Ascoril 10 ml – thrice daily × 5 days', 'ſyrup 5 ml',
+]
+# Lines that name a drug without prescribing it. They are in the corpus, and with the
+# drug lexicon on none of them may yield a medication (see check_not_prescribed)
+NOT_PRESCRIBED_LINES = [
+    'chief complaint: fever after taking aspirin', 'Allergies: penicillin', 'avoid ibuprofen',
+    'Known allergy to sulfa drugs, avoid aspirin 75 mg', 'h/o asthma on salbutamol inhaler',
+    'Diagnosis: viral fever, took dolo 650 at home', 'C/O vomiting since 2 days',
+]
+# Ordinary words a step or two from a drug name (Vomikind, Lasix, Losar, Concor): never "corrected" into drugs
+SPELLING_TRAP_LINES = [
+    'chief complaints: vomiting since 2 days', 'advice: lasik surgery review', 'vomiting 2 times today',
+    'feels like a loser', 'concord hospital, pune',
+]
+EDGE_LINES += NOT_PRESCRIBED_LINES + SPELLING_TRAP_LINES
+OCR_CONFUSIONS = {'o': '0', 'l': '1', 's': '5', 'i': 'l', 'g': '9', 'm': 'rn'}
+
+
+def _ocr_noise(rng: random.Random, line: str) -> str:
+    chars = []
+    for ch in line:
+        if ch.lower() in OCR_CONFUSIONS and rng.random() < 0.03:
+            chars.append(OCR_CONFUSIONS[ch.lower()])
+        elif ch == ' ' and rng.random() < 0.1:
+            chars.append('   ')
+        else:
+            chars.append(ch)
+    return ''.join(chars)
+
+
+def _medication_row(rng: random.Random, number: int) -> str:
+    name = rng.choice(NAMES)
+    name = rng.choice([name, name.upper(), name.title()])
+    form, strength = rng.choice(FORMS), rng.choice(STRENGTHS)
+    freq, duration, instruction = rng.choice(FREQUENCIES), rng.choice(DURATIONS), rng.choice(INSTRUCTIONS)
+    layouts = [
+        f"{number}) {form} {name} {strength}      {freq}      {duration}",
+        f"{form} {name} {strength} {freq} {duration} {instruction}",
+        f"{name} - {strength} - {freq} - {duration}",
+        f"{number}. {form.upper()} {name.upper()}    {strength}    {freq}",
+        f"{form} {name} {strength}",
+        f"{freq} {instruction}",
+    ]
+    return rng.choice(layouts)
+
+
+def synthetic_corpus(documents: int = 300, seed: int = 7) -> List[str]:
+    """Printed and handwritten-style prescriptions with OCR noise; about half lower-cased like OCR output."""
+    rng = random.Random(seed)
+    corpus = ["\n".join(EDGE_LINES), "\n".join(EDGE_LINES).lower(), ""]
+    for _ in range(documents):
+        lines = rng.sample(HEADERS, rng.randint(2, 6))
+        lines += [_medication_row(rng, n + 1) for n in range(rng.randint(1, 8))]
+        lines += rng.sample(EDGE_LINES, rng.randint(0, 2))
+        if rng.random() < 0.5:
+            rng.shuffle(lines)
+        text = "\n".join(_ocr_noise(rng, line) for line in lines)
+        corpus.append(text.lower() if rng.random() < 0.5 else text)
+    return corpus
+
+
+def directory_corpus(root: str) -> List[str]:
+    texts = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for name in sorted(filenames):
+            if name.lower().endswith(".txt"):
+                with open(os.path.join(dirpath, name), "r", encoding="utf-8", errors="replace") as f:
+                    texts.append(f.read())
+    return texts
+
+
+FIELD_EXTRACTORS = ('extract_dosage', 'extract_frequency', 'extract_duration', 'extract_instructions')
+LEGACY_KEYS = ('name', 'dosage', 'frequency', 'duration', 'instructions', 'info')
+
+
+def check_equivalence(legacy, current, corpus: List[str], show: int = 5) -> int:
+    """Number of documents/lines whose output differs; the first few are printed."""
+    differences = 0
+    for doc_index, text in enumerate(corpus):
+        old = legacy.parse_medications(text)
+        new = [{key: med[key] for key in LEGACY_KEYS} for med in current.parse_medications(text)]
+        if old != new:
+            differences += 1
+            if differences <= show:
+                print(f"Document {doc_index} differs:\n  legacy:  {old}\n  current: {new}")
+        for line in text.split("\n"):
+            for extractor in FIELD_EXTRACTORS:
+                old_field, new_field = getattr(legacy, extractor)(line), getattr(current, extractor)(line)
+                if old_field != new_field:
+                    differences += 1
+                    if differences <= show:
+                        print(f"{extractor}({line!r}): legacy {old_field!r}, current {new_field!r}")
+    return differences
+
+
+def check_not_prescribed(current, show: int = 5) -> int:
+    """Number of NOT_PRESCRIBED_LINES that yield a medication, alone or inside a prescription."""
+    failures = 0
+    prescription = "rx\ntab pan 40 mg 1-0-0 before breakfast"
+    expected = [med['name'] for med in current.parse_medications(prescription)]
+    for line in NOT_PRESCRIBED_LINES:
+        for text in (line, f"{line}\n{prescription}", f"{line.lower()}\n{prescription}"):
+            found = [med['name'] for med in current.parse_medications(text)]
+            if found != (expected if text != line else []):
+                failures += 1
+                if failures <= show:
+                    print(f"Not a prescription, but parsed as {found}: {text!r}")
+    return failures
+
+
+def check_spelling_traps(current, show: int = 5) -> int:
+    """Number of SPELLING_TRAP_LINES in which a word is corrected into a drug name."""
+    failures = 0
+    for line in SPELLING_TRAP_LINES:
+        corrected = [med['name'] for med in current.parse_medications(line) if med.get('corrected_from')]
+        if corrected:
+            failures += 1
+            if failures <= show:
+                print(f"Ordinary words corrected into {corrected}: {line!r}")
+    return failures
+
+
+def best_time(fn: Callable[[], None], repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def benchmark(legacy, current, corpus: List[str], repeat: int) -> List[Tuple[str, float, float]]:
+    """(label, legacy seconds, current seconds) rows; ``current`` is timed as configured."""
+    lines = [line.strip() for text in corpus for line in text.split("\n") if line.strip()]
+
+    def parse(parser):
+        return lambda: [parser.parse_medications(text) for text in corpus]
+
+    def legacy_fields():
+        for line in lines:
+            legacy.extract_dosage(line), legacy.extract_frequency(line)
+            legacy.extract_duration(line), legacy.extract_instructions(line)
+
+    def current_fields():
+        for line in lines:
+            current.scan_line(line)
+
+    return [
+        ("parse_medications (whole corpus)", best_time(parse(legacy), repeat), best_time(parse(current), repeat)),
+        ("line fields (dosage/frequency/duration/instructions)",
+         best_time(legacy_fields, repeat), best_time(current_fields, repeat)),
+    ]
+
+
+def spelling_benchmark(analyzer, corpus: List[str], repeat: int) -> Tuple[int, float]:
+    """Distinct words of the corpus and the best time to correct them all with an empty memo."""
+    text = "\n".join(corpus)
+    words = len(set(analyzer.SPELLING_TOKEN_REGEX.findall(text.lower())))
+    spelling = analyzer.drug_lexicon.spelling
+
+    def run():
+        spelling._memo.clear()
+        analyzer.correct_drug_names(text)
+    return words, best_time(run, repeat)
+
+
+def main():
+    import argparse
+    from services import get_ocr_analyzer
+
+    parser = argparse.ArgumentParser(description="Compare the medication parser against its legacy implementation.")
+    parser.add_argument("--corpus", help="Directory of OCR text files (*.txt) added to the synthetic corpus")
+    parser.add_argument("--documents", type=int, default=300, help="Synthetic prescriptions to generate")
+    parser.add_argument("--seed", type=int, default=7, help="Seed of the synthetic corpus")
+    parser.add_argument("--repeat", type=int, default=5, help="Timing runs; the best one is reported")
+    args = parser.parse_args()
+
+    analyzer = get_ocr_analyzer()
+    legacy = LegacyParser(analyzer)
+    lexicon = analyzer.drug_lexicon
+    corpus = synthetic_corpus(args.documents, args.seed)
+    if args.corpus:
+        corpus += directory_corpus(args.corpus)
+    line_count = sum(1 for text in corpus for line in text.split("\n") if line.strip())
+    print(f"Corpus: {len(corpus)} documents, {line_count} lines")
+
+    analyzer.drug_lexicon = None
+    try:
+        differences = check_equivalence(legacy, analyzer, corpus)
+        if differences:
+            print(f"FAIL: {differences} difference(s) from the legacy parser")
+            return 1
+        print("Equivalence: identical output on every document and line")
+        rows = benchmark(legacy, analyzer, corpus, args.repeat)
+    finally:
+        analyzer.drug_lexicon = lexicon
+    if lexicon is not None:
+        failures = check_not_prescribed(analyzer)
+        if failures:
+            print(f"FAIL: {failures} non-prescription line(s) parsed as medications with the drug lexicon")
+            return 1
+        print("Non-prescription lines: none parsed as medications with the drug lexicon")
+        if analyzer.drug_spelling:
+            failures = check_spelling_traps(analyzer)
+            if failures:
+                print(f"FAIL: {failures} line(s) with ordinary words corrected into drug names")
+                return 1
+            print("Spelling traps: no ordinary word corrected into a drug name")
+        rows.append(("parse_medications with the drug lexicon", rows[0][1],
+                     best_time(lambda: [analyzer.parse_medications(text) for text in corpus], args.repeat)))
+
+    for label, old, new in rows:
+        print(f"{label}: legacy {old * 1000:.1f} ms, current {new * 1000:.1f} ms, "
+              f"{old / new:.2f}x, {line_count / new:,.0f} lines/s")
+    if lexicon is not None and analyzer.drug_spelling:
+        words, seconds = spelling_benchmark(analyzer, corpus, args.repeat)
+        print(f"drug-name spelling lookups (uncached): {words} distinct words in {seconds * 1000:.1f} ms, "
+              f"{seconds / max(words, 1) * 1e6:.1f} us/word")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
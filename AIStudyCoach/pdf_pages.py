@@ -0,0 +1,189 @@
+"""Page-by-page PDF analysis: text layer when present, streamed OCR otherwise.
+
+Pages are handled lazily. For each page the embedded text layer is read
+first; if it holds real text the page is parsed directly and never
+rasterised. Otherwise the page is rendered in grayscale at
+``PDF_RENDER_DPI`` (capped at ``MAX_PAGE_SIDE`` pixels) and OCR'd. At most
+``workers`` pages are in flight at once, so memory stays bounded whatever
+the page count. Results are yielded in page order as soon as each page is
+ready.
+
+Needs pypdfium2 (preferred) or PyMuPDF; ``pdf_support_available()`` says
+whether either is installed.
+
+Env vars: PDF_RENDER_DPI, PDF_MAX_PAGES, PDF_PAGE_WORKERS
+"""
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, List, NamedTuple, Optional
+
+from PIL import Image
+
+try:
+    import pypdfium2 as pdfium
+except ImportError:
+    pdfium = None
+
+try:
+    import fitz  # PyMuPDF
+except ImportError:
+    fitz = None
+
+MAX_PAGE_SIDE = 5000
+# Fewer characters than this on a page means a scan (or a stray header), not a text layer
+MIN_TEXT_CHARS = 40
+
+
+class PageResult(NamedTuple):
+    index: int
+    page_count: int
+    source: str          # "text" (embedded layer), "ocr", "empty" or "error"
+    text: str
+    medications: list
+    seconds: float
+    error: Optional[str] = None
+
+
+def pdf_support_available() -> bool:
+    return pdfium is not None or fitz is not None
+
+
+def is_pdf(data: bytes) -> bool:
+    return data[:5] == b"%PDF-"
+
+
+def usable_text_layer(text: str) -> bool:
+    """True if the text layer holds enough real text to skip OCR."""
+    stripped = "".join(text.split())
+    if len(stripped) < MIN_TEXT_CHARS:
+        return False
+    # Broken font encodings come out as control or replacement characters
+    readable = sum(1 for ch in stripped if ch.isprintable() and ch != "�")
+    return readable / len(stripped) > 0.9
+
+
+class PdfDocument:
+    """Lazy page access over pypdfium2 or PyMuPDF.
+
+    Neither library is thread-safe, so ``text`` and ``render`` serialise on
+    ``lock``; only OCR of the rendered pages runs in parallel.
+    """
+
+    def __init__(self, data: bytes):
+        self.lock = threading.Lock()
+        if pdfium is not None:
+            self.backend = "pypdfium2"
+            self._doc = pdfium.PdfDocument(data)
+        elif fitz is not None:
+            self.backend = "pymupdf"
+            self._doc = fitz.open(stream=data, filetype="pdf")
+        else:
+            raise RuntimeError("PDF support needs pypdfium2 or PyMuPDF (pip install pypdfium2)")
+
+    def __len__(self) -> int:
+        return len(self._doc)
+
+    def text(self, index: int) -> str:
+        with self.lock:
+            if self.backend == "pypdfium2":
+                page = self._doc[index]
+                textpage = page.get_textpage()
+                try:
+                    # pdfium separates lines with \r\n
+                    return textpage.get_text_range().replace("\r\n", "\n")
+                finally:
+                    textpage.close()
+                    page.close()
+            return self._doc[index].get_text()
+
+    def render(self, index: int, dpi: int) -> Image.Image:
+        """Grayscale rendering of one page; OCR doesn't need colour and it is a third of the memory."""
+        with self.lock:
+            if self.backend == "pypdfium2":
+                page = self._doc[index]
+                try:
+                    width, height = page.get_size()
+                    scale = min(dpi / 72.0, MAX_PAGE_SIDE / max(width, height))
+                    bitmap = page.render(scale=scale, grayscale=True)
+                    # to_pil() shares the bitmap's buffer; copy before the bitmap goes away
+                    image = bitmap.to_pil().copy()
+                    bitmap.close()
+                    return image
+                finally:
+                    page.close()
+            page = self._doc[index]
+            scale = min(dpi / 72.0, MAX_PAGE_SIDE / max(page.rect.width, page.rect.height))
+            pixmap = page.get_pixmap(matrix=fitz.Matrix(scale, scale), colorspace=fitz.csGRAY, alpha=False)
+            return Image.frombytes("L", (pixmap.width, pixmap.height), pixmap.samples)
+
+    def close(self) -> None:
+        self._doc.close()
+
+
+def page_count(data: bytes) -> int:
+    doc = PdfDocument(data)
+    try:
+        return len(doc)
+    finally:
+        doc.close()
+
+
+def iter_page_results(data: bytes, analyzer, tesseract_lang: str = "eng", dpi: Optional[int] = None,
+                      workers: Optional[int] = None, max_pages: Optional[int] = None) -> Iterator[PageResult]:
+    """Analyse the pages of a PDF, yielding English results in page order as they complete."""
+    dpi = dpi or int(os.getenv("PDF_RENDER_DPI", "200"))
+    workers = max(1, workers or int(os.getenv("PDF_PAGE_WORKERS", "2")))
+    max_pages = max_pages or int(os.getenv("PDF_MAX_PAGES", "30"))
+    doc = PdfDocument(data)
+    total = min(len(doc), max_pages)
+
+    def analyze_page(index: int) -> PageResult:
+        started = time.perf_counter()
+        try:
+            text = doc.text(index)
+            if usable_text_layer(text):
+                text = text.strip()
+                return PageResult(index, total, "text", text, analyzer.parse_medications(text.lower()),
+                                  time.perf_counter() - started)
+            image = doc.render(index, dpi)
+            result, error = analyzer.analyze_prescription(image, 'en', tesseract_lang=tesseract_lang)
+            if not result:
+                return PageResult(index, total, "empty", "", [], time.perf_counter() - started, error)
+            return PageResult(index, total, "ocr", result['extracted_text'], result['medications'],
+                              time.perf_counter() - started)
+        except Exception as e:
+            return PageResult(index, total, "error", "", [], time.perf_counter() - started, str(e))
+
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pdf-page")
+    in_flight = deque()
+    next_page = 0
+    try:
+        while next_page < total and len(in_flight) < workers:
+            in_flight.append(pool.submit(analyze_page, next_page))
+            next_page += 1
+        while in_flight:
+            page = in_flight.popleft().result()
+            if next_page < total:
+                in_flight.append(pool.submit(analyze_page, next_page))
+                next_page += 1
+            yield page
+    finally:
+        # Also runs if the consumer stops early; pages must finish before the document closes
+        pool.shutdown(wait=True, cancel_futures=True)
+        doc.close()
+
+
+def merge_pages(pages: List[PageResult]) -> dict:
+    """One result for the whole document: page-labelled text and de-duplicated medications."""
+    texts = [f"--- Page {p.index + 1} ---\n{p.text}" for p in pages if p.text.strip()]
+    medications, seen = [], set()
+    for page in pages:
+        for med in page.medications:
+            key = (med.get('name') or '').lower()
+            if key not in seen:
+                seen.add(key)
+                medications.append(med)
+    return {'extracted_text': "\n\n".join(texts), 'medications': medications}
@@ -0,0 +1,209 @@
+"""Streamed full-record export for a single user.
+
+The exporter walks the DB manager's ``iter_*`` helpers row by row and reads
+document/audio payloads chunk by chunk, so memory stays bounded by the chunk
+size no matter how much data a user has.
+
+Usage (CLI):
+    python record_export.py --user-id 12 --out user12.zip
+    python record_export.py --user-id 12 --format ndjson --out user12.ndjson
+"""
+import base64
+import json
+import os
+import zipfile
+from datetime import datetime
+from typing import Any, Dict, Iterator
+
+EXPORT_VERSION = 1
+# A multiple of 3 so every base64 chunk in NDJSON decodes independently
+DEFAULT_CHUNK_SIZE = 48 * 1024
+# Leading bytes of the audio containers a clinical note may hold -> file extension
+AUDIO_SIGNATURES = (
+    (b"RIFF", "wav"), (b"OggS", "ogg"), (b"fLaC", "flac"), (b"ID3", "mp3"), (b"\xff\xfb", "mp3"),
+    (b"\x1aE\xdf\xa3", "webm"),
+)
+
+
+def _clean_name(name: str) -> str:
+    return "".join(c if c.isalnum() or c in "._-" else "_" for c in (name or "file"))
+
+
+def audio_extension(head: bytes) -> str:
+    """Extension for audio starting with ``head`` (12 bytes are enough); ``bin`` if the format is unknown."""
+    if head[4:8] == b"ftyp":
+        return "m4a"
+    for signature, ext in AUDIO_SIGNATURES:
+        if head.startswith(signature):
+            return ext
+    return "bin"
+
+
+class RecordExporter:
+    """Build a JSON bundle (NDJSON or zip) of one user's complete data."""
+
+    def __init__(self, db_manager, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        self.db = db_manager
+        self.chunk_size = max(3, chunk_size // 3 * 3)
+
+    def iter_records(self, user_id) -> Iterator[Dict[str, Any]]:
+        """Yield one dict per exported row, without any binary payloads."""
+        profile = self.db.get_user_profile(user_id)
+        if not profile:
+            raise ValueError(f"User {user_id} not found")
+        yield {
+            "type": "export",
+            "version": EXPORT_VERSION,
+            "user_id": user_id,
+            "exported_at": datetime.now().isoformat(timespec="seconds"),
+        }
+        yield {
+            "type": "profile",
+            "id": profile[0], "name": profile[1], "phone": profile[2], "age": profile[3],
+            "gender": profile[4], "state": profile[5], "city": profile[6], "created_at": profile[7],
+        }
+        for r in self.db.iter_health_records(user_id):
+            yield {
+                "type": "health_record",
+                "id": r[0], "record_date": r[1], "record_type": r[2], "description": r[3],
+                "doctor_name": r[4], "hospital_name": r[5], "created_at": r[6],
+            }
+        for v in self.db.iter_vital_signs(user_id):
+            yield {
+                "type": "vital_sign",
+                "id": v[0], "measurement_type": v[1], "value": v[2], "unit": v[3], "measurement_date": v[4],
+            }
+        for d in self.db.iter_document_meta(user_id):
+            yield {
+                "type": "document",
+                "id": d[0], "filename": d[1], "document_type": d[2], "file_type": d[3],
+                "upload_date": d[4], "size": d[5],
+            }
+        for p in self.db.iter_prescription_analyses(user_id):
+            yield {
+                "type": "prescription_analysis",
+                "id": p[0], "filename": p[1], "extracted_text": p[2], "medications": p[3], "analysis_date": p[4],
+            }
+        for n in self.db.iter_clinical_notes(user_id):
+            summary = None
+            if n[13] is not None:
+                summary = {
+                    "chief_complaint": n[5], "symptoms": n[6], "medications": n[7], "findings": n[8],
+                    "plan": n[9], "follow_up": n[10], "additional_notes": n[11], "model": n[12], "created_at": n[13],
+                }
+            yield {
+                "type": "clinical_note",
+                "id": n[0], "transcript": n[1], "source_language": n[2], "created_at": n[3],
+                "has_audio": bool(n[4]), "summary": summary,
+            }
+
+    @staticmethod
+    def _line(obj: Dict[str, Any]) -> bytes:
+        return (json.dumps(obj, ensure_ascii=False, default=str) + "\n").encode("utf-8")
+
+    def iter_ndjson(self, user_id) -> Iterator[bytes]:
+        """Yield the export as NDJSON lines; payloads follow their row as base64 chunk lines."""
+        for rec in self.iter_records(user_id):
+            yield self._line(rec)
+            if rec["type"] == "document":
+                chunks = self.db.iter_document_bytes(rec["id"], self.chunk_size)
+                kind, key = "document_chunk", "document_id"
+            elif rec["type"] == "clinical_note" and rec["has_audio"]:
+                chunks = self.db.iter_clinical_audio_bytes(rec["id"], self.chunk_size)
+                kind, key = "audio_chunk", "note_id"
+            else:
+                continue
+            for seq, chunk in enumerate(chunks):
+                yield self._line({"type": kind, key: rec["id"], "seq": seq, "data": base64.b64encode(chunk).decode()})
+
+    def write_ndjson(self, user_id, fileobj) -> None:
+        for line in self.iter_ndjson(user_id):
+            fileobj.write(line)
+
+    def write_zip(self, user_id, fileobj) -> None:
+        """Write a zip with ``records.ndjson`` plus raw document and audio files.
+
+        ``fileobj`` may be unseekable (e.g. a socket or pipe); members are
+        written incrementally so only one chunk is held in memory at a time.
+        """
+        with zipfile.ZipFile(fileobj, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+            payloads = []
+            with zf.open("records.ndjson", "w", force_zip64=True) as records:
+                for rec in self.iter_records(user_id):
+                    if rec["type"] == "document":
+                        rec["path"] = f"documents/{rec['id']}_{_clean_name(rec['filename'])}"
+                        payloads.append((rec["path"], self.db.iter_document_bytes, rec["id"]))
+                    elif rec["type"] == "clinical_note" and rec["has_audio"]:
+                        # The format isn't stored with the note, so it is read from the audio's first bytes
+                        head = next(iter(self.db.iter_clinical_audio_bytes(rec["id"], 12)), b"")
+                        rec["audio_path"] = f"audio/note_{rec['id']}.{audio_extension(head)}"
+                        payloads.append((rec["audio_path"], self.db.iter_clinical_audio_bytes, rec["id"]))
+                    records.write(self._line(rec))
+            # Only (path, reader, id) triples are kept above, never the bytes themselves
+            for path, reader, row_id in payloads:
+                with zf.open(path, "w", force_zip64=True) as member:
+                    for chunk in reader(row_id, self.chunk_size):
+                        member.write(chunk)
+
+    def export_to_file(self, user_id, path, fmt="zip") -> str:
+        """Stream an export straight to disk and return the path."""
+        with open(path, "wb") as fh:
+            if fmt == "ndjson":
+                self.write_ndjson(user_id, fh)
+            else:
+                self.write_zip(user_id, fh)
+        return path
+
+    @staticmethod
+    def default_filename(user_id, fmt="zip") -> str:
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        return f"arogya_mitra_user{user_id}_{stamp}.{'ndjson' if fmt == 'ndjson' else 'zip'}"
+
+
+def export_to_tempfile(db_manager, user_id, fmt="zip"):
+    """Stream an export into a temp file on disk and return it rewound for reading.
+
+    The caller owns the file and closes it (``with export_to_tempfile(...) as f``).
+    """
+    import tempfile
+    tmp = tempfile.TemporaryFile()
+    exporter = RecordExporter(db_manager)
+    if fmt == "ndjson":
+        exporter.write_ndjson(user_id, tmp)
+    else:
+        exporter.write_zip(user_id, tmp)
+    tmp.seek(0)
+    return tmp
+
+
+def export_download(db_manager, user_id, fmt="zip"):
+    """Return ``(data, file_name, mime)`` for a download button.
+
+    The export is built on disk and its temp file is closed before
+    returning. ``st.download_button`` keeps the whole payload in memory
+    anyway, and it rejects the temp file's BufferedRandom type.
+    """
+    with export_to_tempfile(db_manager, user_id, fmt) as export_file:
+        data = export_file.read()
+    mime = "application/zip" if fmt == "zip" else "application/x-ndjson"
+    return data, RecordExporter.default_filename(user_id, fmt), mime
+
+
+def main():
+    import argparse
+    from db_router import get_db_manager
+
+    parser = argparse.ArgumentParser(description="Export all data of one user as a JSON bundle.")
+    parser.add_argument("--user-id", type=int, required=True)
+    parser.add_argument("--format", choices=["zip", "ndjson"], default="zip")
+    parser.add_argument("--out", help="Output path (default: auto-named in the current directory)")
+    args = parser.parse_args()
+
+    exporter = RecordExporter(get_db_manager())
+    out = args.out or RecordExporter.default_filename(args.user_id, args.format)
+    exporter.export_to_file(args.user_id, out, args.format)
+    print(f"Exported user {args.user_id} to {out} ({os.path.getsize(out):,} bytes)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Local language detection from Unicode script, for en/hi/bn/or/ml.
+
+Each supported Indic language has its own 128-codepoint block, and in UTF-8
+every character of a block starts with the same two bytes (e.g. Devanagari
+U+0900-U+097F is ``E0 A4``/``E0 A5``). Counting those byte pairs with
+``bytes.count`` and Latin letters with ``bytes.translate`` is a C-level scan,
+with no per-character Python loop.
+
+Latin text is only called English when it contains common English words;
+otherwise (romanised Hindi, brand names, mixed scripts) the result is marked
+ambiguous and the caller may ask a network detector. The caller stores that
+verdict back with ``remember``, so the same text never goes to the network
+twice.
+"""
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+
+# language -> UTF-8 lead byte pairs of its script block
+SCRIPT_PREFIXES = {
+    "hi": (b"\xe0\xa4", b"\xe0\xa5"),   # Devanagari U+0900-U+097F
+    "bn": (b"\xe0\xa6", b"\xe0\xa7"),   # Bengali    U+0980-U+09FF
+    "or": (b"\xe0\xac", b"\xe0\xad"),   # Oriya      U+0B00-U+0B7F
+    "ml": (b"\xe0\xb4", b"\xe0\xb5"),   # Malayalam  U+0D00-U+0D7F
+}
+_ASCII_LETTERS = b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+_NOT_ASCII_LETTERS = bytes(b for b in range(256) if b not in _ASCII_LETTERS)
+
+ENGLISH_HINTS = frozenset(
+    "the a an and or of to in on for with is are was be have has i you my your it this that "
+    "what how when why can do does not no take after before daily day times tablet medicine "
+    "doctor pain fever please help".split()
+)
+_WORD = re.compile(r"[A-Za-z]+")
+
+# Share of script characters the winning script needs to be trusted on its own
+MIN_CONFIDENCE = 0.8
+
+
+class ScriptDetection(NamedTuple):
+    language: Optional[str]
+    confidence: Optional[float]
+    ambiguous: bool
+    source: str = "script"  # or "backend" for a remembered network verdict
+
+
+def _scan(text: str) -> ScriptDetection:
+    raw = text.encode("utf-8")
+    counts = {lang: sum(raw.count(p) for p in prefixes) for lang, prefixes in SCRIPT_PREFIXES.items()}
+    counts["en"] = len(raw.translate(None, _NOT_ASCII_LETTERS))
+    total = sum(counts.values())
+    if not total:
+        return ScriptDetection(None, 0.0, True)
+    language, top = max(counts.items(), key=lambda kv: kv[1])
+    confidence = top / total
+    if confidence < MIN_CONFIDENCE:
+        return ScriptDetection(language, confidence, True)
+    if language != "en":
+        return ScriptDetection(language, confidence, False)
+    words = _WORD.findall(text.lower())
+    hits = sum(1 for w in words if w in ENGLISH_HINTS)
+    # Short texts need one hint word, longer ones a fifth of their words
+    english = hits >= 1 if len(words) <= 5 else hits / len(words) >= 0.2
+    return ScriptDetection("en", confidence if english else confidence / 2, not english)
+
+
+class ScriptDetector:
+    """Script-based detector with a small LRU keyed by text hash."""
+
+    def __init__(self, max_entries: int = 4096):
+        self.max_entries = max_entries
+        self._cache: "OrderedDict[bytes, ScriptDetection]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(text: str) -> bytes:
+        return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+    def _store(self, key: bytes, result: ScriptDetection) -> None:
+        with self._lock:
+            self._cache[key] = result
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+    def detect(self, text: str) -> ScriptDetection:
+        if not text or not text.strip():
+            return ScriptDetection(None, 0.0, True)
+        key = self._key(text)
+        with self._lock:
+            hit = self._cache.get(key)
+            if hit is not None:
+                self._cache.move_to_end(key)
+                return hit
+        result = _scan(text)
+        self._store(key, result)
+        return result
+
+    def remember(self, text: str, language: str) -> None:
+        """Cache a backend's verdict for ``text``; ``detect`` then returns it, unambiguous."""
+        if text and text.strip():
+            self._store(self._key(text), ScriptDetection(language, None, False, "backend"))
+
+
+_shared_detector = ScriptDetector()
+
+
+def get_script_detector() -> ScriptDetector:
+    return _shared_detector
@@ -0,0 +1,152 @@
+"""Process-wide registry of the app's heavy service objects.
+
+Streamlit re-executes ``app.py`` on every interaction, but imported modules
+stay loaded, so a module-level registry gives one instance per process that
+every session and page shares. Each service is built lazily on first use,
+under its own lock, and its module is only imported then.
+
+    from services import get_db_manager, get_translator
+    db = get_db_manager()
+
+Tests (or an admin "reload") can drop instances with ``reset_services()``
+or swap one in with ``register_service(name, obj)``.
+"""
+import threading
+from typing import Any, Callable, Dict, Optional
+
+_instances: Dict[str, Any] = {}
+_locks: Dict[str, threading.Lock] = {}
+_registry_lock = threading.Lock()
+
+
+def _build_db_manager():
+    from db_router import get_db_manager as build
+    return build()
+
+
+def _build_translator():
+    from translator import TranslationManager
+    from translation_warmup import start_warmup
+    translator = TranslationManager()
+    # Fill catalogs/cache and prefetch frequent misses without blocking the first render
+    start_warmup(translator)
+    return translator
+
+
+def _build_ocr_analyzer():
+    from ocr_analyzer import PrescriptionAnalyzer
+    return PrescriptionAnalyzer(translator=get_translator())
+
+
+def _build_sos_manager():
+    from emergency_sos import EmergencySOSManager
+    return EmergencySOSManager()
+
+
+def _build_dashboard():
+    from health_dashboard import HealthDashboard
+    return HealthDashboard(get_db_manager(), translator=get_translator())
+
+
+def _build_admin_portal():
+    from admin_portal import AdminPortal
+    return AdminPortal(db_manager=get_db_manager(), translator=get_translator())
+
+
+def _build_chatbot():
+    from health_chatbot import HealthChatbot
+    return HealthChatbot(translator=get_translator())
+
+
+def _build_speech_notes():
+    # Optional: faster-whisper may not be installed
+    try:
+        from speech_notes import SpeechNotesManager
+    except Exception:
+        return None
+    return SpeechNotesManager()
+
+
+def _build_summarizer():
+    try:
+        from summarizer import ClinicalNoteSummarizer
+    except Exception:
+        return None
+    return ClinicalNoteSummarizer()
+
+
+FACTORIES: Dict[str, Callable[[], Any]] = {
+    "db": _build_db_manager,
+    "translator": _build_translator,
+    "ocr": _build_ocr_analyzer,
+    "sos": _build_sos_manager,
+    "dashboard": _build_dashboard,
+    "admin_portal": _build_admin_portal,
+    "chatbot": _build_chatbot,
+    "speech_notes": _build_speech_notes,
+    "summarizer": _build_summarizer,
+}
+
+
+def get_service(name: str) -> Any:
+    """Return the shared instance for ``name``, building it on first call."""
+    if name in _instances:
+        return _instances[name]
+    if name not in FACTORIES:
+        raise KeyError(f"Unknown service: {name}")
+    with _registry_lock:
+        lock = _locks.setdefault(name, threading.Lock())
+    # Per-service lock: a slow build (e.g. the Whisper model) doesn't block the others
+    with lock:
+        if name not in _instances:
+            _instances[name] = FACTORIES[name]()
+        return _instances[name]
+
+
+def register_service(name: str, instance: Any) -> None:
+    """Install a pre-built instance (e.g. a test double or a differently configured manager)."""
+    with _registry_lock:
+        _instances[name] = instance
+
+
+def reset_services(*names: str) -> None:
+    """Drop the named instances (all of them if none given); they are rebuilt on next use."""
+    with _registry_lock:
+        for name in names or list(_instances):
+            _instances.pop(name, None)
+
+
+def get_db_manager():
+    return get_service("db")
+
+
+def get_translator():
+    return get_service("translator")
+
+
+def get_ocr_analyzer():
+    return get_service("ocr")
+
+
+def get_sos_manager():
+    return get_service("sos")
+
+
+def get_dashboard():
+    return get_service("dashboard")
+
+
+def get_admin_portal():
+    return get_service("admin_portal")
+
+
+def get_chatbot():
+    return get_service("chatbot")
+
+
+def get_speech_notes() -> Optional[Any]:
+    return get_service("speech_notes")
+
+
+def get_summarizer() -> Optional[Any]:
+    return get_service("summarizer")
@@ -0,0 +1,54 @@
+"""Language detection must not ask the network twice about the same text."""
+from script_detector import ScriptDetector
+from translation_backends import TranslationBackend
+
+
+class CountingBackend(TranslationBackend):
+    name = "counting"
+
+    def __init__(self, verdict="hi"):
+        self.verdict = verdict
+        self.calls = 0
+
+    def detect(self, text):
+        self.calls += 1
+        return self.verdict
+
+
+def make_manager(tmp_path, monkeypatch, backend):
+    monkeypatch.setenv("TRANSLATION_CACHE_PATH", str(tmp_path / "translation_cache.db"))
+    from translator import TranslationManager
+    manager = TranslationManager(backends=[backend])
+    # Own detector so other tests' texts can't already be cached
+    manager.script_detector = ScriptDetector()
+    return manager
+
+
+def test_backend_verdict_is_cached(tmp_path, monkeypatch):
+    backend = CountingBackend("hi")
+    manager = make_manager(tmp_path, monkeypatch, backend)
+    text = "mujhe bukhar hai aur sar dard"  # romanised Hindi: ambiguous Latin
+
+    assert manager.detect_language_details(text) == ("hi", None, "backend")
+    assert manager.detect_language_details(text) == ("hi", None, "backend")
+    assert manager.detect_language(text) == "hi"
+    assert backend.calls == 1
+
+
+def test_script_verdict_never_calls_backend(tmp_path, monkeypatch):
+    backend = CountingBackend("en")
+    manager = make_manager(tmp_path, monkeypatch, backend)
+
+    language, _, source = manager.detect_language_details("मुझे बुखार है")
+    assert (language, source) == ("hi", "script")
+    assert backend.calls == 0
+
+
+def test_failed_backend_detection_is_retried(tmp_path, monkeypatch):
+    backend = CountingBackend(None)
+    manager = make_manager(tmp_path, monkeypatch, backend)
+    text = "mujhe bukhar hai"
+
+    assert manager.detect_language_details(text)[2] == "default"
+    manager.detect_language_details(text)
+    assert backend.calls == 2
@@ -0,0 +1,125 @@
+"""Text-region detection so OCR skips margins, logos and stamps.
+
+``detect_text_regions`` finds text lines on a reduced grayscale copy with
+OpenCV: morphological gradient, Otsu threshold, then a horizontal close
+that joins characters into line blobs. Blobs too tall, too square or too
+solid to be text (logos, stamps, photos, ruling lines) are dropped. The
+remaining lines are grouped into blocks, top to bottom, and mapped back to
+full-resolution boxes.
+
+``compose_regions`` pastes the blocks into one compact canvas in reading
+order, keeping each block's horizontal offset so table columns stay
+aligned. The OCR pipelines then scale and binarise only text pixels, and a
+single tesseract pass reads the blocks in order.
+
+Without OpenCV, detection returns no regions and callers OCR the full page.
+"""
+from typing import List, NamedTuple, Optional
+
+from PIL import Image, ImageOps, ImageStat
+
+DETECT_MAX_SIDE = 1600
+# Pages whose text already covers this share of the area are OCR'd whole
+MAX_USEFUL_COVERAGE = 0.8
+
+
+class Region(NamedTuple):
+    x: int
+    y: int
+    w: int
+    h: int
+
+
+def _line_boxes(small, cv2, np) -> List[Region]:
+    height, width = small.shape
+    grad = cv2.morphologyEx(small, cv2.MORPH_GRADIENT, cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3, 3)))
+    _, bw = cv2.threshold(grad, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    # Wide, flat kernel: joins the characters of a line, not neighbouring lines
+    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (max(9, width // 60), 1))
+    closed = cv2.morphologyEx(bw, cv2.MORPH_CLOSE, kernel)
+    contours, _ = cv2.findContours(closed, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    boxes = []
+    for contour in contours:
+        x, y, w, h = cv2.boundingRect(contour)
+        if h < 6 or w < 8 or h > height * 0.12:
+            continue  # specks, or blobs taller than any text line
+        fill = cv2.countNonZero(bw[y:y + h, x:x + w]) / float(w * h)
+        if fill < 0.1 or (fill > 0.9 and h < 12):
+            continue  # empty frames and ruling lines
+        boxes.append(Region(x, y, w, h))
+    if not boxes:
+        return []
+    line_height = float(np.median([b.h for b in boxes]))
+    # Logos and stamps: much taller than the body text without being line-shaped
+    return [b for b in boxes if not (b.h > 3 * line_height and b.w < 3 * b.h)]
+
+
+def _group_blocks(lines: List[Region], gap: float) -> List[Region]:
+    """Merge lines whose vertical gap is below ``gap`` into blocks, top to bottom."""
+    blocks: List[List[int]] = []
+    for line in sorted(lines, key=lambda b: b.y):
+        x0, y0, x1, y1 = line.x, line.y, line.x + line.w, line.y + line.h
+        if blocks and y0 - blocks[-1][3] < gap:
+            block = blocks[-1]
+            block[0], block[1] = min(block[0], x0), min(block[1], y0)
+            block[2], block[3] = max(block[2], x1), max(block[3], y1)
+        else:
+            blocks.append([x0, y0, x1, y1])
+    return [Region(x0, y0, x1 - x0, y1 - y0) for x0, y0, x1, y1 in blocks]
+
+
+def detect_text_regions(image: Image.Image) -> List[Region]:
+    """Text blocks in reading order, in full-resolution pixels; [] if nothing (or no OpenCV)."""
+    try:
+        import cv2
+        import numpy as np
+    except ImportError:
+        return []
+    gray = np.asarray(ImageOps.grayscale(image), dtype=np.uint8)
+    ratio = min(1.0, DETECT_MAX_SIDE / float(max(gray.shape)))
+    small = cv2.resize(gray, None, fx=ratio, fy=ratio, interpolation=cv2.INTER_AREA) if ratio < 1.0 else gray
+    lines = _line_boxes(small, cv2, np)
+    if not lines:
+        return []
+    line_height = float(np.median([b.h for b in lines]))
+    blocks = _group_blocks(lines, gap=1.5 * line_height)
+    pad = int(round(0.5 * line_height))
+    regions = []
+    for b in blocks:
+        x0 = max(0, int((b.x - pad) / ratio))
+        y0 = max(0, int((b.y - pad) / ratio))
+        x1 = min(image.width, int((b.x + b.w + pad) / ratio) + 1)
+        y1 = min(image.height, int((b.y + b.h + pad) / ratio) + 1)
+        regions.append(Region(x0, y0, x1 - x0, y1 - y0))
+    return regions
+
+
+def coverage(image: Image.Image, regions: List[Region]) -> float:
+    return sum(r.w * r.h for r in regions) / float(image.width * image.height)
+
+
+def compose_regions(image: Image.Image, regions: List[Region], gap: int = 20) -> Image.Image:
+    """Stack the region crops top to bottom on a paper-coloured canvas, keeping their x offsets."""
+    # reduce() and a median fill colour need real pixel values, not palette indices or CMYK
+    if image.mode not in ("L", "RGB"):
+        image = image.convert("L" if image.mode in ("1", "LA", "I", "I;16", "F") else "RGB")
+    left = min(r.x for r in regions)
+    width = max(r.x + r.w for r in regions) - left + 2 * gap
+    height = sum(r.h for r in regions) + gap * (len(regions) + 1)
+    # Median colour of the page is the paper, whether it is white, off-white or dark
+    sample = image.reduce(max(1, max(image.size) // 200))
+    fill = tuple(int(v) for v in ImageStat.Stat(sample).median)
+    canvas = Image.new(image.mode, (width, height), fill[0] if len(fill) == 1 else fill)
+    y = gap
+    for r in regions:
+        canvas.paste(image.crop((r.x, r.y, r.x + r.w, r.y + r.h)), (r.x - left + gap, y))
+        y += r.h + gap
+    return canvas
+
+
+def text_canvas(image: Image.Image) -> Optional[Image.Image]:
+    """Compact canvas of the page's text blocks, or None when the full page should be OCR'd."""
+    regions = detect_text_regions(image)
+    if not regions or coverage(image, regions) > MAX_USEFUL_COVERAGE:
+        return None
+    return compose_regions(image, regions)
@@ -0,0 +1,416 @@
+"""Translation backends behind ``TranslationManager``.
+
+Each backend returns a translation or ``None`` ("can't do this one"), and
+``TranslationManager`` tries them in the order given by
+``TRANSLATION_BACKENDS`` (default ``glossary,memory,google``). Results go into the
+same cache under the same ``cache_key(text, lang)``, whichever backend
+produced them, and every backend may ``learn`` from the others' output.
+
+- ``glossary``: in-process phrase table (built-in medical terms plus an
+  optional JSON file), exact-match only, no network.
+- ``memory``: translation memory with number masking; same sentence only,
+  fuzzy matching is opt-in (see ``translation_memory.py``).
+- ``local_model``: a local seq2seq model through ``transformers`` when
+  ``LOCAL_TRANSLATION_MODEL`` points at one (e.g. an NLLB checkpoint).
+- ``google``: googletrans web endpoint, with packed batch requests and a
+  circuit breaker.
+
+Offline deployments set ``TRANSLATION_BACKENDS=glossary`` (optionally
+``glossary,local_model``) and ship a phrase table exported from an online
+instance:
+
+    python translation_backends.py export-phrases --out data/phrase_table.json
+"""
+import json
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional
+
+from circuit_breaker import get_breaker
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Common medical terms that should be handled carefully
+MEDICAL_GLOSSARY = {
+    'prescription': {
+        'hi': 'नुस्खा',
+        'bn': 'প্রেসক্রিপশন',
+        'or': 'ପ୍ରେସକ୍ରିପସନ୍',
+        'ml': 'കുറിപ്പടി'
+    },
+    'medicine': {
+        'hi': 'दवा',
+        'bn': 'ওষুধ',
+        'or': 'ଔଷଧ',
+        'ml': 'മരുന്ന്'
+    },
+    'dosage': {
+        'hi': 'खुराक',
+        'bn': 'ডোজ',
+        'or': 'ମାତ୍ରା',
+        'ml': 'അളവ്'
+    },
+    'doctor': {
+        'hi': 'डॉक्टर',
+        'bn': 'ডাক্তার',
+        'or': 'ଡାକ୍ତର',
+        'ml': 'ഡോക്ടർ'
+    },
+    'hospital': {
+        'hi': 'अस्पताल',
+        'bn': 'হাসপাতাল',
+        'or': 'ଡାକ୍ତରଖାନା',
+        'ml': 'ആശുപത്രി'
+    }
+}
+
+
+class TranslationBackend:
+    name = "base"
+
+    @property
+    def available(self) -> bool:
+        return True
+
+    @property
+    def is_open(self) -> bool:
+        """True while a remote backend is short-circuited by its breaker."""
+        return False
+
+    def translate(self, text: str, target_language: str) -> Optional[str]:
+        raise NotImplementedError
+
+    def translate_many(self, texts: List[str], target_language: str) -> Dict[str, str]:
+        """Return {text: translation} for the texts this backend could handle."""
+        out = {}
+        for text in texts:
+            result = self.translate(text, target_language)
+            if result is not None:
+                out[text] = result
+        return out
+
+    def detect(self, text: str) -> Optional[str]:
+        return None
+
+    def cacheable(self, text: str, target_language: str) -> bool:
+        """False for approximate results that must not be cached or learned from."""
+        return True
+
+    def learn(self, translations: Dict[str, str], target_language: str) -> int:
+        """Called with other backends' fresh results; returns how many were kept."""
+        return 0
+
+    def stats(self) -> Dict[str, object]:
+        return {"name": self.name, "state": "closed"}
+
+
+def _normalize(text: str) -> str:
+    return re.sub(r"\s+", " ", text.strip()).lower()
+
+
+class GlossaryBackend(TranslationBackend):
+    """Exact phrase lookups from the built-in glossary and an optional JSON phrase table.
+
+    Phrase table format: ``{lang: {source: translation}}``
+    (env ``TRANSLATION_PHRASE_TABLE``, default ``data/phrase_table.json``).
+    Multi-line text is translated line by line only if every line is known.
+    """
+    name = "glossary"
+
+    def __init__(self, phrase_table_path: Optional[str] = None):
+        self.phrase_table_path = phrase_table_path or os.getenv(
+            "TRANSLATION_PHRASE_TABLE", os.path.join(BASE_DIR, "data", "phrase_table.json")
+        )
+        self.phrases: Dict[str, Dict[str, str]] = {}
+        for term, translations in MEDICAL_GLOSSARY.items():
+            for lang, translated in translations.items():
+                self.phrases.setdefault(lang, {})[term] = translated
+        self._load_phrase_table()
+
+    def _load_phrase_table(self):
+        try:
+            with open(self.phrase_table_path, encoding="utf-8") as fh:
+                table = json.load(fh)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            print(f"Phrase table load error: {e}")
+            return
+        for lang, entries in table.items():
+            bucket = self.phrases.setdefault(lang, {})
+            for source, translated in entries.items():
+                bucket[_normalize(source)] = translated
+
+    def translate(self, text: str, target_language: str) -> Optional[str]:
+        table = self.phrases.get(target_language)
+        if not table:
+            return None
+        hit = table.get(_normalize(text))
+        if hit is not None or "\n" not in text:
+            return hit
+        lines = []
+        for line in text.split("\n"):
+            if not line.strip():
+                lines.append(line)
+                continue
+            hit = table.get(_normalize(line))
+            if hit is None:
+                return None
+            lines.append(hit)
+        return "\n".join(lines)
+
+
+# NLLB-style target codes used by the local model backend
+LOCAL_MODEL_LANG_CODES = {
+    'en': 'eng_Latn',
+    'hi': 'hin_Deva',
+    'bn': 'ben_Beng',
+    'or': 'ory_Orya',
+    'ml': 'mal_Mlym',
+}
+
+
+class LocalModelBackend(TranslationBackend):
+    """Optional on-box model (``transformers`` translation pipeline), loaded on first use."""
+    name = "local_model"
+
+    def __init__(self, model_path: Optional[str] = None):
+        self.model_path = model_path or os.getenv("LOCAL_TRANSLATION_MODEL")
+        self._pipeline = None
+        self._lock = threading.Lock()
+        self.last_error: Optional[str] = None
+
+    @property
+    def available(self) -> bool:
+        return bool(self.model_path) and self.last_error is None
+
+    def _get_pipeline(self):
+        if self._pipeline is None:
+            with self._lock:
+                if self._pipeline is None:
+                    try:
+                        from transformers import pipeline
+                        self._pipeline = pipeline("translation", model=self.model_path)
+                    except Exception as e:
+                        self.last_error = str(e)
+                        print(f"Local translation model unavailable: {e}")
+        return self._pipeline
+
+    def translate(self, text: str, target_language: str) -> Optional[str]:
+        return self.translate_many([text], target_language).get(text)
+
+    def translate_many(self, texts: List[str], target_language: str) -> Dict[str, str]:
+        tgt = LOCAL_MODEL_LANG_CODES.get(target_language)
+        if not self.available or not tgt or not texts:
+            return {}
+        pipe = self._get_pipeline()
+        if pipe is None:
+            return {}
+        try:
+            with self._lock:
+                results = pipe(list(texts), src_lang=LOCAL_MODEL_LANG_CODES['en'], tgt_lang=tgt)
+            return {src: r["translation_text"] for src, r in zip(texts, results)}
+        except Exception as e:
+            print(f"Local translation error: {e}")
+            return {}
+
+
+class GoogleBackend(TranslationBackend):
+    """googletrans with per-request timeout, packed batches and a shared circuit breaker."""
+    name = "google"
+    # One upstream request carries several short strings joined by newlines
+    BATCH_CHAR_LIMIT = 4500
+    BATCH_SEPARATOR = "\n"
+
+    def __init__(self, timeout: Optional[float] = None, max_workers: Optional[int] = None):
+        # Per-request deadline (seconds) so an unreachable endpoint fails fast
+        self.call_timeout = float(timeout or os.getenv("TRANSLATION_TIMEOUT", "5"))
+        # Bounded pool for requests that can't be packed into one call
+        self.max_workers = int(max_workers or os.getenv("TRANSLATION_MAX_WORKERS", "4"))
+        self._local = threading.local()
+        try:
+            from googletrans import Translator
+            self._client_cls = Translator
+        except Exception as e:
+            print(f"googletrans unavailable: {e}")
+            self._client_cls = None
+        # Shared by every TranslationManager: once the endpoint is down, all of them serve fallbacks
+        self.breaker = get_breaker(
+            "translation",
+            failure_threshold=int(os.getenv("TRANSLATION_BREAKER_THRESHOLD", "3")),
+            reset_timeout=float(os.getenv("TRANSLATION_BREAKER_RESET", "30")),
+            probe=lambda: self._new_client().translate("hello", dest="hi"),
+        )
+
+    @property
+    def available(self) -> bool:
+        return self._client_cls is not None
+
+    @property
+    def is_open(self) -> bool:
+        return self.breaker.is_open
+
+    def stats(self) -> Dict[str, object]:
+        return self.breaker.stats()
+
+    def _new_client(self):
+        return self._client_cls(timeout=self.call_timeout, raise_exception=True)
+
+    def _client(self):
+        # googletrans keeps a single HTTP client per Translator; give each thread its own
+        client = getattr(self._local, "client", None)
+        if client is None:
+            client = self._local.client = self._new_client()
+        return client
+
+    def translate(self, text: str, target_language: str) -> Optional[str]:
+        if not self.available or not self.breaker.allow():
+            return None
+        try:
+            translated = self._client().translate(text, dest=target_language).text
+            self.breaker.record_success()
+            return translated
+        except Exception as e:
+            self.breaker.record_failure()
+            print(f"Translation Error: {str(e)}")
+            return None
+
+    def detect(self, text: str) -> Optional[str]:
+        if not self.available or not self.breaker.allow():
+            return None
+        try:
+            detection = self._client().detect(text)
+            self.breaker.record_success()
+            return detection.lang
+        except Exception as e:
+            self.breaker.record_failure()
+            print(f"Language Detection Error: {str(e)}")
+            return None
+
+    def _pack(self, texts: List[str]) -> List[List[str]]:
+        """Group single-line texts into newline-joined chunks under BATCH_CHAR_LIMIT."""
+        chunks, current, size = [], [], 0
+        for text in texts:
+            if current and size + len(text) + 1 > self.BATCH_CHAR_LIMIT:
+                chunks.append(current)
+                current, size = [], 0
+            current.append(text)
+            size += len(text) + 1
+        if current:
+            chunks.append(current)
+        return chunks
+
+    def _translate_chunk(self, chunk: List[str], target_language: str) -> Dict[str, str]:
+        """Translate one packed chunk; returns {text: translation} for what succeeded."""
+        if len(chunk) > 1 and self.breaker.allow():
+            try:
+                result = self._client().translate(self.BATCH_SEPARATOR.join(chunk), dest=target_language)
+                self.breaker.record_success()
+                lines = result.text.split(self.BATCH_SEPARATOR)
+                if len(lines) == len(chunk):
+                    return {src: line.strip() for src, line in zip(chunk, lines)}
+            except Exception as e:
+                self.breaker.record_failure()
+                print(f"Batch Translation Error: {str(e)}")
+        # Fall back to one request per text, stopping as soon as the breaker opens
+        out = {}
+        for text in chunk:
+            translated = self.translate(text, target_language)
+            if translated is None and self.breaker.is_open:
+                break
+            if translated is not None:
+                out[text] = translated
+        return out
+
+    def translate_many(self, texts: List[str], target_language: str) -> Dict[str, str]:
+        if not self.available or not texts:
+            return {}
+        packable = [t for t in texts if self.BATCH_SEPARATOR not in t and len(t) < self.BATCH_CHAR_LIMIT]
+        packable_set = set(packable)
+        jobs = self._pack(packable) + [[t] for t in texts if t not in packable_set]
+        if len(jobs) == 1:
+            return self._translate_chunk(jobs[0], target_language)
+        results = {}
+        with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(jobs)))) as pool:
+            for part in pool.map(lambda job: self._translate_chunk(job, target_language), jobs):
+                results.update(part)
+        return results
+
+
+def _translation_memory():
+    # translation_memory imports this module, so load it on demand
+    from translation_memory import TranslationMemory
+    return TranslationMemory()
+
+
+BACKENDS = {
+    "glossary": GlossaryBackend,
+    "memory": _translation_memory,
+    "local_model": LocalModelBackend,
+    "google": GoogleBackend,
+}
+
+
+def build_backends(names: Optional[Iterable[str]] = None) -> List[TranslationBackend]:
+    """Instantiate backends in order from ``names`` or ``TRANSLATION_BACKENDS``."""
+    if names is None:
+        names = os.getenv("TRANSLATION_BACKENDS", "glossary,memory,google").split(",")
+    backends = []
+    for name in names:
+        name = name.strip().lower()
+        if not name:
+            continue
+        if name not in BACKENDS:
+            print(f"Unknown translation backend ignored: {name}")
+            continue
+        backends.append(BACKENDS[name]())
+    return backends
+
+
+def export_phrase_table(out_path: str, cache_path: Optional[str] = None, languages: Optional[List[str]] = None) -> int:
+    """Dump cached translations and reviewed catalog entries into a phrase table file."""
+    import sqlite3
+    from i18n_catalog import CATALOG_LANGUAGES, load_catalog_file
+
+    languages = languages or CATALOG_LANGUAGES
+    table: Dict[str, Dict[str, str]] = {lang: {} for lang in languages}
+    cache_path = cache_path or os.getenv("TRANSLATION_CACHE_PATH", "translation_cache.db")
+    if os.path.exists(cache_path):
+        conn = sqlite3.connect(cache_path)
+        try:
+            for lang, source, translated in conn.execute(
+                "SELECT target_language, source_text, translated_text FROM translation_cache ORDER BY hits DESC"
+            ):
+                if lang in table:
+                    table[lang].setdefault(source, translated)
+        finally:
+            conn.close()
+    for lang in languages:
+        for source, entry in load_catalog_file(lang).items():
+            # Reviewed catalog text wins over machine output
+            if entry.get("reviewed") and entry.get("translation"):
+                table[lang][source] = entry["translation"]
+    os.makedirs(os.path.dirname(os.path.abspath(out_path)), exist_ok=True)
+    with open(out_path, "w", encoding="utf-8") as fh:
+        json.dump(table, fh, ensure_ascii=False, indent=2)
+    return sum(len(v) for v in table.values())
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Translation backend utilities.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_export = sub.add_parser("export-phrases", help="Build an offline phrase table from the cache and catalogs")
+    p_export.add_argument("--out", default=os.path.join(BASE_DIR, "data", "phrase_table.json"))
+    p_export.add_argument("--cache", help="Path to translation_cache.db (default: TRANSLATION_CACHE_PATH)")
+    args = parser.parse_args()
+
+    if args.command == "export-phrases":
+        print(f"Wrote {export_phrase_table(args.out, args.cache)} phrases to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
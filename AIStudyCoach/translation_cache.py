@@ -0,0 +1,332 @@
+import atexit
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+def cache_key(text: str, target_language: str) -> str:
+    """Stable key for a (text, language) pair, shared by every process and backend."""
+    return hashlib.sha256(f"{target_language}\x00{text}".encode("utf-8")).hexdigest()
+
+
+class TranslationCache:
+    """Disk-backed translation cache shared across processes.
+
+    Entries live in a small SQLite table keyed by ``cache_key``; a bounded
+    in-memory LRU sits in front of it. The table is trimmed to
+    ``max_entries`` by least-recent access and entries older than
+    ``ttl_days`` are treated as misses and purged.
+
+    Env vars: TRANSLATION_CACHE_PATH, TRANSLATION_CACHE_MAX_ENTRIES,
+    TRANSLATION_CACHE_TTL_DAYS, TRANSLATION_CACHE_MEMORY_ENTRIES
+    """
+
+    TOUCH_FLUSH_EVERY = 100      # buffered hits and misses before a write-back
+    EVICT_EVERY = 200            # inserts between eviction passes
+
+    def __init__(self, db_path=None, max_entries=None, ttl_days=None, memory_entries=None):
+        self.db_path = db_path or os.getenv("TRANSLATION_CACHE_PATH", "translation_cache.db")
+        self.max_entries = int(max_entries or os.getenv("TRANSLATION_CACHE_MAX_ENTRIES", "50000"))
+        self.ttl_seconds = float(ttl_days or os.getenv("TRANSLATION_CACHE_TTL_DAYS", "90")) * 86400
+        self.memory_entries = int(memory_entries or os.getenv("TRANSLATION_CACHE_MEMORY_ENTRIES", "5000"))
+        self._memory: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._pending_touches: Dict[str, int] = {}
+        # key -> [target_language, source_text, count] for lookups that missed
+        self._pending_misses: Dict[str, list] = {}
+        # Hits and misses buffered since the last flush, repeats of one key included
+        self._pending_events = 0
+        self._inserts_since_evict = 0
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.init_database()
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=10)
+
+    def init_database(self):
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            try:
+                cursor.execute("PRAGMA journal_mode=WAL;")
+                cursor.execute("PRAGMA synchronous=NORMAL;")
+            except Exception:
+                pass
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS translation_cache (
+                    key TEXT PRIMARY KEY,
+                    target_language TEXT NOT NULL,
+                    source_text TEXT NOT NULL,
+                    translated_text TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL,
+                    hits INTEGER NOT NULL DEFAULT 0
+                )
+            ''')
+            cursor.execute("CREATE INDEX IF NOT EXISTS ix_translation_cache_last_access ON translation_cache(last_access);")
+            # How often uncached strings were asked for; drives prefetch at warm-up
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS translation_usage (
+                    key TEXT PRIMARY KEY,
+                    target_language TEXT NOT NULL,
+                    source_text TEXT NOT NULL,
+                    requests INTEGER NOT NULL DEFAULT 0,
+                    last_requested REAL NOT NULL
+                )
+            ''')
+            cursor.execute("CREATE INDEX IF NOT EXISTS ix_translation_usage_requests ON translation_usage(requests);")
+            conn.commit()
+        finally:
+            conn.close()
+
+    # ---- in-memory layer ----
+    def _remember(self, key: str, translated: str, created_at: float):
+        self._memory[key] = (translated, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _expired(self, created_at: float, now: float) -> bool:
+        return self.ttl_seconds > 0 and now - created_at > self.ttl_seconds
+
+    def _flush_if_due(self):
+        self._pending_events += 1
+        if self._pending_events >= self.TOUCH_FLUSH_EVERY:
+            self.flush()
+
+    def _touch(self, key: str):
+        self._pending_touches[key] = self._pending_touches.get(key, 0) + 1
+        self._flush_if_due()
+
+    def _record_miss(self, key: str, text: str, target_language: str):
+        entry = self._pending_misses.get(key)
+        if entry is None:
+            self._pending_misses[key] = [target_language, text, 1]
+        else:
+            entry[2] += 1
+        # A mostly-miss workload must reach disk too, not only on hits or at exit
+        self._flush_if_due()
+
+    # ---- public API ----
+    def get(self, text: str, target_language: str) -> Optional[str]:
+        return self.get_many([text], target_language).get(text)
+
+    def get_many(self, texts: Iterable[str], target_language: str) -> Dict[str, str]:
+        """Return {text: translation} for every text found in the cache."""
+        texts = set(texts)
+        now = time.time()
+        found: Dict[str, str] = {}
+        missing: Dict[str, str] = {}
+        with self._lock:
+            for text in texts:
+                key = cache_key(text, target_language)
+                entry = self._memory.get(key)
+                if entry and not self._expired(entry[1], now):
+                    self._memory.move_to_end(key)
+                    found[text] = entry[0]
+                    self._touch(key)
+                else:
+                    missing[key] = text
+        if missing:
+            rows = self._select(list(missing))
+            with self._lock:
+                for key, translated, created_at in rows:
+                    if self._expired(created_at, now):
+                        continue
+                    found[missing[key]] = translated
+                    self._remember(key, translated, created_at)
+                    self._touch(key)
+        with self._lock:
+            self.hits += len(found)
+            self.misses += len(texts) - len(found)
+            for key, text in missing.items():
+                if text not in found:
+                    self._record_miss(key, text, target_language)
+        return found
+
+    def _select(self, keys: List[str]):
+        rows = []
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            # Stay well below SQLite's bound-parameter limit
+            for i in range(0, len(keys), 500):
+                part = keys[i:i + 500]
+                cursor.execute(
+                    f"SELECT key, translated_text, created_at FROM translation_cache WHERE key IN ({', '.join('?' for _ in part)})",
+                    part
+                )
+                rows.extend(cursor.fetchall())
+        except sqlite3.Error as e:
+            print(f"Translation cache read error: {e}")
+        finally:
+            conn.close()
+        return rows
+
+    def set(self, text: str, target_language: str, translated: str):
+        self.set_many({text: translated}, target_language)
+
+    def set_many(self, translations: Dict[str, str], target_language: str):
+        if not translations:
+            return
+        now = time.time()
+        rows = []
+        with self._lock:
+            for text, translated in translations.items():
+                key = cache_key(text, target_language)
+                self._remember(key, translated, now)
+                rows.append((key, target_language, text, translated, now, now))
+            self._inserts_since_evict += len(rows)
+            evict = self._inserts_since_evict >= self.EVICT_EVERY
+            if evict:
+                self._inserts_since_evict = 0
+        conn = self._connect()
+        try:
+            conn.executemany('''
+                INSERT INTO translation_cache (key, target_language, source_text, translated_text, created_at, last_access)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(key) DO UPDATE SET
+                    translated_text = excluded.translated_text,
+                    created_at = excluded.created_at,
+                    last_access = excluded.last_access
+            ''', rows)
+            conn.commit()
+        except sqlite3.Error as e:
+            print(f"Translation cache write error: {e}")
+        finally:
+            conn.close()
+        if evict:
+            self.evict()
+
+    def flush(self):
+        """Write buffered access times, hit counts and miss counts back to disk (drives LRU and warm-up)."""
+        with self._lock:
+            pending, self._pending_touches = self._pending_touches, {}
+            misses, self._pending_misses = self._pending_misses, {}
+            self._pending_events = 0
+        if not pending and not misses:
+            return
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.executemany(
+                "UPDATE translation_cache SET last_access = ?, hits = hits + ? WHERE key = ?",
+                [(now, count, key) for key, count in pending.items()]
+            )
+            conn.executemany('''
+                INSERT INTO translation_usage (key, target_language, source_text, requests, last_requested)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(key) DO UPDATE SET
+                    requests = requests + excluded.requests,
+                    last_requested = excluded.last_requested
+            ''', [(key, lang, text, count, now) for key, (lang, text, count) in misses.items()])
+            conn.commit()
+        except sqlite3.Error as e:
+            print(f"Translation cache flush error: {e}")
+        finally:
+            conn.close()
+
+    def evict(self) -> int:
+        """Drop expired entries, then least-recently used ones beyond max_entries."""
+        self.flush()
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            removed = 0
+            if self.ttl_seconds > 0:
+                cursor.execute("DELETE FROM translation_cache WHERE created_at < ?", (time.time() - self.ttl_seconds,))
+                removed += cursor.rowcount
+            cursor.execute("SELECT COUNT(*) FROM translation_cache")
+            overflow = cursor.fetchone()[0] - self.max_entries
+            if overflow > 0:
+                cursor.execute('''
+                    DELETE FROM translation_cache WHERE key IN (
+                        SELECT key FROM translation_cache ORDER BY last_access ASC LIMIT ?
+                    )
+                ''', (overflow,))
+                removed += cursor.rowcount
+            # Keep the usage table to the same bound, dropping the rarest strings
+            cursor.execute('''
+                DELETE FROM translation_usage WHERE key IN (
+                    SELECT key FROM translation_usage ORDER BY requests DESC, last_requested DESC LIMIT -1 OFFSET ?
+                )
+            ''', (self.max_entries,))
+            conn.commit()
+            return removed
+        except sqlite3.Error as e:
+            print(f"Translation cache eviction error: {e}")
+            return 0
+        finally:
+            conn.close()
+
+    def warm(self, limit=None, target_language=None, by_hits=False) -> int:
+        """Load the most recently (or, with ``by_hits``, most frequently) used entries into memory.
+
+        Returns how many were loaded.
+        """
+        limit = min(limit or self.memory_entries, self.memory_entries)
+        query = "SELECT key, translated_text, created_at FROM translation_cache"
+        params: list = []
+        if target_language:
+            query += " WHERE target_language = ?"
+            params.append(target_language)
+        query += " ORDER BY hits DESC, last_access DESC LIMIT ?" if by_hits else " ORDER BY last_access DESC LIMIT ?"
+        params.append(limit)
+        conn = self._connect()
+        try:
+            rows = conn.execute(query, params).fetchall()
+        except sqlite3.Error as e:
+            print(f"Translation cache warm-up error: {e}")
+            rows = []
+        finally:
+            conn.close()
+        now = time.time()
+        with self._lock:
+            # Oldest first so the most recent end up at the hot end of the LRU
+            for key, translated, created_at in reversed(rows):
+                if not self._expired(created_at, now):
+                    self._remember(key, translated, created_at)
+        return len(rows)
+
+    def frequent_misses(self, limit: int = 200) -> List[Tuple[str, str]]:
+        """(target_language, source_text) pairs most often requested but not cached, most frequent first."""
+        self.flush()
+        conn = self._connect()
+        try:
+            return conn.execute('''
+                SELECT u.target_language, u.source_text FROM translation_usage u
+                LEFT JOIN translation_cache c ON c.key = u.key
+                WHERE c.key IS NULL
+                ORDER BY u.requests DESC
+                LIMIT ?
+            ''', (limit,)).fetchall()
+        except sqlite3.Error as e:
+            print(f"Translation usage read error: {e}")
+            return []
+        finally:
+            conn.close()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "memory_entries": len(self._memory)}
+
+
+_shared_cache: Optional[TranslationCache] = None
+_shared_lock = threading.Lock()
+
+
+def get_translation_cache() -> TranslationCache:
+    """Process-wide cache instance (warmed in the background by translation_warmup)."""
+    global _shared_cache
+    if _shared_cache is None:
+        with _shared_lock:
+            if _shared_cache is None:
+                cache = TranslationCache()
+                atexit.register(cache.flush)
+                _shared_cache = cache
+    return _shared_cache
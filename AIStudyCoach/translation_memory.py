@@ -0,0 +1,246 @@
+"""Translation memory: reuse stored translations for near-identical sentences.
+
+Numbers are masked before lookup, so "Take 500 mg twice daily" and
+"Take 650 mg twice daily" share one entry. The stored translation keeps
+placeholders where the numbers were, and the new numbers are put back in
+order, in the digit system the translation used (ASCII or Devanagari,
+Bengali, Oriya or Malayalam digits).
+
+A stored translation is reused only when the masked text is the same
+sentence: the same words in the same order, ignoring case, punctuation and
+whitespace, so only the numbers may differ. Anything else goes on to the
+next backend. A sentence that differs by one word ("do take" / "do not
+take", "morning" / "evening") can mean the opposite, so similarity alone is
+never enough by default.
+
+Fuzzy reuse is opt-in (``TRANSLATION_MEMORY_FUZZY=1``). A character trigram
+index then finds the closest entry, reused if its Dice similarity reaches
+``TRANSLATION_MEMORY_THRESHOLD`` (default 0.9) with the same number of
+placeholders. Such approximate results are never written to the
+translation cache (see ``cacheable``), so the next backend gets another
+chance at them once it is reachable.
+
+A translation is learned only if its numbers come back unchanged and in the
+same order. Otherwise the placeholders could not be restored safely.
+Entries persist in the translation cache database.
+"""
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from translation_backends import TranslationBackend
+
+_NUMBER = re.compile(r"\d+(?:[.,]\d+)*")   # \d also matches Indic digits
+_PLACEHOLDER = "⟦{}⟧"            # ⟦0⟧, never produced by OCR or translators
+_PLACEHOLDER_RE = re.compile("⟦(\\d+)⟧")
+_PUNCT = re.compile(r"[^\w\s⟦⟧]+")
+_SPACES = re.compile(r"\s+")
+
+# Zero codepoint of each digit system a translation may come back in
+DIGIT_ZEROS = {"ascii": 0x30, "hi": 0x0966, "bn": 0x09E6, "or": 0x0B66, "ml": 0x0D66}
+_TO_ASCII = {zero + i: 0x30 + i for zero in DIGIT_ZEROS.values() for i in range(10)}
+
+
+def to_ascii_digits(text: str) -> str:
+    return text.translate(_TO_ASCII)
+
+
+def _digit_system(numbers: List[str]) -> str:
+    for number in numbers:
+        for ch in number:
+            for name, zero in DIGIT_ZEROS.items():
+                if zero <= ord(ch) <= zero + 9:
+                    if name != "ascii":
+                        return name
+    return "ascii"
+
+
+def _in_digit_system(number: str, system: str) -> str:
+    zero = DIGIT_ZEROS[system]
+    return "".join(chr(zero + int(ch)) if ch.isdigit() else ch for ch in to_ascii_digits(number))
+
+
+def mask_numbers(text: str) -> Tuple[str, List[str]]:
+    """Replace every number with ⟦i⟧; returns (masked_text, numbers_in_order)."""
+    numbers: List[str] = []
+
+    def repl(match):
+        numbers.append(match.group(0))
+        return _PLACEHOLDER.format(len(numbers) - 1)
+
+    return _NUMBER.sub(repl, text), numbers
+
+
+def normalize_key(masked: str) -> str:
+    """Case, punctuation and whitespace-insensitive form of a masked text."""
+    return _SPACES.sub(" ", _PUNCT.sub(" ", masked.lower())).strip()
+
+
+def trigrams(text: str) -> set:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TranslationMemory(TranslationBackend):
+    name = "memory"
+
+    def __init__(self, db_path: Optional[str] = None, threshold: Optional[float] = None,
+                 max_entries: Optional[int] = None, fuzzy: Optional[bool] = None):
+        self.db_path = db_path or os.getenv("TRANSLATION_CACHE_PATH", "translation_cache.db")
+        self.fuzzy = fuzzy if fuzzy is not None else os.getenv("TRANSLATION_MEMORY_FUZZY", "0") == "1"
+        self.threshold = float(threshold or os.getenv("TRANSLATION_MEMORY_THRESHOLD", "0.9"))
+        self.max_entries = int(max_entries or os.getenv("TRANSLATION_MEMORY_MAX_ENTRIES", "20000"))
+        self._lock = threading.RLock()
+        # Per language: key -> (template, digit_system, n_placeholders), plus a trigram index
+        self._entries: Dict[str, Dict[str, Tuple[str, str, int]]] = {}
+        self._index: Dict[str, Dict[str, set]] = {}
+        self.exact_hits = 0
+        self.fuzzy_hits = 0
+        self.misses = 0
+        self.init_database()
+
+    def init_database(self):
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        try:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS translation_memory (
+                    key TEXT NOT NULL,
+                    target_language TEXT NOT NULL,
+                    template TEXT NOT NULL,
+                    digit_system TEXT NOT NULL,
+                    placeholders INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    PRIMARY KEY (target_language, key)
+                )
+            ''')
+            conn.commit()
+        finally:
+            conn.close()
+
+    # ---- in-memory index ----
+    def _load(self, lang: str):
+        if lang in self._entries:
+            return
+        entries: Dict[str, Tuple[str, str, int]] = {}
+        index: Dict[str, set] = {}
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        try:
+            rows = conn.execute(
+                "SELECT key, template, digit_system, placeholders FROM translation_memory "
+                "WHERE target_language = ? ORDER BY created_at DESC LIMIT ?",
+                (lang, self.max_entries)
+            ).fetchall()
+        except sqlite3.Error as e:
+            print(f"Translation memory load error: {e}")
+            rows = []
+        finally:
+            conn.close()
+        for key, template, system, placeholders in rows:
+            entries[key] = (template, system, placeholders)
+            for gram in trigrams(key):
+                index.setdefault(gram, set()).add(key)
+        self._entries[lang] = entries
+        self._index[lang] = index
+
+    def _add(self, lang: str, key: str, entry: Tuple[str, str, int]):
+        entries, index = self._entries[lang], self._index[lang]
+        if key not in entries:
+            if len(entries) >= self.max_entries:
+                return  # still persisted; picked up by recency on the next load
+            for gram in trigrams(key):
+                index.setdefault(gram, set()).add(key)
+        entries[key] = entry
+
+    def _closest(self, lang: str, key: str, placeholders: int) -> Optional[Tuple[str, float]]:
+        grams = trigrams(key)
+        shared: Counter = Counter()
+        for gram in grams:
+            shared.update(self._index[lang].get(gram, ()))
+        best, best_score = None, 0.0
+        for candidate, count in shared.most_common(20):
+            if self._entries[lang][candidate][2] != placeholders:
+                continue
+            score = 2 * count / (len(grams) + len(trigrams(candidate)))
+            if score > best_score:
+                best, best_score = candidate, score
+        return (best, best_score) if best is not None else None
+
+    # ---- backend API ----
+    def translate(self, text: str, target_language: str) -> Optional[str]:
+        masked, numbers = mask_numbers(text)
+        key = normalize_key(masked)
+        if not key:
+            return None
+        with self._lock:
+            self._load(target_language)
+            entry = self._entries[target_language].get(key)
+            if entry is not None:
+                self.exact_hits += 1
+            else:
+                match = self._closest(target_language, key, len(numbers)) if self.fuzzy else None
+                if match is None or match[1] < self.threshold:
+                    self.misses += 1
+                    return None
+                entry = self._entries[target_language][match[0]]
+                self.fuzzy_hits += 1
+        template, system, placeholders = entry
+        if placeholders != len(numbers):
+            return None
+        return _PLACEHOLDER_RE.sub(lambda m: _in_digit_system(numbers[int(m.group(1))], system), template)
+
+    def cacheable(self, text: str, target_language: str) -> bool:
+        """Only exact (same sentence, other numbers) reuses may be cached; fuzzy ones are approximate."""
+        key = normalize_key(mask_numbers(text)[0])
+        with self._lock:
+            self._load(target_language)
+            return key in self._entries[target_language]
+
+    def learn(self, translations: Dict[str, str], target_language: str) -> int:
+        """Store translations whose numbers survived in order; returns how many were stored."""
+        rows = []
+        now = time.time()
+        with self._lock:
+            self._load(target_language)
+            for source, translated in translations.items():
+                masked, numbers = mask_numbers(source)
+                key = normalize_key(masked)
+                if not key or _PLACEHOLDER_RE.search(translated):
+                    continue
+                found = _NUMBER.findall(translated)
+                if [to_ascii_digits(n) for n in found] != [to_ascii_digits(n) for n in numbers]:
+                    continue
+                counter = iter(range(len(found)))
+                template = _NUMBER.sub(lambda m: _PLACEHOLDER.format(next(counter)), translated)
+                entry = (template, _digit_system(found), len(numbers))
+                self._add(target_language, key, entry)
+                rows.append((key, target_language, entry[0], entry[1], entry[2], now))
+        if not rows:
+            return 0
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        try:
+            conn.executemany('''
+                INSERT OR REPLACE INTO translation_memory
+                    (key, target_language, template, digit_system, placeholders, created_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', rows)
+            conn.commit()
+        except sqlite3.Error as e:
+            print(f"Translation memory write error: {e}")
+        finally:
+            conn.close()
+        return len(rows)
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "name": self.name,
+                "state": "closed",
+                "exact_hits": self.exact_hits,
+                "fuzzy_hits": self.fuzzy_hits,
+                "misses": self.misses,
+                "entries": sum(len(e) for e in self._entries.values()),
+            }
@@ -0,0 +1,76 @@
+"""Background translation warm-up at process start.
+
+Runs once per process in a daemon thread (started by ``services`` when the
+translator is first built):
+
+1. load every UI catalog into memory;
+2. load the most frequently hit cache entries per language into the LRU;
+3. translate the strings that earlier runs asked for most often but never
+   got cached (``translation_usage``), so they are hits from now on.
+
+Env vars: TRANSLATION_WARMUP (1/0), TRANSLATION_PREFETCH_LIMIT
+"""
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+from i18n_catalog import CATALOG_LANGUAGES
+
+_started = False
+_started_lock = threading.Lock()
+last_report: Optional[Dict[str, object]] = None
+
+
+def run_warmup(translator, prefetch_limit: Optional[int] = None) -> Dict[str, object]:
+    """Warm catalogs, the in-memory cache and prefetch frequent misses; returns a report."""
+    started = time.time()
+    report: Dict[str, object] = {"catalog": {}, "cache": {}, "prefetched": 0}
+    cache = translator.translation_cache
+
+    for lang in CATALOG_LANGUAGES:
+        report["catalog"][lang] = len(translator.ui_catalog.table(lang))
+
+    # Split the memory budget evenly so one busy language can't crowd out the rest
+    per_language = max(1, cache.memory_entries // len(CATALOG_LANGUAGES))
+    for lang in CATALOG_LANGUAGES:
+        report["cache"][lang] = cache.warm(per_language, target_language=lang, by_hits=True)
+
+    limit = prefetch_limit if prefetch_limit is not None else int(os.getenv("TRANSLATION_PREFETCH_LIMIT", "200"))
+    by_language: Dict[str, list] = {}
+    for lang, text in cache.frequent_misses(limit):
+        by_language.setdefault(lang, []).append(text)
+    for lang, texts in by_language.items():
+        if translator.is_degraded():
+            break
+        translator.batch_translate(texts, lang)
+        report["prefetched"] += len(texts)
+
+    report["seconds"] = round(time.time() - started, 3)
+    return report
+
+
+def start_warmup(translator) -> bool:
+    """Start the warm-up thread once per process; returns False if already started or disabled."""
+    global _started
+    if os.getenv("TRANSLATION_WARMUP", "1") == "0":
+        return False
+    with _started_lock:
+        if _started:
+            return False
+        _started = True
+
+    def _run():
+        global last_report
+        try:
+            last_report = run_warmup(translator)
+        except Exception as e:
+            print(f"Translation warm-up error: {e}")
+
+    threading.Thread(target=_run, name="translation-warmup", daemon=True).start()
+    return True
+
+
+if __name__ == "__main__":
+    from translator import TranslationManager
+    print(run_warmup(TranslationManager()))
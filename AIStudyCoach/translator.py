@@ -1,21 +1,86 @@
-from googletrans import Translator
-import os
+import re
+from translation_cache import get_translation_cache
+from i18n_catalog import get_ui_catalog
+from script_detector import get_script_detector
+from translation_backends import MEDICAL_GLOSSARY, build_backends
+
+# Texts longer than this (or spanning lines) are translated segment by segment
+MAX_SEGMENT_CHARS = 300
+_LINE_BREAK = re.compile(r"(\s*\n\s*)")
+_SENTENCE_BREAK = re.compile(r"(?<=[.!?\u0964])(\s+)(?=\S)")
+# "Tab. Paracetamol" is one phrase, not two sentences
+_ABBREVIATIONS = {"tab", "cap", "caps", "inj", "syp", "syr", "dr", "mr", "mrs", "ms", "no", "sr", "st", "vs", "etc"}
+_HAS_LETTER = re.compile(r"[^\W\d_]")
+
+
+def needs_segmentation(text):
+    return "\n" in text or len(text) > MAX_SEGMENT_CHARS
+
+
+def split_segments(text):
+    """Split text into [(piece, translatable)] so that "".join(pieces) == text.
+    
+    Lines are always separate segments; over-long lines are further split at
+    sentence ends. Whitespace, line breaks and letter-free pieces (numbers,
+    rulers) are kept verbatim so the layout survives translation.
+    """
+    pieces = []
+    for i, part in enumerate(_LINE_BREAK.split(text)):
+        if i % 2 or not part:
+            if part:
+                pieces.append((part, False))
+            continue
+        lead = part[:len(part) - len(part.lstrip())]
+        body = part.strip()
+        trail = part[len(lead) + len(body):]
+        if lead:
+            pieces.append((lead, False))
+        if len(body) > MAX_SEGMENT_CHARS:
+            pieces.extend(_split_sentences(body))
+        elif body:
+            pieces.append((body, bool(_HAS_LETTER.search(body))))
+        if trail:
+            pieces.append((trail, False))
+    return pieces
+
+
+def _split_sentences(line):
+    parts = _SENTENCE_BREAK.split(line)
+    pieces, current = [], parts[0]
+    for k in range(1, len(parts), 2):
+        gap, nxt = parts[k], parts[k + 1]
+        words = current.split()
+        last_word = words[-1].rstrip(".").lower() if words else ""
+        if last_word in _ABBREVIATIONS or len(last_word) == 1:
+            current += gap + nxt
+            continue
+        pieces.append((current, bool(_HAS_LETTER.search(current))))
+        pieces.append((gap, False))
+        current = nxt
+    pieces.append((current, bool(_HAS_LETTER.search(current))))
+    return pieces
+
 
 class TranslationManager:
-    def __init__(self):
-        self.translator = Translator()
-        
+    def __init__(self, backends=None):
         # Language mappings
         self.languages = {
             'en': 'English',
             'hi': 'Hindi',
-            'bn': 'Bengali', 
+            'bn': 'Bengali',
             'or': 'Odia',
             'ml': 'Malayalam'
         }
         
-        # Cache for translations to avoid repeated API calls
-        self.translation_cache = {}
+        # Persistent cache shared by every instance and process (SQLite + in-memory LRU)
+        self.translation_cache = get_translation_cache()
+        # Precompiled static UI strings (locales/<lang>.json, see i18n_catalog.py)
+        self.ui_catalog = get_ui_catalog()
+        # Local script-based language detection (no network for Indic scripts or plain English)
+        self.script_detector = get_script_detector()
+        
+        # Tried in order (env TRANSLATION_BACKENDS, default "glossary,memory,google")
+        self.backends = [b for b in (backends if backends is not None else build_backends()) if b.available]
     
     def translate_text(self, text, target_language='en'):
         """Translate text to target language"""
@@ -26,91 +91,133 @@ class TranslationManager:
         if target_language == 'en':
             return text
         
-        # Check cache first
-        cache_key = f"{text}_{target_language}"
-        if cache_key in self.translation_cache:
-            return self.translation_cache[cache_key]
+        # Static UI strings come from the offline catalog
+        cataloged = self.ui_catalog.lookup(text, target_language)
+        if cataloged is not None:
+            return cataloged
         
-        try:
-            # Perform translation
-            result = self.translator.translate(text, dest=target_language)
-            translated_text = result.text
-            
-            # Cache the result
-            self.translation_cache[cache_key] = translated_text
-            
-            return translated_text
+        # Long or multi-line text is cached and translated per segment
+        if needs_segmentation(text):
+            return self.batch_translate([text], target_language)[0]
         
-        except Exception as e:
-            print(f"Translation Error: {str(e)}")
-            # Return original text if translation fails
-            return text
+        # Cache, then the backends in order; return original text if translation fails
+        return self._translate_atoms([text], target_language).get(text, text)
     
     def detect_language(self, text):
         """Detect the language of given text"""
-        try:
-            detection = self.translator.detect(text)
-            return detection.lang
-        except Exception as e:
-            print(f"Language Detection Error: {str(e)}")
-            return 'en'  # Default to English
+        return self.detect_language_details(text)[0]
+    
+    def detect_language_details(self, text):
+        """Return (language, confidence, source) where source is 'script', 'backend' or 'default'.
+        
+        The local script scan decides whenever it is unambiguous; backends (the
+        network) are only asked about ambiguous Latin or mixed-script text, and
+        their verdict is cached under the same text hash as the script scan.
+        """
+        local = self.script_detector.detect(text)
+        if local.language and not local.ambiguous:
+            return local.language, local.confidence, local.source
+        for backend in self.backends:
+            lang = backend.detect(text)
+            if lang:
+                self.script_detector.remember(text, lang)
+                return lang, None, 'backend'
+        return local.language or 'en', local.confidence, 'default'  # Default to English
+    
+    def is_degraded(self):
+        """True while a remote backend's circuit breaker is serving fallbacks"""
+        return any(backend.is_open for backend in self.backends)
+    
+    def get_stats(self):
+        """Backend/breaker state and cache counters for the UI and admin metrics"""
+        backend_stats = {backend.name: backend.stats() for backend in self.backends}
+        return {
+            "state": "open" if self.is_degraded() else "closed",
+            "short_circuited": sum(s.get("short_circuited", 0) for s in backend_stats.values()),
+            "trips": sum(s.get("trips", 0) for s in backend_stats.values()),
+            "backends": backend_stats,
+            "cache": self.translation_cache.stats(),
+        }
     
     def get_supported_languages(self):
         """Get list of supported languages"""
         return self.languages
     
     def batch_translate(self, texts, target_language='en'):
-        """Translate multiple texts at once"""
-        translated_texts = []
+        """Translate many texts with as few upstream requests as possible.
+        
+        Inputs are de-duplicated and resolved from the catalog first. Long or
+        multi-line texts are split into line/sentence segments (see
+        ``split_segments``) so each segment is cached on its own and only
+        segments not seen before are translated. All remaining segments then
+        go through the cache and the backends in one batch, and each text is
+        reassembled with its original whitespace and line breaks. Results come
+        back in input order; failures fall back to the original.
+        """
+        texts = list(texts)
+        if target_language == 'en':
+            return texts
         
-        for text in texts:
-            translated_text = self.translate_text(text, target_language)
-            translated_texts.append(translated_text)
+        unique = list(dict.fromkeys(t for t in texts if t and t.strip()))
+        resolved = {}
+        layouts = {}
+        atoms = []
+        for text in unique:
+            cataloged = self.ui_catalog.lookup(text, target_language)
+            if cataloged is not None:
+                resolved[text] = cataloged
+            elif needs_segmentation(text):
+                layouts[text] = split_segments(text)
+                atoms.extend(piece for piece, translatable in layouts[text] if translatable)
+            else:
+                atoms.append(text)
+        
+        translated = self._translate_atoms(list(dict.fromkeys(atoms)), target_language)
+        for text in unique:
+            if text in layouts:
+                resolved[text] = "".join(
+                    translated.get(piece, piece) if translatable else piece
+                    for piece, translatable in layouts[text]
+                )
+            elif text not in resolved and text in translated:
+                resolved[text] = translated[text]
+        
+        return [resolved.get(text, text) for text in texts]
+    
+    def _translate_atoms(self, atoms, target_language):
+        """Resolve single segments from the cache, then the backends in order.
         
-        return translated_texts
+        The first backend that handles a segment wins (remote ones fail fast while
+        their breaker is open); its results are cached and offered to the other
+        backends to learn from (e.g. the translation memory), unless the backend
+        marks them approximate (see ``TranslationBackend.cacheable``).
+        """
+        resolved = self.translation_cache.get_many(atoms, target_language) if atoms else {}
+        missing = [t for t in atoms if t not in resolved]
+        for backend in self.backends:
+            if not missing:
+                break
+            fresh = backend.translate_many(missing, target_language)
+            if fresh:
+                # Approximate results are served this once, never cached or taught to other backends
+                exact = {t: v for t, v in fresh.items() if backend.cacheable(t, target_language)}
+                if exact:
+                    self.translation_cache.set_many(exact, target_language)
+                    for other in self.backends:
+                        if other is not backend:
+                            other.learn(exact, target_language)
+                resolved.update(fresh)
+                missing = [t for t in missing if t not in fresh]
+        return resolved
     
     def translate_medical_terms(self, terms, target_language='en'):
         """Translate medical terms with special handling"""
         medical_translations = {}
         
-        # Common medical terms that should be handled carefully
-        medical_glossary = {
-            'prescription': {
-                'hi': 'नुस्खा',
-                'bn': 'প্রেসক্রিপশন',
-                'or': 'ପ୍ରେସକ୍ରିପସନ୍',
-                'ml': 'കുറിപ്പടി'
-            },
-            'medicine': {
-                'hi': 'दवा',
-                'bn': 'ওষুধ',
-                'or': 'ଔଷଧ',
-                'ml': 'മരുന്ന്'
-            },
-            'dosage': {
-                'hi': 'खुराक',
-                'bn': 'ডোজ',
-                'or': 'ମାତ୍ରା',
-                'ml': 'അളവ്'
-            },
-            'doctor': {
-                'hi': 'डॉक्टर',
-                'bn': 'ডাক্তার',
-                'or': 'ଡାକ୍ତର',
-                'ml': 'ഡോക്ടർ'
-            },
-            'hospital': {
-                'hi': 'अस्पताल',
-                'bn': 'হাসপাতাল',
-                'or': 'ଡାକ୍ତରଖାନା',
-                'ml': 'ആശുപത്രി'
-            }
-        }
-        
         for term in terms:
             term_lower = term.lower()
-            if term_lower in medical_glossary and target_language in medical_glossary[term_lower]:
-                medical_translations[term] = medical_glossary[term_lower][target_language]
+            if term_lower in MEDICAL_GLOSSARY and target_language in MEDICAL_GLOSSARY[term_lower]:
+                medical_translations[term] = MEDICAL_GLOSSARY[term_lower][target_language]
             else:
                 medical_translations[term] = self.translate_text(term, target_language)
         